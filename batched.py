@@ -0,0 +1,307 @@
+import numpy as np
+
+from colony import NUM_INPUTS, AntPopulation, NeighbourGrid, VisitMap
+from network import BatchNetwork
+from profiling import NULL_TIMER
+from simulation import (CELL_FOOD, TERMINATION_CONDITIONS, Environment, PheromoneSystem, Simulation, closest_food,
+                        delete_keys)
+
+
+class BatchedPheromoneSystem(PheromoneSystem):
+    """
+    Phéromones de E épisodes dans un seul tableau [épisode, y, x, types].
+
+    Construit à partir des systèmes de chaque épisode, dont les valeurs
+    deviennent des vues sur le tableau commun (rendu d'un épisode).
+    """
+
+    def __init__(self, systems):
+        first = systems[0]
+        if any(system.lazy or system.tile_size is not None for system in systems):
+            raise ValueError("La simulation batchée ne supporte que des grilles denses")
+        self.num_envs = len(systems)
+        self.width = first.width
+        self.height = first.height
+        self.num_types = first.num_types
+        self.lazy = False
+        self.tile_size = None
+        self.evaporation_rate = first.evaporation_rate
+        self.diffusion_rate = first.diffusion_rate
+        self.scratch = None
+        self.values = np.stack([system.values for system in systems])  # [épisode, y, x, types]
+        for e, system in enumerate(systems):
+            system.values = self.values[e]
+            system.integral = None
+        self.integral = None
+        self.tick = 0
+        self.stamp = None
+
+    def deposit_many(self, xs, ys, types, amounts, episodes=None):
+        """Comme `PheromoneSystem.deposit_many`, dans l'épisode de chaque fourmi."""
+        inside = (0 <= xs) & (xs < self.width) & (0 <= ys) & (ys < self.height)
+        np.add.at(self.values, (episodes[inside], ys[inside], xs[inside], np.asarray(types)[inside] % self.num_types),
+                  np.asarray(amounts, dtype=self.values.dtype)[inside])
+        self.integral = None
+
+    def build_integral(self):
+        """Tables des sommes cumulées de chaque épisode, [épisode, y, x, types]."""
+        integral = np.zeros((self.num_envs, self.height + 1, self.width + 1, self.num_types))
+        np.cumsum(self.values, axis=1, dtype=np.float64, out=integral[:, 1:, 1:])
+        np.cumsum(integral[:, 1:, 1:], axis=2, out=integral[:, 1:, 1:])
+        self.integral = integral
+        return integral
+
+    def window_sums(self, xs, ys, radius, episodes=None):
+        """Comme `PheromoneSystem.window_sums`, dans l'épisode de chaque position."""
+        integral = self.integral if self.integral is not None else self.build_integral()
+        x_min = np.clip(xs - radius, 0, self.width)
+        x_max = np.clip(xs + radius + 1, 0, self.width)
+        y_min = np.clip(ys - radius, 0, self.height)
+        y_max = np.clip(ys + radius + 1, 0, self.height)
+        return (integral[episodes, y_max, x_max] - integral[episodes, y_min, x_max]
+                - integral[episodes, y_max, x_min] + integral[episodes, y_min, x_min])
+
+
+class BatchedEnvironment(Environment):
+    """
+    E environnements de même taille empilés : chaque couche a une dimension
+    d'épisode en tête, [épisode, y, x]. Les méthodes de déplacement et de
+    collision d'`Environment` s'appliquent telles quelles ; seules les cellules
+    sont indexées par (épisode, y, x) via `cell_index`.
+
+    Les environnements d'origine restent utilisables pour l'affichage : leurs
+    couches sont des vues sur les tableaux empilés.
+    """
+
+    def __init__(self, environments):
+        first = environments[0]
+        self.environments = environments
+        self.num_envs = len(environments)
+        self.width = first.width
+        self.height = first.height
+        self.grid_size = first.grid_size
+        self.tile_size = None
+        self.storage_dir = None
+        self.cell_types = np.stack([np.asarray(env.cell_types) for env in environments])
+        for e, env in enumerate(environments):
+            env.cell_types = self.cell_types[e]
+        self.ants = []
+        self.pheromone_system = BatchedPheromoneSystem([env.pheromone_system for env in environments])
+        self.occupied_positions = set()
+        # Index trié ((épisode * height + y) * width + x) des cellules de nourriture
+        self.food_keys = np.concatenate([e * self.width * self.height + env.food_keys
+                                         for e, env in enumerate(environments)])
+        self.renderer = None
+
+    def cell_index(self, ants, idx, xs, ys):
+        return ants.episode[idx], ys, xs
+
+    def cell_keys(self, cells):
+        episodes, ys, xs = cells
+        return (episodes * self.height + ys) * self.width + xs
+
+    def remove_food(self, xs, ys, episodes):
+        """Retire la nourriture des cellules (xs, ys) de chaque épisode."""
+        self.clear_flag((episodes, ys, xs), CELL_FOOD)
+        keys = (episodes * self.height + ys) * self.width + xs
+        self.food_keys = delete_keys(self.food_keys, keys)
+
+    def handle_food_collision(self, ants, idx, food_pos):
+        x, y = (np.asarray(c, dtype=np.int64).reshape(-1) for c in food_pos)
+        ants.set_has_food(idx)
+        ants.pickup_location[idx] = np.column_stack((x, y))
+        self.remove_food(x, y, ants.episode[idx])
+
+    def closest_food_direction(self, positions, search_radius, chunk_size=4096, episodes=None):
+        """
+        Comme `Environment.closest_food_direction`, dans l'épisode de chaque position.
+
+        Les clés de `food_keys` sont celles d'une grille de E * height lignes : la
+        fenêtre de chaque fourmi est limitée aux lignes de son épisode.
+        """
+        cells = np.trunc(positions).astype(np.int64)
+        first_row = episodes * self.height
+        return closest_food(cells[:, 0], cells[:, 1] + first_row, self.food_keys, self.width, search_radius,
+                            first_row, first_row + self.height, chunk_size)
+
+    def draw_grid(self, screen, full=False, episode=0):
+        """Dessine l'épisode `episode`."""
+        return self.environments[episode].draw_grid(screen, full)
+
+
+class EpisodeNeighbourGrid(NeighbourGrid):
+    """
+    Index spatial de fourmis réparties sur plusieurs épisodes.
+
+    Les épisodes sont décalés en y d'une distance supérieure à la diagonale du
+    monde : les voisins d'un autre épisode viennent toujours après ceux de
+    l'épisode de la fourmi, et sont remplacés par -1 comme des voisins absents.
+    """
+
+    def __init__(self, positions, episode, width, height, cell_size=None):
+        diagonal = np.hypot(width, height)
+        stride = height + int(np.ceil(diagonal)) + 1
+        shifted = positions.copy()
+        shifted[:, 1] += episode * stride
+        super().__init__(shifted, cell_size)
+        # Un rayon couvrant la diagonale trouve tous les voisins du même épisode
+        self.max_radius = min(self.max_radius, int(np.ceil(diagonal / self.cell_size)) + 1)
+        self.local_positions = positions
+        self.episode = episode
+
+    def query(self, idx, k=3):
+        idx = np.asarray(idx, dtype=np.intp)
+        result = super().query(idx, k)
+        other = (result >= 0) & (self.episode[np.maximum(result, 0)] != self.episode[idx][:, None])
+        result[other] = -1
+        return result
+
+    def closest_positions(self, idx, k=3):
+        neighbours = self.query(idx, k)
+        positions = self.local_positions[np.maximum(neighbours, 0)]
+        positions[neighbours < 0] = 0.0
+        return positions
+
+
+class EpisodeVisitMap(VisitMap):
+    """Carte des visites commune à chaque colonie : une carte par épisode."""
+
+    def __init__(self, width, height, episode, num_envs):
+        super().__init__(width, height, num_envs)
+        self.episode = episode
+
+    def mark(self, idx, x, y):
+        return super().mark(self.episode[np.asarray(idx, dtype=np.intp)], x, y)
+
+    def visited(self, index=None):
+        return super().visited(self.episode[index])
+
+
+class BatchedSimulation(Simulation):
+    """
+    Simule E épisodes (dispositions de nourriture) ensemble.
+
+    Les fourmis des E colonies sont rangées dans une seule AntPopulation
+    (épisode par épisode) ; chaque pas de `update` traite toutes les colonies
+    en quelques opérations NumPy, avec les règles de `Simulation` : la fourmi
+    i de chaque épisode est pilotée par le réseau i, et la fitness de chaque
+    épisode est celle qu'obtiendrait une `Simulation` de même graine.
+    """
+
+    def __init__(self, width, height, num_ants, num_food, seeds, timer=NULL_TIMER,
+                 shared_exploration=False, termination=('dead',), max_idle_time=50, scenarios=None,
+                 **env_options):
+        """
+        :param seeds: Graines des dispositions de nourriture, une par épisode.
+        :param scenarios: Mondes générés (scenario.Scenario), un par épisode (optionnel).
+        :param env_options: Options transmises à l'`Environment` de chaque épisode (grille dense).
+        """
+        scenarios = scenarios or [None] * len(seeds)
+        simulations = [Simulation(width, height, num_ants, num_food, seed=seed, termination=termination,
+                                  max_idle_time=max_idle_time, scenario=scenario, **env_options)
+                       for seed, scenario in zip(seeds, scenarios)]
+        first = simulations[0]
+        self.timer = timer
+        self.termination = first.termination
+        self.num_envs = len(simulations)
+        self.num_ants = num_ants  # Fourmis par épisode
+        self.env = BatchedEnvironment([sim.env for sim in simulations])
+
+        self.colony_pos = first.colony_pos
+        self.colony_radius = first.colony_radius
+        self.num_food = first.num_food
+        self.max_idle_time = first.max_idle_time
+        self.x_min, self.x_max = first.x_min, first.x_max
+        self.y_min, self.y_max = first.y_min, first.y_max
+
+        self.ants = AntPopulation(self.num_envs * num_ants, self.colony_pos[0], self.colony_pos[1], self.env)
+        self.ants.episode = np.repeat(np.arange(self.num_envs), num_ants)
+        if shared_exploration:
+            self.ants.visits = EpisodeVisitMap(width, height, self.ants.episode, self.num_envs)
+
+        self.total_food_collected = np.zeros(self.num_envs, dtype=np.int64)
+        self.steps_run = np.zeros(self.num_envs, dtype=np.int64)
+        self.termination_reason = [None] * self.num_envs
+        self.done = np.zeros(self.num_envs, dtype=bool)  # Épisodes terminés (figés)
+
+    def food_collected(self, idx):
+        """Nourriture collectée par la colonie de chaque fourmi d'indices `idx`."""
+        ants = self.ants
+        self.total_food_collected = np.bincount(ants.episode[ants.has_food], minlength=self.num_envs)
+        return self.total_food_collected[ants.episode[idx]]
+
+    def update(self, networks):
+        """
+        Un pas de toutes les colonies dont l'épisode n'est pas terminé.
+
+        :param networks: BatchNetwork, ou liste de tuples (génome, réseau) ; la fourmi
+            i de chaque épisode utilise le réseau i. La fitness est cumulée dans
+            `ants.fitness` (voir `episode_fitness`).
+        """
+        timer = self.timer
+        ants = self.ants
+        with timer.phase('step'):
+            idx = ants.alive()
+            slot = idx % self.num_ants  # Indice de la fourmi (et du réseau) dans son épisode
+            keep = ~self.done[ants.episode[idx]] & (slot < len(networks))
+            idx, slot = idx[keep], slot[keep]
+
+            if len(idx) > 0:
+                episodes = ants.episode[idx]
+                with timer.phase('sense'):
+                    neighbours = EpisodeNeighbourGrid(ants.pos, ants.episode, self.env.width, self.env.height)
+                    inputs = ants.get_inputs(self.env, idx, neighbours)
+                with timer.phase('activate'):
+                    if isinstance(networks, BatchNetwork):
+                        # Un jeu d'entrées par épisode pour tous les réseaux à la fois
+                        batch = np.zeros((self.num_envs, len(networks), NUM_INPUTS))
+                        batch[episodes, slot] = inputs
+                        outputs = networks.activate(batch)[episodes, slot]
+                    else:
+                        outputs = np.array([networks[i][1].activate(x) for i, x in zip(slot, inputs.tolist())])
+                fitness = self.apply_outputs(idx, outputs)
+                ants.update_idle_time()
+
+                ants.fitness[idx] += fitness
+                timer.count('ant_steps', len(idx))
+                timer.count('activations', len(idx))
+
+            with timer.phase('evaporate'):
+                self.env.pheromone_system.evaporate()
+                self.env.pheromone_system.build_integral()
+
+    def check_termination(self):
+        """Condition d'arrêt atteinte par chaque épisode (None si aucune)."""
+        ants = self.ants
+        E = self.num_envs
+        reached = {}
+        if 'dead' in self.termination:
+            reached['dead'] = np.bincount(ants.episode[ants.is_dead], minlength=E) == self.num_ants
+        if 'food' in self.termination:
+            remaining = np.bincount(self.env.food_keys // (self.env.width * self.env.height), minlength=E)
+            carried = np.bincount(ants.episode[ants.has_food], minlength=E)
+            reached['food'] = (remaining == 0) & (carried == 0)
+        if 'idle' in self.termination:
+            alive = ~ants.is_dead
+            busy = alive & (ants.idle_time <= self.max_idle_time)
+            reached['idle'] = ((np.bincount(ants.episode[alive], minlength=E) > 0)
+                               & (np.bincount(ants.episode[busy], minlength=E) == 0))
+        reasons = [None] * E
+        for condition in TERMINATION_CONDITIONS:  # Même priorité que Simulation.check_termination
+            for e in np.flatnonzero(reached.get(condition, np.zeros(E, dtype=bool))):
+                reasons[e] = reasons[e] or condition
+        return reasons
+
+    def step(self, networks):
+        """Un pas de simulation ; renvoie False quand tous les épisodes sont terminés."""
+        self.update(networks)
+        self.steps_run[~self.done] += 1
+        for e, reason in enumerate(self.check_termination()):
+            if reason is not None and not self.done[e]:
+                self.termination_reason[e] = reason
+                self.done[e] = True
+        return not self.done.all()
+
+    def episode_fitness(self):
+        """Fitness cumulée de chaque fourmi, tableau (épisodes, fourmis par épisode)."""
+        return self.ants.fitness.reshape(self.num_envs, self.num_ants)
@@ -0,0 +1,256 @@
+"""
+Banc d'essai reproductible des chemins critiques de la simulation.
+
+Chaque mesure est graine fixée et utilise des réseaux factices (StubNetwork),
+de sorte que les résultats ne dépendent pas du hasard de NEAT. Les résultats
+sont écrits en JSON ; `--compare` signale les régressions par rapport à une
+référence enregistrée.
+
+Exemples :
+    python bench.py --output baseline.json
+    python bench.py --compare baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Rendu hors écran
+
+import numpy as np
+
+from colony import NUM_INPUTS
+from network import BatchNetwork
+from simulation import Environment, Simulation
+
+NUM_OUTPUTS = 4
+SIZES = (50, 100, 200)  # Tailles de monde (côté de la grille)
+ANT_COUNTS = (50, 200)  # Nombres de fourmis
+
+
+class StubNetwork(BatchNetwork):
+    """
+    Réseaux factices déterministes : pour chaque génome, une projection linéaire
+    aléatoire (graine fixée) des entrées bornées, saturée à [-1, 1] comme les
+    sorties de NEAT. Chaque génome a ses propres poids, de sorte que des fourmis
+    aux entrées identiques (au départ de la colonie) se dispersent.
+    """
+
+    def __init__(self, size, seed=0):
+        rng = np.random.default_rng(seed)
+        self.genomes = [SimpleNamespace(fitness=0.0) for _ in range(size)]
+        self.num_inputs = NUM_INPUTS
+        self.num_outputs = NUM_OUTPUTS
+        self.weights = rng.normal(0.0, 1.0, (size, NUM_INPUTS, NUM_OUTPUTS))
+        self.bias = rng.normal(0.0, 1.0, (size, NUM_OUTPUTS))
+
+    def activate(self, inputs, rows=None):
+        inputs = np.asarray(inputs, dtype=float)
+        rows = np.arange(len(self.genomes)) if rows is None else np.asarray(rows, dtype=np.intp)
+        bounded = inputs / (1.0 + np.abs(inputs))  # Entrées ramenées dans ]-1, 1[
+        z = np.einsum('...ni,nio->...no', bounded, self.weights[rows]) + self.bias[rows]
+        return np.clip(2.0 * z, -1.0, 1.0)
+
+
+def seed_all(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def num_food_for(size):
+    """Quantité de nourriture : celle de l'entraînement (12), croissante avec la surface."""
+    return max(12, size * size // 200)
+
+
+def make_simulation(size, num_ants, seed):
+    seed_all(seed)
+    return Simulation(size, size, num_ants, num_food_for(size), seed=seed)
+
+
+def warm_up(sim, networks, steps):
+    """Fait avancer la simulation pour mesurer un état réaliste (phéromones, déplacements)."""
+    for _ in range(steps):
+        sim.update(networks)
+
+
+def time_call(function, repeat, number=1, setup=None):
+    """
+    Durée (secondes) de `number` appels de `function`, répétée `repeat` fois.
+
+    `setup` est appelé hors chronométrage avant chaque répétition et son
+    résultat est passé à `function`.
+    """
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        for _ in range(number):
+            function(state)
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+# --- Cas mesurés ---
+
+def bench_update(size, num_ants, repeat, seed):
+    sim = make_simulation(size, num_ants, seed)
+    networks = StubNetwork(num_ants, seed)
+    warm_up(sim, networks, 5)
+    return time_call(lambda _: sim.update(networks), repeat, number=5)
+
+
+def bench_get_inputs(size, num_ants, repeat, seed):
+    sim = make_simulation(size, num_ants, seed)
+    warm_up(sim, StubNetwork(num_ants, seed), 5)
+    return time_call(lambda _: sim.ants.get_inputs(sim.env), repeat, number=5)
+
+
+def bench_ant_get_inputs(size, num_ants, repeat, seed):
+    """API par fourmi (`Ant.get_inputs`), une fourmi après l'autre."""
+    sim = make_simulation(size, num_ants, seed)
+    warm_up(sim, StubNetwork(num_ants, seed), 5)
+    ants = list(sim.ants)
+    return time_call(lambda _: [ant.get_inputs(sim.env) for ant in ants], repeat)
+
+
+def bench_closest_food(size, num_ants, repeat, seed):
+    sim = make_simulation(size, num_ants, seed)
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(0, size, (num_ants, 2))
+    return time_call(lambda _: sim.env.closest_food_direction(positions, sim.ants.search_radius),
+                     repeat, number=5)
+
+
+def bench_evaporate(size, num_ants, repeat, seed):
+    sim = make_simulation(size, num_ants, seed)
+    warm_up(sim, StubNetwork(num_ants, seed), 10)
+    return time_call(lambda _: sim.env.pheromone_system.evaporate(), repeat, number=10)
+
+
+def bench_deposit(size, num_ants, repeat, seed):
+    """Dépôts de phéromones d'un pas, toutes les fourmis déposant."""
+    sim = make_simulation(size, num_ants, seed)
+    rng = np.random.default_rng(seed)
+    sim.ants.pos[:] = rng.integers(0, size, (num_ants, 2))
+    idx = np.arange(num_ants)
+    types = rng.integers(-1, 2, num_ants)
+    amounts = rng.choice([-10, 10], num_ants)
+    return time_call(lambda _: sim.deposit_pheromones(idx, types, amounts), repeat, number=10)
+
+
+def bench_generate_food(size, num_ants, repeat, seed):
+    def setup():
+        return Environment(size, size), random.Random(seed)
+
+    return time_call(lambda state: state[0].generate_food(num_food_for(size), state[1]), repeat, setup=setup)
+
+
+def bench_draw_grid(size, num_ants, repeat, seed):
+    import pygame  # Seul ce cas dessine : les autres mesures ne chargent pas pygame
+
+    pygame.init()
+    sim = make_simulation(size, num_ants, seed)
+    warm_up(sim, StubNetwork(num_ants, seed), 10)
+    screen = pygame.Surface((size * 10, size * 10))  # Surface hors écran
+    return time_call(lambda _: sim.env.draw_grid(screen, full=True), repeat)
+
+
+BENCHMARKS = {
+    'update': bench_update,
+    'get_inputs': bench_get_inputs,
+    'ant_get_inputs': bench_ant_get_inputs,
+    'closest_food_direction': bench_closest_food,
+    'evaporate': bench_evaporate,
+    'deposit': bench_deposit,
+    'generate_food': bench_generate_food,
+    'draw_grid': bench_draw_grid,
+}
+
+
+def run_benchmarks(names=None, sizes=SIZES, ant_counts=ANT_COUNTS, repeat=5, seed=0):
+    """
+    Exécute les cas demandés.
+
+    Returns:
+        dict: {'meta': ..., 'results': {"nom/size=S/ants=N": statistiques}}.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        for size in sizes:
+            for num_ants in ant_counts:
+                timings = BENCHMARKS[name](size, num_ants, repeat, seed)
+                key = f'{name}/size={size}/ants={num_ants}'
+                results[key] = {
+                    'min': min(timings),
+                    'median': float(np.median(timings)),
+                    'mean': float(np.mean(timings)),
+                    'repeat': repeat,
+                }
+                print(f'{key:45s} {results[key]["median"] * 1e3:10.3f} ms')
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=0.10, statistic='min'):
+    """
+    Compare deux résultats JSON.
+
+    Returns:
+        list: tuples (cas, référence, actuel, ratio) des cas plus lents que
+        la référence de plus de `threshold` (fraction).
+    """
+    regressions = []
+    for key, stats in current['results'].items():
+        reference = baseline['results'].get(key)
+        if reference is None:
+            continue
+        ratio = stats[statistic] / reference[statistic] if reference[statistic] > 0 else float('inf')
+        flag = 'REGRESSION' if ratio > 1 + threshold else ('amélioration' if ratio < 1 - threshold else '')
+        print(f'{key:45s} {reference[statistic] * 1e3:10.3f} -> {stats[statistic] * 1e3:10.3f} ms '
+              f'({ratio:5.2f}x) {flag}')
+        if ratio > 1 + threshold:
+            regressions.append((key, reference[statistic], stats[statistic], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bench', nargs='+', choices=sorted(BENCHMARKS), help='cas à mesurer (tous par défaut)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='tailles de monde')
+    parser.add_argument('--ants', nargs='+', type=int, default=ANT_COUNTS, help='nombres de fourmis')
+    parser.add_argument('--repeat', type=int, default=5, help='répétitions par cas')
+    parser.add_argument('--seed', type=int, default=0, help='graine des scénarios et des réseaux factices')
+    parser.add_argument('--output', help='fichier JSON des résultats')
+    parser.add_argument('--compare', metavar='BASELINE', help='fichier JSON de référence')
+    parser.add_argument('--threshold', type=float, default=0.10, help='ralentissement toléré (fraction)')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.bench, args.sizes, args.ants, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} régression(s) au-delà de {args.threshold:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import glob
+import gzip
+import os
+import pickle
+import random
+import re
+import threading
+import time
+from itertools import count
+
+import neat
+import numpy as np
+
+
+class AsyncCheckpointer(neat.reporting.BaseReporter):
+    """
+    Sauvegarde périodique de l'entraînement (toutes les N générations ou N secondes).
+
+    L'état est sérialisé sur le fil principal (copie cohérente), puis compressé
+    et écrit sur disque dans un fil séparé pour ne pas bloquer l'entraînement.
+    L'écriture est atomique : fichier temporaire puis `os.replace`.
+
+    Le fichier `<prefix><N>` contient l'état au début de la génération N :
+    population, espèces, état de la reproduction et des générateurs aléatoires.
+    Après chaque écriture réussie, seules les `keep` sauvegardes les plus
+    récentes du préfixe sont conservées.
+    """
+
+    def __init__(self, population, generation_interval=100, time_interval_seconds=None,
+                 filename_prefix='neat-checkpoint-', compresslevel=5, keep=None):
+        """
+        Args:
+            population: neat.Population entraînée (pour l'état de la reproduction)
+            generation_interval: Générations entre deux sauvegardes (None = désactivé)
+            time_interval_seconds: Secondes entre deux sauvegardes (None = désactivé)
+            filename_prefix: Préfixe des fichiers ; le numéro de génération est ajouté
+            compresslevel: Niveau de compression gzip
+            keep: Nombre de sauvegardes conservées (None = toutes)
+        """
+        self.population = population
+        self.generation_interval = generation_interval
+        self.time_interval_seconds = time_interval_seconds
+        self.filename_prefix = filename_prefix
+        self.compresslevel = compresslevel
+        self.keep = keep
+
+        self.current_generation = None
+        self.last_generation_checkpoint = population.generation
+        self.last_time_checkpoint = time.time()
+        self.writer = None  # Fil d'écriture en cours
+
+    def start_generation(self, generation):
+        self.current_generation = generation
+
+    def end_generation(self, config, population, species_set):
+        # La population reçue est déjà celle de la génération suivante
+        next_generation = self.current_generation + 1
+        due = (self.time_interval_seconds is not None
+               and time.time() - self.last_time_checkpoint >= self.time_interval_seconds)
+        due = due or (self.generation_interval is not None
+                      and next_generation - self.last_generation_checkpoint >= self.generation_interval)
+        if due:
+            self.save_checkpoint(config, population, species_set, next_generation)
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        """Sérialise l'état courant puis l'écrit en arrière-plan."""
+        reproduction = self.population.reproduction
+        # Valeur suivante du compteur d'identifiants de génomes (itertools.count non sérialisé)
+        next_genome_key = next(reproduction.genome_indexer)
+        reproduction.genome_indexer = count(next_genome_key)
+
+        # Les reporters (fils, fichiers) ne font pas partie de l'état sauvegardé
+        reporters, species_set.reporters = species_set.reporters, None
+        try:
+            data = pickle.dumps({
+                'generation': generation,
+                'config': config,
+                'population': population,
+                'species_set': species_set,
+                'next_genome_key': next_genome_key,
+                'ancestors': reproduction.ancestors,
+                'random_state': random.getstate(),
+                'numpy_random_state': np.random.get_state(),
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            species_set.reporters = reporters
+
+        self.wait()  # Une seule écriture à la fois
+        filename = f'{self.filename_prefix}{generation}'
+        self.writer = threading.Thread(target=self._write, args=(filename, data), daemon=True)
+        self.writer.start()
+
+        self.last_generation_checkpoint = generation
+        self.last_time_checkpoint = time.time()
+
+    def _write(self, filename, data):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f'{filename}.tmp'
+        with gzip.open(tmp, 'wb', compresslevel=self.compresslevel) as f:
+            f.write(data)
+        os.replace(tmp, filename)
+        if self.keep:
+            self.prune(filename)
+
+    def prune(self, current):
+        """Supprime les sauvegardes du préfixe au-delà des `keep` plus récentes (sauf `current`)."""
+        for _, path in list_checkpoints(self.filename_prefix)[:-self.keep]:
+            if path != current:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def wait(self):
+        """Attend la fin de l'écriture en cours."""
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+
+def list_checkpoints(filename_prefix='neat-checkpoint-'):
+    """Sauvegardes de ce préfixe, [(génération, chemin)] par génération croissante."""
+    pattern = re.compile(re.escape(os.path.basename(filename_prefix)) + r'(\d+)$')
+    found = []
+    for path in glob.glob(glob.escape(filename_prefix) + '*'):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            found.append((int(match.group(1)), path))
+    return sorted(found)
+
+
+def latest_checkpoint(filename_prefix='neat-checkpoint-'):
+    """Chemin de la sauvegarde la plus récente pour ce préfixe, ou None."""
+    found = list_checkpoints(filename_prefix)
+    return found[-1][1] if found else None
+
+
+def restore_checkpoint(filename, config=None):
+    """
+    Reprend l'entraînement depuis une sauvegarde, sans rejouer de génération.
+
+    Args:
+        config: Configuration à utiliser (celle de la sauvegarde par défaut)
+
+    Returns:
+        neat.Population: population prête à reprendre à la génération sauvegardée.
+    """
+    with gzip.open(filename, 'rb') as f:
+        state = pickle.load(f)
+
+    random.setstate(state['random_state'])
+    np.random.set_state(state['numpy_random_state'])
+
+    population = neat.Population(config or state['config'],
+                                 (state['population'], state['species_set'], state['generation']))
+    population.species.reporters = population.reporters
+    population.reproduction.genome_indexer = count(state['next_genome_key'])
+    population.reproduction.ancestors = state['ancestors']
+    return population
@@ -1,31 +1,436 @@
 import numpy as np
-from icecream import ic
+
+from world import make_layer
+
+NUM_INPUTS = 15  # Taille du vecteur d'entrées du réseau NEAT
+DIRECT_NEIGHBOURS_LIMIT = 16  # Fourmis au-delà desquelles get_inputs construit un NeighbourGrid
+DENSE_VISITS_LIMIT = 64 * 2 ** 20  # Octets au-delà desquels les cartes de visites par fourmi sont creuses
+
+
+def as_population(ants, idx=None):
+    """
+    Normalise un argument (fourmi isolée ou population) en couple (population, indices).
+
+    Permet aux méthodes vectorisées de l'environnement d'accepter aussi une seule
+    fourmi, comme l'ancienne API par instance.
+    """
+    if isinstance(ants, Ant):
+        return ants.population, np.array([ants.index], dtype=np.intp)
+    if idx is None:
+        return ants, np.arange(len(ants), dtype=np.intp)
+    return ants, np.asarray(idx, dtype=np.intp)
+
+
+def _square_offsets(radius):
+    """Décalages (dx, dy) des cellules à distance de Tchebychev <= `radius` (cellule courante comprise)."""
+    steps = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(steps, steps, indexing='ij')
+    return np.column_stack((dx.ravel(), dy.ravel()))
+
+
+def _pair_distances(a, b):
+    """Distances euclidiennes, calculées comme `np.linalg.norm(..., axis=-1)`."""
+    d = a - b
+    return np.sqrt(np.sum(d * d, axis=-1))
+
+
+def closest_positions(positions, idx, k=3):
+    """
+    Positions des k plus proches voisins des fourmis `idx`, par calcul direct
+    des distances (O(len(idx) * N)) : pour quelques fourmis, moins coûteux que
+    de construire un NeighbourGrid. Mêmes résultats, égalités comprises.
+    """
+    idx = np.asarray(idx, dtype=np.intp)
+    distances = _pair_distances(positions[None, :, :], positions[idx][:, None, :])
+    distances[np.arange(len(idx)), idx] = np.inf  # Exclure la fourmi elle-même
+    order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    result = np.zeros((len(idx), k, 2))
+    found = np.take_along_axis(distances, order, axis=1) < np.inf
+    result[:, :order.shape[1]][found] = positions[order[found]]
+    return result
+
+
+class NeighbourGrid:
+    """
+    Index spatial (hachage sur grille uniforme) des positions des fourmis.
+
+    Construit une fois par pas de simulation ; `query` renvoie les k plus proches
+    voisins de plusieurs fourmis en un seul appel. Les égalités de distance sont
+    départagées par l'indice de la fourmi, comme un `argsort` stable.
+    """
+
+    def __init__(self, positions, cell_size=None, k=3):
+        """
+        Args:
+            cell_size: Côté des cellules ; par défaut, choisi pour qu'une cellule
+                contienne environ `k` fourmis (au moins 4)
+        """
+        self.positions = positions
+        if cell_size is None:
+            extent = np.ptp(positions, axis=0) + 1.0 if len(positions) else np.ones(2)
+            cell_size = max(4.0, np.sqrt(k * extent[0] * extent[1] / max(len(positions), 1)))
+        self.cell_size = float(cell_size)
+
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0) if len(cells) else np.zeros(2, dtype=np.int64)
+        self.cells = cells - self.origin
+        self.shape = self.cells.max(axis=0) + 1 if len(cells) else np.ones(2, dtype=np.int64)
+        self.max_radius = int(self.shape.max())  # Au-delà, la recherche couvre toutes les cellules
+
+        # Tri des fourmis par cellule (tri par comptage sur la clé de cellule)
+        keys = self._keys(self.cells)
+        self.order = np.argsort(keys, kind='stable')
+        self.starts = np.searchsorted(keys[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def _keys(self, cells):
+        return cells[..., 1] * self.shape[0] + cells[..., 0]
+
+    def query(self, idx, k=3):
+        """
+        Indices des k plus proches voisins des fourmis d'indices `idx`.
+
+        La recherche porte sur les cellules à distance `radius` (en cellules) de
+        chaque fourmi. Tout voisin hors de ce carré est à plus de
+        radius * cell_size : le résultat est exact dès que le k-ième voisin
+        trouvé est plus proche. Sinon le rayon double, pour les seules fourmis
+        concernées.
+
+        Returns:
+            np.ndarray: tableau (len(idx), k), complété par -1 s'il manque des voisins.
+        """
+        idx = np.asarray(idx, dtype=np.intp)
+        result = np.full((len(idx), k), -1, dtype=np.intp)
+        pending = np.arange(len(idx))
+        radius = 1
+        while len(pending) > 0:
+            found, kth = self._search(idx[pending], k, radius)
+            done = (kth <= radius * self.cell_size) | (radius >= self.max_radius)
+            result[pending[done]] = found[done]
+            pending = pending[~done]
+            radius *= 2
+        return result
+
+    def _search(self, idx, k, radius):
+        """
+        k plus proches voisins parmi les fourmis des cellules à distance <= `radius`.
+
+        Returns:
+            tuple: (voisins (len(idx), k) complétés par -1, distance du k-ième voisin ou inf)
+        """
+        result = np.full((len(idx), k), -1, dtype=np.intp)
+        kth = np.full(len(idx), np.inf)
+
+        neighbour_cells = self.cells[idx][:, None, :] + _square_offsets(radius)
+        valid = np.all((neighbour_cells >= 0) & (neighbour_cells < self.shape), axis=-1)
+        keys = np.where(valid, self._keys(neighbour_cells), 0)
+        start = self.starts[keys]
+        count = np.where(valid, self.starts[keys + 1] - start, 0).ravel()
+
+        query_rank = np.repeat(np.arange(len(idx)), count.reshape(len(idx), -1).sum(axis=1))
+        segment_base = np.repeat(start.ravel() - (np.cumsum(count) - count), count)
+        candidates = self.order[segment_base + np.arange(count.sum())]
+
+        # Exclure la fourmi elle-même
+        others = candidates != idx[query_rank]
+        query_rank, candidates = query_rank[others], candidates[others]
+        distances = _pair_distances(self.positions[candidates], self.positions[idx[query_rank]])
+
+        # Tri par (fourmi, distance, indice) puis rang dans chaque groupe
+        order = np.lexsort((candidates, distances, query_rank))
+        query_rank, candidates, distances = query_rank[order], candidates[order], distances[order]
+        group_start = np.searchsorted(query_rank, np.arange(len(idx)))
+        rank = np.arange(len(query_rank)) - group_start[query_rank]
+        kept = rank < k
+        result[query_rank[kept], rank[kept]] = candidates[kept]
+        last = kept & (rank == k - 1)
+        kth[query_rank[last]] = distances[last]
+        return result, kth
+
+    def closest_positions(self, idx, k=3):
+        """Positions des k plus proches voisins, complétées par des zéros."""
+        neighbours = self.query(idx, k)
+        positions = self.positions[np.maximum(neighbours, 0)]
+        positions[neighbours < 0] = 0.0
+        return positions
+
+
+class VisitMap:
+    """
+    Cellules déjà visitées, une carte par fourmi (`num_ants` donné) ou une
+    carte commune à la colonie (`num_ants=None`).
+
+    Deux stockages :
+        - dense : bits (8 cellules par octet), H * ceil(W / 8) octets par carte,
+          quelle que soit la durée de l'épisode ; avec `tile_size`, seules les
+          tuiles visitées sont allouées (voir `world.TiledArray`) ;
+        - creux : index trié des cellules visitées (8 octets par visite), borné
+          par le nombre de pas multiplié par le nombre de fourmis.
+    Par défaut, les cartes par fourmi sont creuses dès que le stockage dense
+    dépasserait `DENSE_VISITS_LIMIT` (2000 x 2000 cellules et 1000 fourmis
+    occuperaient environ 500 Mo en bits).
+    """
+
+    def __init__(self, width, height, num_ants=None, tile_size=None, directory=None, sparse=None):
+        """
+        Args:
+            sparse: Index trié plutôt que bits (None = choisi selon `DENSE_VISITS_LIMIT`)
+        """
+        self.width = width
+        self.height = height
+        self.shared = num_ants is None
+        self.bytes_per_row = -(-width // 8)
+        shape = (height, self.bytes_per_row) + (() if self.shared else (num_ants,))
+        if sparse is None:
+            sparse = int(np.prod(shape, dtype=np.int64)) > DENSE_VISITS_LIMIT and not self.shared
+        self.sparse = sparse
+        self.keys = np.zeros(0, dtype=np.int64)  # Cellules visitées (stockage creux), triées
+        self.bits = None  # [y, x // 8, fourmi] (stockage dense)
+        if not sparse:
+            self.bits = make_layer(shape, np.uint8, tile_size, directory, 'visits')
+
+    def mark(self, idx, x, y):
+        """
+        Marque la cellule (x, y) de chaque fourmi d'indice `idx` comme visitée.
+
+        Returns:
+            np.ndarray: booléens alignés sur `idx`, vrais pour une première visite.
+            Sur une carte commune, seule la première fourmi (dans l'ordre de `idx`)
+            arrivée sur une nouvelle cellule est comptée.
+        """
+        idx = np.asarray(idx, dtype=np.int64)
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        row = y if self.shared else idx * self.height + y
+        cells = row * (self.bytes_per_row * 8) + x
+
+        unique, first = np.unique(cells, return_index=True)
+        if self.sparse:
+            position = np.searchsorted(self.keys, unique)
+            seen = position < len(self.keys)
+            seen[seen] = self.keys[position[seen]] == unique[seen]
+            self.keys = np.insert(self.keys, position[~seen], unique[~seen])
+            fresh = np.zeros(len(cells), dtype=bool)
+            fresh[first] = ~seen
+            return fresh
+
+        bit = np.left_shift(1, unique & 7).astype(np.uint8)
+        # Octets concernés, et masque de toutes les nouvelles cellules de chaque octet
+        byte_keys, inverse = np.unique(unique >> 3, return_inverse=True)
+        masks = np.bincount(inverse, weights=bit, minlength=len(byte_keys)).astype(np.uint8)
+
+        rows, cols = np.divmod(byte_keys, self.bytes_per_row)
+        key = (rows, cols) if self.shared else (rows % self.height, cols, rows // self.height)
+        current = np.asarray(self.bits[key])
+        self.bits[key] = current | masks
+
+        fresh = np.zeros(len(cells), dtype=bool)
+        fresh[first] = (current[inverse] & bit) == 0
+        return fresh
+
+    def visited(self, index=None):
+        """Masque (height, width) des cellules visitées par la fourmi `index` (ou la colonie)."""
+        if self.sparse:
+            row_width = self.bytes_per_row * 8
+            start = (0 if self.shared else index * self.height) * row_width
+            lo, hi = np.searchsorted(self.keys, [start, start + self.height * row_width])
+            keys = self.keys[lo:hi]
+            mask = np.zeros((self.height, self.width), dtype=bool)
+            ys, xs = np.divmod(keys - start, row_width)
+            mask[ys, xs] = True
+            return mask
+        bits = self.bits[:, :] if self.shared else self.bits[:, :, index]
+        return np.unpackbits(np.asarray(bits), axis=1, bitorder='little')[:, :self.width].astype(bool)
+
+
+# Stockage de la colonie sous forme de tableaux contigus (structure-of-arrays)
+class AntPopulation:
+
+    def __init__(self, size, x, y, env, shared_visits=False):
+        """
+        Args:
+            shared_visits: Exploration suivie à l'échelle de la colonie (une seule carte
+                de visites) plutôt que par fourmi
+        """
+        self.size = size
+        self.env = env
+        self.pos = np.tile([float(x), float(y)], (size, 1))  # Positions [x, y]
+        self.old_pos = np.full((size, 2), np.nan)  # Positions arrondies avant déplacement
+        self.has_food = np.zeros(size, dtype=bool)
+        self.is_dead = np.zeros(size, dtype=bool)
+        self.idle_time = np.zeros(size, dtype=np.int64)  # Temps d'inactivité
+        self.fitness = np.zeros(size)  # Fitness cumulée pour NEAT
+        self.deposit_pheromone = np.zeros(size, dtype=bool)
+        self.pheromone_type = np.zeros(size, dtype=np.int64)  # Type de phéromones choisi
+        self.pickup_location = np.full((size, 2), -1, dtype=np.int64)
+        self.inputs = np.zeros((size, NUM_INPUTS))
+        # Cellules explorées (bits), stockées comme les couches de l'environnement
+        self.visits = VisitMap(env.width, env.height, None if shared_visits else size,
+                               env.tile_size, env.storage_dir)
+        self.radius = 5  # rayon de perception des pheromones
+        self.search_radius = 15  # Rayon de recherche limité
+        # Compteurs de la colonie, mis à jour uniquement lors des transitions
+        self.food_carried = 0  # Fourmis portant de la nourriture
+        self.food_delivered = 0  # Nourriture rapportée à la colonie
+        self.num_dead = 0  # Fourmis mortes
+        self.episode = None  # Épisode de chaque fourmi (simulation batchée uniquement)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not -self.size <= index < self.size:
+            raise IndexError(index)
+        return Ant.view(self, index % self.size)
+
+    def __iter__(self):
+        return (Ant.view(self, i) for i in range(self.size))
+
+    def alive(self):
+        """Indices des fourmis vivantes."""
+        return np.flatnonzero(~self.is_dead)
+
+    def set_has_food(self, idx, value=True):
+        """Modifie `has_food` des fourmis d'indices `idx` en tenant à jour `food_carried`."""
+        idx = np.unique(np.asarray(idx, dtype=np.intp))
+        changed = idx[self.has_food[idx] != value]
+        self.has_food[changed] = value
+        self.food_carried += len(changed) if value else -len(changed)
+        return changed
+
+    def deliver(self, idx):
+        """Dépose la nourriture des fourmis d'indices `idx` à la colonie."""
+        self.food_delivered += len(self.set_has_food(idx, False))
+
+    def set_dead(self, idx, value=True):
+        """Modifie `is_dead` des fourmis d'indices `idx` en tenant à jour `num_dead`."""
+        idx = np.unique(np.asarray(idx, dtype=np.intp))
+        changed = idx[self.is_dead[idx] != value]
+        self.is_dead[changed] = value
+        self.num_dead += len(changed) if value else -len(changed)
+        return changed
+
+    def update_idle_time(self):
+        """Met à jour le temps d'inactivité de toutes les fourmis en une passe."""
+        idle = ~self.has_food & ~self.is_dead
+        self.idle_time = np.where(idle, self.idle_time + 1, 0)
+
+    def get_inputs(self, env, idx=None, neighbours=None):
+        """
+        Calcule les entrées du réseau pour les fourmis d'indices `idx`.
+
+        Args:
+            neighbours: NeighbourGrid construit pour ce pas (sinon, distances calculées
+                directement pour quelques fourmis, ou grille créée à la volée)
+
+        Returns:
+            np.ndarray: tableau (len(idx), NUM_INPUTS), une ligne par fourmi.
+        """
+        _, idx = as_population(self, idx)
+        if neighbours is None and len(idx) > DIRECT_NEIGHBOURS_LIMIT:
+            neighbours = NeighbourGrid(self.pos)
+
+        pos = self.pos[idx]
+        colony_center = np.array([env.width / 2, env.height / 2])
+
+        inputs = np.empty((len(idx), NUM_INPUTS))
+        inputs[:, 0:2] = pos  # Position actuelle
+        closest = (closest_positions(self.pos, idx) if neighbours is None
+                   else neighbours.closest_positions(idx))
+        inputs[:, 2:8] = closest.reshape(len(idx), 6)  # 3 fourmis les plus proches
+        inputs[:, 8] = self.has_food[idx]  # Si la fourmi transporte de la nourriture
+        inputs[:, 9] = np.linalg.norm(pos - colony_center, axis=1)  # Distance par rapport à la colonie
+        episodes = None if self.episode is None else self.episode[idx]
+        inputs[:, 10:12] = env.closest_food_direction(pos, self.search_radius, episodes=episodes)  # Nourriture proche
+        cells = np.trunc(pos).astype(np.int64)
+        inputs[:, 12:] = env.pheromone_system.window_sums(cells[:, 0], cells[:, 1], self.radius,
+                                                          episodes=episodes)  # Phéromones
+
+        self.inputs[idx] = inputs
+        return inputs
+
+
+def _field(name):
+    """Propriété qui lit/écrit la case `index` du tableau `name` de la population."""
+    def fget(self):
+        return getattr(self.population, name)[self.index]
+
+    def fset(self, value):
+        getattr(self.population, name)[self.index] = value
+
+    return property(fget, fset)
+
+
+def _counted(name, setter):
+    """Propriété booléenne dont l'écriture passe par `setter` (compteurs de la population)."""
+    def fget(self):
+        return getattr(self.population, name)[self.index]
+
+    def fset(self, value):
+        getattr(self.population, setter)([self.index], bool(value))
+
+    return property(fget, fset)
+
+
+def _shared(name):
+    """Propriété qui lit/écrit un attribut scalaire commun à toute la population."""
+    def fget(self):
+        return getattr(self.population, name)
+
+    def fset(self, value):
+        setattr(self.population, name, value)
+
+    return property(fget, fset)
+
 
 # Define ant behavor
 class Ant:
-    
+    """Vue sur une fourmi d'une AntPopulation (API historique par instance)."""
+
+    pos = _field('pos')
+    old_pos = _field('old_pos')
+    has_food = _counted('has_food', 'set_has_food')
+    is_dead = _counted('is_dead', 'set_dead')
+    idle_time = _field('idle_time')
+    fitness = _field('fitness')
+    deposit_pheromone = _field('deposit_pheromone')
+    pheromone_type = _field('pheromone_type')
+    type = _field('pheromone_type')
+    pickup_location = _field('pickup_location')
+    inputs = _field('inputs')
+    radius = _shared('radius')
+    search_radius = _shared('search_radius')
+    env = _shared('env')
+
     def __init__(self, x, y, env):
-        self.pos = np.array([float(x), float(y)])
-        self.old_pos = np.array([None, None])
-        self.update_vec_director = None
-        self.visited_positions = set()  # Positions explorées
-        self.has_food = False
-        self.is_dead = False
-        self.fitness = 0  # Fitness pour NEAT
-        self.type = None,
-        self.deposit_pheromone = False
-        self.pheromone_type = None
-        self.surrounding_pheromones = None
-        self.inputs = []
-        self.radius = 5 # rayon de perception des pheromones
-        self.search_radius = 15  # Rayon de recherche limité
-        self.pickup_location = tuple
-        self.idle_time = 0 # Temps d'inactivité
-        self.env = env
+        # Une fourmi isolée est une population de taille 1
+        self.population = AntPopulation(1, x, y, env)
+        self.index = 0
+
+    @classmethod
+    def view(cls, population, index):
+        """Crée une vue sur la fourmi `index` sans copier ses données."""
+        ant = cls.__new__(cls)
+        ant.population = population
+        ant.index = index
+        return ant
+
+    def __eq__(self, other):
+        if not isinstance(other, Ant):
+            return NotImplemented
+        return self.population is other.population and self.index == other.index
 
-    def update_idle_time(self): 
-        if not self.has_food and not self.is_dead: 
-            self.idle_time += 1 
+    def __hash__(self):
+        return hash((id(self.population), self.index))
+
+    @property
+    def visited_positions(self):
+        """Positions explorées par la fourmi (lecture seule, décodées de la carte de visites)."""
+        ys, xs = np.nonzero(self.population.visits.visited(None if self.population.visits.shared else self.index))
+        return {(float(x), float(y)) for x, y in zip(xs, ys)}
+
+    def update_idle_time(self):
+        if not self.has_food and not self.is_dead:
+            self.idle_time += 1
         else: self.idle_time = 0
 
     def move(self, dx, dy):
@@ -40,93 +445,21 @@ class Ant:
             list: [dx, dy] vecteur normalisé pointant vers la nourriture la plus proche,
                 [0, 0] si aucune nourriture n'est trouvée.
         """
-        x, y = int(self.pos[0]), int(self.pos[1])
-        min_distance = float('inf')
-        closest_food = None
-        
-        
-        # Limites de la zone de recherche
-        x_min = max(0, x - self.search_radius)
-        x_max = min(env.width, x + self.search_radius)
-        y_min = max(0, y - self.search_radius)
-        y_max = min(env.height, y + self.search_radius)
-        
-        # Recherche de nourriture dans la zone délimitée
-        food_positions = np.where(env.food[y_min:y_max, x_min:x_max] == 2)
-        
-        if len(food_positions[0]) > 0:
-            # Convertir en coordonnées relatives
-            food_y = food_positions[0] + y_min
-            food_x = food_positions[1] + x_min
-            
-            # Calculer les distances pour chaque position de nourriture
-            for fx, fy in zip(food_x, food_y):
-                distance = np.sqrt((fx - x)**2 + (fy - y)**2)
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_food = (fx, fy)
-            
-            if closest_food:
-                # Calculer le vecteur direction
-                dx = closest_food[0] - x
-                dy = closest_food[1] - y
-                
-                # Normaliser le vecteur
-                magnitude = np.sqrt(dx**2 + dy**2)
-                if magnitude > 0:
-                    dx = dx / magnitude
-                    dy = dy / magnitude
-                    
-                return [dx, dy]
-        
-        return [0, 0]  # Aucune nourriture trouvée
+        return env.closest_food_direction(self.pos[None, :], self.search_radius)[0].tolist()
 
-    def get_inputs(self, env, ants):
-        """Retourne les entrées pour le réseau NEAT en utilisant la grille NumPy, optimisée."""
+    def get_surrounding_pheromones(self, env):
+        """Somme des phéromones par type dans la zone de perception."""
         x, y = int(self.pos[0]), int(self.pos[1])
-        
-        # Limites de la zone de perception dans la grille
-        x_min = max(0, x - self.radius)
-        x_max = min(env.pheromone_system.width, x + self.radius + 1)
-        y_min = max(0, y - self.radius)
-        y_max = min(env.pheromone_system.height, y + self.radius + 1)
-
-        # Extraire la sous-grille de phéromones
-        local_pheromones = env.pheromone_system.pheromones[y_min:y_max, x_min:x_max, :]
+        return env.pheromone_system.window_sums(np.array([x]), np.array([y]), self.radius)[0]
 
-        # Somme des phéromones par type dans la zone de perception
-        surrounding_pheromones = np.sum(local_pheromones, axis=(0, 1))
+    def get_inputs(self, env, ants=None):
+        """
+        Retourne les entrées pour le réseau NEAT de cette fourmi.
 
-        # Calculer la distance à la colonie (une seule fois)
-        colony_center = np.array([env.width / 2, env.height / 2])
-        distance_to_colony = np.linalg.norm(self.pos - colony_center)
-
-        # Obtenir les positions des autres fourmis
-        ant_positions = np.array([ant.pos for ant in ants if ant != self])  # Exclure la fourmi actuelle
-        if len(ant_positions) > 0:
-            distances = np.linalg.norm(ant_positions - self.pos, axis=1)  # Calcul vectorisé des distances
-            closest_indices = np.argsort(distances)[:3]  # Indices des 3 plus proches voisins
-            closest_ants = ant_positions[closest_indices]
-        else:
-            # Si aucune autre fourmi, remplir avec des zéros
-            closest_ants = np.zeros((3, 2))
-
-        # Ajouter information sur la nourriture proche
-        food_direction = self.get_closest_food_direction(env)
-
-        # Construire le vecteur d'entrées pour le réseau
-        self.inputs = [
-            self.pos[0],  # Position x actuelle
-            self.pos[1],  # Position y actuelle
-            *closest_ants.flatten(),  # Positions des 3 fourmis les plus proches (ant1_x, ant1_y, ...)
-            1 if self.has_food else 0,  # Si la fourmi transporte de la nourriture
-            distance_to_colony,  # Distance par rapport à la colonie
-            *food_direction,
-        ] + surrounding_pheromones.tolist()  # Ajouter les niveaux de phéromones par type
-
-        #ic(self.inputs)
-
-        return self.inputs
+        Les voisins sont cherchés dans la population de la fourmi ; `ants` n'est
+        conservé que pour compatibilité.
+        """
+        return self.population.get_inputs(env, [self.index])[0].tolist()
 
 
 
@@ -0,0 +1,303 @@
+"""
+Évaluation répartie : un coordinateur distribue les épisodes d'une génération
+à des processus de travail connectés en TCP (multiprocessing.connection).
+
+Protocole (messages sérialisés par pickle, authentifiés par `authkey`) :
+    travailleur -> coordinateur : ('hello', nom)
+    coordinateur -> travailleur : ('setup', charge)          fonction d'épisode, config, réglages
+                                  ('genomes', génération, charge)  une fois par génération
+                                  ('task', génération, tâche, graines, mesurer)
+                                  ('stop',)
+    travailleur -> coordinateur : ('result', génération, tâche, fitness, mesures)
+
+Les charges sont compressées (zlib). Une tâche regroupe plusieurs graines :
+avec `batch_episodes`, ses épisodes sont simulés ensemble et les réseaux ne
+sont compilés qu'une fois par tâche. Une tâche sans réponse après `task_timeout`
+secondes, ou dont le travailleur se déconnecte, est confiée à un autre.
+
+Recevoir un pickle revient à exécuter du code : hors de la boucle locale,
+coordinateur et travailleurs exigent une clé partagée (`authkey`). Sans clé,
+seules les adresses locales (localhost) sont acceptées.
+
+Exemple (même machine) :
+    python simulation.py train --listen localhost:6000 --episodes 8
+    python simulation.py worker --connect localhost:6000     # dans d'autres terminaux
+"""
+import ipaddress
+import os
+import pickle
+import queue
+import socket
+import threading
+import time
+import zlib
+from collections import deque
+from functools import partial
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge, wait
+
+import numpy as np
+
+from parallel import ParallelEvaluator, apply_settings
+from profiling import NULL_TIMER, PhaseTimer
+
+
+HELLO_TIMEOUT = 10  # Secondes laissées à une connexion acceptée pour se présenter
+
+
+def pack(obj):
+    """Sérialisation compacte (pickle + zlib)."""
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def unpack(payload):
+    return pickle.loads(zlib.decompress(payload))
+
+
+def parse_address(text):
+    """'hôte:port' -> (hôte, port)."""
+    host, _, port = text.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def is_loopback(host):
+    """Vrai si toutes les adresses de `host` sont locales à la machine."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split('%')[0]).is_loopback for info in infos)
+
+
+def check_authkey(address, authkey):
+    """Refuse une connexion sans clé vers ou depuis une adresse non locale."""
+    if not authkey and not is_loopback(address[0]):
+        raise ValueError(f"Clé partagée requise hors de localhost ({address[0]}) : "
+                         "définir ANT_COLONY_AUTHKEY sur le coordinateur et les travailleurs")
+
+
+class _Worker:
+    """Connexion d'un travailleur, vue du coordinateur."""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.generation = None  # Génération dont les génomes ont été envoyés
+        self.task = None  # Tâche en cours
+        self.deadline = None
+
+
+class DistributedEvaluator(ParallelEvaluator):
+    """
+    Comme `ParallelEvaluator`, mais les épisodes sont évalués par des
+    travailleurs distants (`run_worker`), qui peuvent rejoindre ou quitter
+    l'entraînement à tout moment.
+    """
+
+    def __init__(self, episode_function, num_episodes, seed=None, address=('localhost', 0),
+                 authkey=None, aggregate=np.mean, timer=NULL_TIMER, batch_episodes=False,
+                 episodes_per_task=1, task_timeout=600, connect_timeout=300, max_retries=3, settings=None):
+        """
+        Args:
+            episode_function: Fonction d'épisode, importable par les travailleurs
+                (référencée par son module et son nom)
+            address: Adresse d'écoute (port 0 = port libre, voir `self.address`)
+            authkey: Clé partagée avec les travailleurs (obligatoire hors de localhost)
+            episodes_per_task: Graines par tâche
+            task_timeout: Secondes avant de considérer un travailleur comme perdu
+            connect_timeout: Secondes d'attente d'un premier travailleur
+            max_retries: Réattributions tolérées d'une même tâche
+            settings: Variables globales du module de `episode_function` à
+                reproduire chez les travailleurs (taille du monde, nombre de pas...)
+        """
+        super().__init__(episode_function, 1, num_episodes, seed, aggregate, timer, batch_episodes, settings)
+        self.episodes_per_task = episodes_per_task
+        self.task_timeout = task_timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.setup = None  # Charge 'setup', préparée à la première génération
+        self.workers = []
+        check_authkey(address, authkey)
+        self.authkey = authkey or None
+        # Authentification faite par `_greet`, pour qu'un client muet ne bloque pas l'écoute
+        self.listener = Listener(address)
+        self.address = self.listener.address
+        self.joined = queue.Queue()  # Connexions acceptées par le fil d'écoute
+        self.accepter = threading.Thread(target=self._accept, daemon=True)
+        self.accepter.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return  # Écoute fermée
+            threading.Thread(target=self._greet, args=(conn,), daemon=True).start()
+
+    def _greet(self, conn):
+        """Authentifie une connexion acceptée et attend son 'hello' (un fil par connexion)."""
+        try:
+            if self.authkey is not None:
+                deliver_challenge(conn, self.authkey)
+                answer_challenge(conn, self.authkey)
+            if conn.poll(HELLO_TIMEOUT):
+                kind, name = conn.recv()
+                if kind == 'hello':
+                    self.joined.put(_Worker(conn, name))
+                    return
+        except Exception:
+            pass  # Échec d'authentification, connexion coupée ou message invalide
+        conn.close()
+
+    def _adopt(self, block=False):
+        """Ajoute les travailleurs connectés depuis le dernier appel."""
+        timeout = self.connect_timeout if block else None
+        while True:
+            try:
+                worker = self.joined.get(block=block, timeout=timeout)
+            except queue.Empty:
+                if block:
+                    raise RuntimeError(f"Aucun travailleur connecté à {self.address} "
+                                       f"après {self.connect_timeout} s")
+                return
+            block = False
+            try:
+                worker.conn.send(('setup', self.setup))
+            except OSError:
+                worker.conn.close()
+                continue
+            self.workers.append(worker)
+
+    def _drop(self, worker, pending, retries):
+        """Retire un travailleur perdu et remet sa tâche en file."""
+        print(f"Travailleur perdu : {worker.name}")
+        worker.conn.close()
+        self.workers.remove(worker)
+        if worker.task is not None:
+            retries[worker.task] += 1
+            if retries[worker.task] > self.max_retries:
+                raise RuntimeError(f"Tâche {worker.task} abandonnée après {self.max_retries} réattributions")
+            pending.appendleft(worker.task)
+            worker.task = None
+
+    def evaluate(self, genomes, config, **episode_options):
+        """Fonction de fitness pour `neat.Population.run`."""
+        seeds = self.episode_seeds(self.generation)
+        generation = self.generation
+        self.generation += 1
+        if self.setup is None:
+            self.setup = pack((self.episode_function, self.batch_episodes, config, self.settings))
+
+        chunks = [seeds[i:i + self.episodes_per_task] for i in range(0, len(seeds), self.episodes_per_task)]
+        payload = pack((genomes, episode_options))
+        pending = deque(range(len(chunks)))
+        retries = [0] * len(chunks)
+        results = {}
+        timed = self.timer.enabled
+
+        while len(results) < len(chunks):
+            self._adopt(block=not self.workers)
+
+            # Une tâche par travailleur libre
+            for worker in list(self.workers):
+                if worker.task is not None or not pending:
+                    continue
+                task = pending.popleft()
+                worker.task, worker.deadline = task, time.monotonic() + self.task_timeout
+                try:
+                    if worker.generation != generation:
+                        worker.conn.send(('genomes', generation, payload))
+                        worker.generation = generation
+                    worker.conn.send(('task', generation, task, chunks[task], timed))
+                except OSError:
+                    self._drop(worker, pending, retries)
+
+            busy = [worker for worker in self.workers if worker.task is not None]
+            by_conn = {worker.conn: worker for worker in busy}
+            # Réveil régulier pour accueillir les nouveaux travailleurs
+            for conn in wait(list(by_conn), timeout=0.5):
+                worker = by_conn[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._drop(worker, pending, retries)
+                    continue
+                kind, message_generation, task, fitness, snapshot = message
+                if kind == 'result' and message_generation == generation and task == worker.task:
+                    results[task] = np.asarray(fitness).reshape(len(chunks[task]), len(genomes))
+                    if snapshot is not None:
+                        self.timer.merge(snapshot)
+                    worker.task = None
+
+            now = time.monotonic()
+            for worker in busy:
+                if worker.task is not None and worker in self.workers and now > worker.deadline:
+                    self._drop(worker, pending, retries)
+
+        fitness = self.aggregate(np.concatenate([results[task] for task in range(len(chunks))]), axis=0)
+        for (genome_id, genome), f in zip(genomes, fitness):
+            genome.fitness = float(f)
+        return fitness
+
+    def close(self):
+        """Arrête les travailleurs et l'écoute."""
+        for worker in getattr(self, 'workers', []):
+            try:
+                worker.conn.send(('stop',))
+            except OSError:
+                pass
+            worker.conn.close()
+        self.workers = []
+        if getattr(self, 'listener', None) is not None:
+            self.listener.close()
+            self.listener = None
+
+
+def run_worker(address, authkey=None, connect_timeout=60, name=None):
+    """
+    Boucle d'un travailleur : se connecte au coordinateur et évalue ses tâches
+    jusqu'au message 'stop' ou à la fermeture de la connexion.
+
+    Args:
+        authkey: Clé partagée avec le coordinateur (obligatoire hors de localhost)
+        connect_timeout: Secondes de tentatives de connexion (coordinateur pas encore lancé)
+    """
+    check_authkey(address, authkey)
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            conn = Client(address, authkey=authkey or None)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    conn.send(('hello', name or f'{socket.gethostname()}:{os.getpid()}'))
+    episode_function = batch_episodes = config = None
+    genomes, options = None, {}
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            kind = message[0]
+            if kind == 'stop':
+                return
+            if kind == 'setup':
+                episode_function, batch_episodes, config, settings = unpack(message[1])
+                # Mêmes réglages que le coordinateur (variables globales du module de l'épisode)
+                apply_settings(episode_function.__module__, settings)
+            elif kind == 'genomes':
+                genomes, options = unpack(message[2])
+            elif kind == 'task':
+                _, generation, task, seeds, timed = message
+                timer = PhaseTimer() if timed else None
+                function = partial(episode_function, **options)
+                if timer is not None:
+                    function = partial(function, timer=timer)
+                if batch_episodes:
+                    fitness = function(genomes, config, seeds)
+                else:
+                    fitness = np.array([function(genomes, config, seed) for seed in seeds])
+                conn.send(('result', generation, task, fitness, timer.snapshot() if timer else None))
@@ -0,0 +1,382 @@
+import hashlib
+import math
+from collections import OrderedDict
+
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+from profiling import NULL_TIMER
+
+_BELOW_ONE = np.nextafter(1.0, 0.0)
+
+
+def _saturation(function):
+    """
+    Plus petit z > 0 tel que function(z) == 1.0 (dichotomie sur les flottants).
+
+    Les sorties des réseaux sont tronquées par `int()` : NumPy et `math` peuvent
+    différer d'un ulp près de 1.0, on aligne donc le point de saturation sur `math`.
+    """
+    lo, hi = 0.0, 60.0
+    while True:
+        mid = (lo + hi) / 2
+        if mid in (lo, hi):
+            return hi
+        if function(mid) == 1.0:
+            hi = mid
+        else:
+            lo = mid
+
+
+_TANH_ONE = _saturation(math.tanh)
+_SIGMOID_ONE = _saturation(lambda z: 1.0 / (1.0 + math.exp(-z)))
+
+
+def _saturate(z, value, threshold):
+    """Force ±1.0 exactement là où `math` sature, et une valeur < 1 ailleurs."""
+    return np.where(np.abs(z) >= threshold, np.sign(z), np.clip(value, -_BELOW_ONE, _BELOW_ONE))
+
+
+# Versions vectorisées des fonctions d'activation de neat (neat/activations.py)
+def _sigmoid(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    value = 1.0 / (1.0 + np.exp(-z))
+    return np.where(z >= _SIGMOID_ONE, 1.0, np.minimum(value, _BELOW_ONE))
+
+
+def _tanh(z):
+    z = np.clip(2.5 * z, -60.0, 60.0)
+    return _saturate(z, np.tanh(z), _TANH_ONE)
+
+
+def _softplus(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 0.2 * np.log(1 + np.exp(z))
+
+
+def _inv(z):
+    with np.errstate(divide='ignore', over='ignore'):
+        inv = 1.0 / z
+    return np.where(np.isfinite(inv), inv, 0.0)
+
+
+ACTIVATIONS = {
+    'sigmoid': _sigmoid,
+    'tanh': _tanh,
+    'sin': lambda z: np.sin(np.clip(5.0 * z, -60.0, 60.0)),
+    'gauss': lambda z: np.exp(-5.0 * np.clip(z, -3.4, 3.4) ** 2),
+    'relu': lambda z: np.where(z > 0.0, z, 0.0),
+    'softplus': _softplus,
+    'identity': lambda z: z,
+    'clamped': lambda z: np.clip(z, -1.0, 1.0),
+    'inv': _inv,
+    'log': lambda z: np.log(np.maximum(1e-7, z)),
+    'exp': lambda z: np.exp(np.clip(z, -60.0, 60.0)),
+    'abs': np.abs,
+    'hat': lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    'square': lambda z: z ** 2,
+    'cube': lambda z: z ** 3,
+}
+
+AGGREGATIONS = ('sum', 'product', 'max', 'min', 'mean')
+
+
+class CompiledGenome:
+    """
+    Graphe feed-forward d'un génome, mis à plat couche par couche.
+
+    Les noeuds sont numérotés localement : d'abord les entrées, puis les
+    sorties, puis les noeuds cachés évalués. Chaque noeud évalué porte sa
+    profondeur (indice de couche) et la liste de ses liens entrants, dans
+    l'ordre utilisé par `neat.nn.FeedForwardNetwork`.
+    """
+
+    def __init__(self, genome, config):
+        genome_config = config.genome_config
+        input_keys = list(genome_config.input_keys)
+        output_keys = list(genome_config.output_keys)
+
+        # Connexions exprimées
+        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+        layers = feed_forward_layers(input_keys, output_keys, connections)
+
+        slots = {key: i for i, key in enumerate(input_keys + output_keys)}
+        self.num_inputs = len(input_keys)
+        self.output_slots = np.array([slots[key] for key in output_keys], dtype=np.intp)
+
+        nodes, depth, bias, response, activation, aggregation = [], [], [], [], [], []
+        link_src, link_dst, link_weight = [], [], []
+        for d, layer in enumerate(layers):
+            for node in sorted(layer):
+                slot = slots.setdefault(node, len(slots))
+                for inode, onode in connections:
+                    if onode == node:
+                        link_src.append(slots[inode])
+                        link_dst.append(slot)
+                        link_weight.append(genome.connections[(inode, onode)].weight)
+                ng = genome.nodes[node]
+                nodes.append(slot)
+                depth.append(d)
+                bias.append(ng.bias)
+                response.append(ng.response)
+                activation.append(ng.activation)
+                aggregation.append(ng.aggregation)
+
+        self.num_slots = len(slots)
+        self.nodes = np.array(nodes, dtype=np.intp)
+        self.depth = np.array(depth, dtype=np.intp)
+        self.bias = np.array(bias, dtype=float)
+        self.response = np.array(response, dtype=float)
+        self.activation = activation
+        self.aggregation = aggregation
+        self.link_src = np.array(link_src, dtype=np.intp)
+        self.link_dst = np.array(link_dst, dtype=np.intp)
+        self.link_weight = np.array(link_weight, dtype=float)
+
+        # Fonctions personnalisées enregistrées dans la config, vectorisées en dernier recours
+        self.custom_activations = {name: np.vectorize(genome_config.activation_defs.get(name), otypes=[float])
+                                   for name in set(activation) if name not in ACTIVATIONS}
+        unsupported = set(aggregation) - set(AGGREGATIONS)
+        if unsupported:
+            raise ValueError(f"Agrégations non supportées en lot : {sorted(unsupported)}")
+
+
+class _Layer:
+    """Noeuds d'une même profondeur, tous génomes confondus."""
+
+    def __init__(self, nodes, bias, response, activation, aggregation, link_src, link_dst, link_weight):
+        self.nodes = nodes
+        self.bias = bias
+        self.response = response
+        # Positions (dans la couche) des noeuds de chaque activation / agrégation
+        self.activation_groups = [(name, np.flatnonzero(activation == name)) for name in np.unique(activation)]
+        self.aggregation_groups = [(name, np.flatnonzero(aggregation == name)) for name in np.unique(aggregation)]
+        self.link_src = link_src
+        self.link_dst = link_dst  # Position du noeud destination dans la couche
+        self.link_weight = link_weight
+        self.fan_in = np.bincount(link_dst, minlength=len(nodes))
+
+
+class BatchNetwork:
+    """
+    Évalue en lot les réseaux feed-forward de toute une génération.
+
+    Tous les génomes sont compilés dans un seul vecteur de valeurs ; chaque
+    couche (même profondeur pour tous les génomes) se calcule en quelques
+    opérations NumPy quelle que soit la topologie de chaque génome. Les
+    sorties correspondent à `neat.nn.FeedForwardNetwork.activate`.
+    """
+
+    def __init__(self, genomes, config, compiled=None):
+        """
+        Args:
+            genomes: Liste de tuples (id, génome)
+            config: Configuration NEAT
+            compiled: CompiledGenome déjà construits, alignés sur `genomes` (optionnel)
+        """
+        self.genomes = [genome for _, genome in genomes]
+        if compiled is None:
+            compiled = [CompiledGenome(genome, config) for genome in self.genomes]
+        self.num_inputs = config.genome_config.num_inputs
+        self.num_outputs = config.genome_config.num_outputs
+
+        offsets = np.cumsum([0] + [c.num_slots for c in compiled])
+        self.num_slots = int(offsets[-1])
+        self.input_slots = offsets[:-1, None] + np.arange(self.num_inputs)
+        self.output_slots = np.array([offset + c.output_slots for offset, c in zip(offsets, compiled)],
+                                     dtype=np.intp).reshape(len(compiled), self.num_outputs)
+
+        self.custom_activations = {}
+        for c in compiled:
+            self.custom_activations.update(c.custom_activations)
+
+        def gather(name, offset=False):
+            parts = [getattr(c, name) + (o if offset else 0) for o, c in zip(offsets, compiled)]
+            return np.concatenate(parts) if parts else np.zeros(0)
+
+        nodes = gather('nodes', offset=True).astype(np.intp)
+        depth = gather('depth').astype(np.intp)
+        bias, response = gather('bias'), gather('response')
+        activation = np.array([name for c in compiled for name in c.activation], dtype=object)
+        aggregation = np.array([name for c in compiled for name in c.aggregation], dtype=object)
+        link_src = gather('link_src', offset=True).astype(np.intp)
+        link_dst = gather('link_dst', offset=True).astype(np.intp)
+        link_weight = gather('link_weight')
+
+        # Profondeur du noeud destination de chaque lien
+        slot_depth = np.full(self.num_slots, -1, dtype=np.intp)
+        slot_depth[nodes] = depth
+        link_depth = slot_depth[link_dst]
+
+        self.layers = []
+        position = np.zeros(self.num_slots, dtype=np.intp)
+        for d in range(int(depth.max()) + 1 if len(depth) else 0):
+            in_layer = np.flatnonzero(depth == d)
+            position[nodes[in_layer]] = np.arange(len(in_layer))
+            links = np.flatnonzero(link_depth == d)
+            self.layers.append(_Layer(nodes[in_layer], bias[in_layer], response[in_layer],
+                                      activation[in_layer], aggregation[in_layer],
+                                      link_src[links], position[link_dst[links]], link_weight[links]))
+
+    def __len__(self):
+        return len(self.genomes)
+
+    def activate(self, inputs, rows=None):
+        """
+        Calcule les sorties des réseaux.
+
+        Args:
+            inputs: Tableau (len(rows), num_inputs), ou (B, len(rows), num_inputs)
+                pour évaluer B jeux d'entrées à la fois
+            rows: Indices des génomes à évaluer (tous par défaut)
+
+        Returns:
+            np.ndarray: sorties de forme (..., len(rows), num_outputs).
+        """
+        inputs = np.asarray(inputs, dtype=float)
+        rows = np.arange(len(self.genomes)) if rows is None else np.asarray(rows, dtype=np.intp)
+        batch_shape = inputs.shape[:-2]
+        inputs = inputs.reshape(-1, len(rows), self.num_inputs)
+        batch = inputs.shape[0]
+
+        values = np.zeros((batch, self.num_slots))
+        values[:, self.input_slots[rows]] = inputs
+
+        for layer in self.layers:
+            contributions = values[:, layer.link_src] * layer.link_weight
+            s = self._aggregate(layer, contributions, batch)
+            z = layer.bias + layer.response * s
+            out = np.empty_like(z)
+            for name, cols in layer.activation_groups:
+                function = ACTIVATIONS.get(name) or self.custom_activations[name]
+                out[:, cols] = function(z[:, cols])
+            values[:, layer.nodes] = out
+
+        return values[:, self.output_slots[rows]].reshape(*batch_shape, len(rows), self.num_outputs)
+
+    @staticmethod
+    def _aggregate(layer, contributions, batch):
+        """Agrège les contributions des liens par noeud destination."""
+        width = len(layer.nodes)
+        if len(layer.aggregation_groups) == 1 and layer.aggregation_groups[0][0] == 'sum':
+            return _scatter_sum(contributions, layer.link_dst, width, batch)
+
+        s = np.zeros((batch, width))
+        for name, cols in layer.aggregation_groups:
+            if name in ('sum', 'mean'):
+                total = _scatter_sum(contributions, layer.link_dst, width, batch)
+                if name == 'mean':
+                    total = total / np.maximum(layer.fan_in, 1)
+                s[:, cols] = total[:, cols]
+                continue
+            ufunc, initial = {'product': (np.multiply, 1.0),
+                              'max': (np.maximum, -np.inf),
+                              'min': (np.minimum, np.inf)}[name]
+            reduced = np.full((batch, width), initial)
+            ufunc.at(reduced, (slice(None), layer.link_dst), contributions)
+            s[:, cols] = reduced[:, cols]
+        return s
+
+
+def _scatter_sum(contributions, dst, width, batch):
+    """Somme des contributions par destination, dans l'ordre des liens."""
+    flat = (np.arange(batch)[:, None] * width + dst).ravel()
+    return np.bincount(flat, weights=contributions.ravel(), minlength=batch * width).reshape(batch, width)
+
+
+def genome_hash(genome):
+    """
+    Empreinte de ce qui détermine le réseau d'un génome : noeuds (biais,
+    réponse, activation, agrégation) et connexions exprimées (poids).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted(genome.nodes):
+        ng = genome.nodes[key]
+        digest.update(repr((key, ng.bias, ng.response, ng.activation, ng.aggregation)).encode())
+    digest.update(b'|')
+    for key in sorted(genome.connections):
+        cg = genome.connections[key]
+        if cg.enabled:
+            digest.update(repr((key, cg.weight)).encode())
+    return digest.digest()
+
+
+class NetworkCache:
+    """
+    Cache LRU des génomes compilés, d'une génération à l'autre.
+
+    Les élites recopiées telles quelles par la reproduction de NEAT (et tout
+    génome identique) ne sont compilées qu'une fois. Le cache garde aussi les
+    fitness des épisodes à graine fixée : la fitness d'un génome dépend des
+    autres fourmis du monde, elle n'est donc réutilisable que pour la même
+    colonie (mêmes génomes, dans le même ordre), la même graine et les mêmes
+    options d'épisode — jamais génome par génome.
+    """
+
+    def __init__(self, maxsize=1024, fitness_size=256):
+        """
+        Args:
+            maxsize: Génomes compilés gardés au plus
+            fitness_size: Épisodes dont la fitness est gardée au plus
+        """
+        self.maxsize = maxsize
+        self.fitness_size = fitness_size
+        self.compiled = OrderedDict()  # empreinte -> CompiledGenome
+        self.fitness = OrderedDict()  # clé d'épisode -> fitness
+        self.hits = 0
+        self.misses = 0
+        self.fitness_hits = 0
+        self.fitness_misses = 0
+
+    @staticmethod
+    def _remember(table, key, value, maxsize):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > maxsize:
+            table.popitem(last=False)
+
+    def compile(self, genome, config, key=None):
+        """CompiledGenome de `genome`, compilé seulement s'il n'est pas en cache."""
+        key = genome_hash(genome) if key is None else key
+        compiled = self.compiled.get(key)
+        if compiled is not None:
+            self.hits += 1
+            self.compiled.move_to_end(key)
+            return compiled
+        self.misses += 1
+        compiled = CompiledGenome(genome, config)
+        self._remember(self.compiled, key, compiled, self.maxsize)
+        return compiled
+
+    def networks(self, genomes, config, timer=NULL_TIMER):
+        """
+        BatchNetwork des génomes (liste de tuples (id, génome)).
+
+        Son attribut `colony_key` identifie la colonie, pour `lookup_fitness`.
+        """
+        hits, misses = self.hits, self.misses
+        keys = [genome_hash(genome) for _, genome in genomes]
+        compiled = [self.compile(genome, config, key) for (_, genome), key in zip(genomes, keys)]
+        network = BatchNetwork(genomes, config, compiled)
+        network.colony_key = hashlib.blake2b(b''.join(keys), digest_size=16).digest()
+        timer.count('network_cache_hits', self.hits - hits)
+        timer.count('network_cache_misses', self.misses - misses)
+        return network
+
+    def lookup_fitness(self, key):
+        """Fitness enregistrée pour la clé d'épisode `key`, ou None."""
+        fitness = self.fitness.get(key)
+        if fitness is None:
+            self.fitness_misses += 1
+            return None
+        self.fitness_hits += 1
+        self.fitness.move_to_end(key)
+        return fitness.copy()
+
+    def store_fitness(self, key, fitness):
+        self._remember(self.fitness, key, np.array(fitness), self.fitness_size)
+
+    def stats(self):
+        return {'size': len(self.compiled), 'hits': self.hits, 'misses': self.misses,
+                'fitness_size': len(self.fitness), 'fitness_hits': self.fitness_hits,
+                'fitness_misses': self.fitness_misses}
@@ -0,0 +1,129 @@
+import importlib
+import random
+import sys
+from functools import partial
+from multiprocessing import Pool
+
+import neat
+import numpy as np
+
+from profiling import NULL_TIMER, PhaseTimer
+
+
+def apply_settings(module_name, settings):
+    """
+    Reproduit des variables globales du module de la fonction d'épisode dans un
+    processus de travail (réglages de la ligne de commande : taille du monde,
+    diffusion, enregistrements...). Sans elles, un processus démarré par
+    'spawn' ou 'forkserver' simulerait avec les valeurs par défaut du module.
+    """
+    module = sys.modules.get(module_name) or importlib.import_module(module_name)
+    vars(module).update(settings)
+
+
+def _run_timed(episode_function, genomes, config, seed):
+    """Exécute un épisode dans un processus de travail en mesurant ses phases."""
+    timer = PhaseTimer()
+    fitness = episode_function(genomes, config, seed, timer=timer)
+    return fitness, timer.snapshot()
+
+
+class ParallelEvaluator(neat.reporting.BaseReporter):
+    """
+    Évalue la population sur plusieurs épisodes indépendants (dispositions de
+    nourriture différentes) répartis sur un pool de processus.
+
+    La fitness de chaque génome est l'agrégat (moyenne par défaut) de ses
+    fitness sur les épisodes, ce qui réduit le bruit dû à la disposition.
+
+    Ajouté comme rapporteur à la population, l'évaluateur suit son numéro de
+    génération : un entraînement repris depuis une sauvegarde retrouve les
+    graines des générations suivantes.
+    """
+
+    def __init__(self, episode_function, num_workers, num_episodes, seed=None, aggregate=np.mean,
+                 timer=NULL_TIMER, batch_episodes=False, settings=None):
+        """
+        Args:
+            episode_function: Fonction (genomes, config, seed) -> tableau des fitness
+            num_workers: Nombre de processus (1 = évaluation dans le processus courant)
+            num_episodes: Nombre d'épisodes par génération
+            seed: Graine de base ; l'épisode k de la génération g utilise
+                seed + g * num_episodes + k. None = graines tirées au hasard.
+            aggregate: Agrégation des fitness sur l'axe des épisodes
+            timer: PhaseTimer où cumuler les mesures des épisodes ; `episode_function`
+                doit alors accepter un argument `timer`
+            batch_episodes: `episode_function` reçoit une liste de graines et renvoie
+                un tableau (graines, génomes) ; les épisodes sont répartis en un lot
+                par processus
+            settings: Variables globales du module de `episode_function` à
+                reproduire dans les processus de travail
+        """
+        self.episode_function = episode_function
+        self.num_workers = num_workers
+        self.num_episodes = num_episodes
+        self.seed = seed
+        self.aggregate = aggregate
+        self.timer = timer
+        self.batch_episodes = batch_episodes
+        self.settings = settings or {}
+        self.generation = 0
+        self.pool = None
+        if num_workers > 1:
+            self.pool = Pool(num_workers, initializer=apply_settings,
+                             initargs=(episode_function.__module__, self.settings))
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def episode_seeds(self, generation):
+        """Graines des épisodes d'une génération."""
+        if self.seed is None:
+            return [random.randrange(2 ** 32) for _ in range(self.num_episodes)]
+        base = self.seed + generation * self.num_episodes
+        return list(range(base, base + self.num_episodes))
+
+    def evaluate(self, genomes, config, **episode_options):
+        """
+        Fonction de fitness pour `neat.Population.run`.
+
+        Args:
+            episode_options: Arguments nommés transmis à `episode_function`
+        """
+        seeds = self.episode_seeds(self.generation)
+        self.generation += 1
+        episode_function = partial(self.episode_function, **episode_options)
+
+        if self.batch_episodes:
+            chunks = np.array_split(np.array(seeds), min(len(seeds), self.num_workers))
+            tasks = [(genomes, config, chunk.tolist()) for chunk in chunks]
+        else:
+            tasks = [(genomes, config, seed) for seed in seeds]
+        if self.pool is None:
+            if self.timer.enabled:
+                results = [episode_function(*task, timer=self.timer) for task in tasks]
+            else:
+                results = [episode_function(*task) for task in tasks]
+        elif self.timer.enabled:
+            # Les mesures des processus de travail sont renvoyées avec les fitness
+            timed = self.pool.starmap(_run_timed, [(episode_function,) + task for task in tasks])
+            results = [fitness for fitness, _ in timed]
+            for _, snapshot in timed:
+                self.timer.merge(snapshot)
+        else:
+            results = self.pool.starmap(episode_function, tasks)
+
+        results = np.concatenate(results) if self.batch_episodes else np.array(results)
+        fitness = self.aggregate(results, axis=0)
+        for (genome_id, genome), f in zip(genomes, fitness):
+            genome.fitness = float(f)
+        return fitness
@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+import time
+from time import perf_counter
+
+import neat
+
+
+class _Phase:
+    """Chronomètre d'une phase, utilisé comme gestionnaire de contexte."""
+
+    __slots__ = ('totals', 'name', 'start')
+
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.totals[self.name] = self.totals.get(self.name, 0.0) + perf_counter() - self.start
+        return False
+
+
+class PhaseTimer:
+    """
+    Durées cumulées par phase et compteurs, remis à zéro à chaque génération.
+
+    Utilisation :
+        with timer.phase('sense'):
+            ...
+        timer.count('ant_steps', len(idx))
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.totals = {}  # phase -> secondes
+        self.counts = {}  # compteur -> valeur
+        self.phases = {}  # Chronomètres réutilisés d'un appel à l'autre
+
+    def phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self.totals, name)
+        return phase
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def reset(self):
+        self.totals.clear()
+        self.counts.clear()
+
+    def snapshot(self):
+        """Copie sérialisable des durées et compteurs (pour les processus de travail)."""
+        return {'totals': dict(self.totals), 'counts': dict(self.counts)}
+
+    def merge(self, snapshot):
+        """Ajoute les mesures d'un autre chronomètre (résultat de `snapshot`)."""
+        for name, seconds in snapshot['totals'].items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+        for name, n in snapshot['counts'].items():
+            self.counts[name] = self.counts.get(name, 0) + n
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTimer:
+    """Chronomètre désactivé : toutes les opérations sont sans effet."""
+
+    enabled = False
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def reset(self):
+        pass
+
+    def snapshot(self):
+        return {'totals': {}, 'counts': {}}
+
+    def merge(self, snapshot):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class TimingReporter(neat.reporting.BaseReporter):
+    """
+    Affiche, après chaque génération, le temps passé dans chaque phase de la
+    simulation et les débits (pas-fourmi/s, activations/s). Les mêmes lignes
+    peuvent être ajoutées à un fichier CSV et/ou JSON.
+    """
+
+    def __init__(self, timer, csv_path=None, json_path=None, show=True):
+        """
+        Args:
+            timer: PhaseTimer partagé avec la simulation
+            csv_path: Fichier CSV (une ligne par génération), optionnel
+            json_path: Fichier JSON (liste des générations), optionnel
+            show: Afficher le résumé sur la sortie standard
+        """
+        self.timer = timer
+        self.csv_path = csv_path
+        self.json_path = json_path
+        self.show = show
+        self.generation = None
+        self.generation_start = None
+        self.rows = []
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.generation_start = perf_counter()
+        self.timer.reset()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        row = self.summary(perf_counter() - self.generation_start)
+        self.rows.append(row)
+        if self.show:
+            self.print_summary(row)
+        if self.csv_path:
+            self.write_csv(row)
+        if self.json_path:
+            self.write_json()
+
+    def summary(self, evaluation_time):
+        """Mesures de la génération courante sous forme de dictionnaire à plat."""
+        totals, counts = self.timer.totals, self.timer.counts
+        step_time = totals.get('step', 0.0)
+        row = {'generation': self.generation, 'timestamp': time.time(), 'evaluation_time': evaluation_time}
+        row.update({f'{name}_time': seconds for name, seconds in sorted(totals.items())})
+        row.update(sorted(counts.items()))
+        row['ant_steps_per_second'] = counts.get('ant_steps', 0) / step_time if step_time else 0.0
+        activate_time = totals.get('activate', 0.0)
+        row['activations_per_second'] = counts.get('activations', 0) / activate_time if activate_time else 0.0
+        return row
+
+    def print_summary(self, row):
+        totals = self.timer.totals
+        step_time = totals.get('step', 0.0)
+        phases = [(name, seconds) for name, seconds in totals.items() if name != 'step']
+        parts = [f"{name} {seconds * 1e3:.1f} ms ({seconds / step_time:.0%})" if step_time
+                 else f"{name} {seconds * 1e3:.1f} ms" for name, seconds in phases]
+        print(f"Phases : {', '.join(parts)}")
+        print(f"Débit : {row['ant_steps_per_second']:.0f} pas-fourmi/s, "
+              f"{row['activations_per_second']:.0f} activations/s "
+              f"(évaluation {row['evaluation_time']:.3f} s)")
+
+    def write_csv(self, row):
+        # Les colonnes sont celles de la première génération écrite
+        exists = os.path.exists(self.csv_path) and os.path.getsize(self.csv_path) > 0
+        with open(self.csv_path, 'a', newline='') as f:
+            if exists:
+                with open(self.csv_path, newline='') as r:
+                    fieldnames = next(csv.reader(r))
+            else:
+                fieldnames = list(row)
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval='', extrasaction='ignore')
+            if not exists:
+                writer.writeheader()
+            writer.writerow(row)
+
+    def write_json(self):
+        with open(self.json_path, 'w') as f:
+            json.dump(self.rows, f, indent=2)
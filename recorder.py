@@ -0,0 +1,426 @@
+"""
+Enregistrement compact des épisodes et relecture sans NEAT ni simulation.
+
+Un enregistrement est un répertoire :
+    meta.json           dimensions, graine, génomes, nombre d'images...
+    chunk-000000.npz    images [0, K), puis chunk-000001.npz pour [K, 2K), etc.
+
+Chaque bloc contient, pour ses K images (une image = l'état après un pas) :
+    - les positions (int16), l'état (bits) et la fitness cumulée des fourmis ;
+    - une image clé : la grille complète et les phéromones non nulles au
+      début du bloc ;
+    - les événements de chaque pas, au format CSR (décalages + valeurs) :
+      cellules de la grille modifiées et dépôts de phéromones.
+
+Les phéromones d'une image sont reconstruites à partir de l'image clé en
+rejouant dépôts et évaporation : accéder à une image coûte au plus K pas.
+
+Exemple :
+    python recorder.py play recordings/episode-1234-000000 --speed 4
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from world import diffuse, grid_codes
+
+FORMAT_VERSION = 1
+CHUNK_STEPS = 256  # Images par bloc (et entre deux images clés)
+
+# Bits de `state`
+HAS_FOOD = 1
+IS_DEAD = 2
+DEPOSIT = 4
+
+
+def chunk_filename(path, chunk):
+    return os.path.join(path, f'chunk-{chunk:06d}.npz')
+
+
+def _concat(parts, dtype):
+    """Concatène les événements d'un bloc (un tableau par image)."""
+    return np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+
+
+def pheromone_levels(system):
+    """Phéromones [y, x, types] d'un PheromoneSystem, sans modifier son état (mode paresseux)."""
+    values = np.asarray(system.values)
+    if system.lazy:
+        return values * (system.evaporation_rate ** (system.tick - np.asarray(system.stamp)))[:, :, None]
+    return values
+
+
+class TrajectoryRecorder:
+    """
+    Enregistre un épisode de `Simulation` pas à pas.
+
+    Le coût par pas est proportionnel au nombre de fourmis (et non à la
+    taille du monde) : seules les cellules où une fourmi était ou se trouve
+    sont comparées à une copie de la grille. Les blocs sont compressés et
+    écrits dans un fil séparé.
+
+    Utilisation :
+        recorder = TrajectoryRecorder('recordings/episode-0')
+        sim.run(steps, display=False, networks=networks, recorder=recorder)
+    """
+
+    def __init__(self, path, chunk_steps=CHUNK_STEPS, seed=None, genome_keys=None, compress=True):
+        """
+        Args:
+            path: Répertoire de l'enregistrement (créé si besoin)
+            chunk_steps: Images par bloc ; borne le coût d'un accès aléatoire
+            seed: Graine de l'épisode, conservée dans les métadonnées
+            genome_keys: Identifiant du génome de chaque fourmi, conservé dans les métadonnées
+            compress: Compresser les blocs (np.savez_compressed)
+        """
+        self.path = path
+        self.chunk_steps = chunk_steps
+        self.seed = seed
+        self.genome_keys = None if genome_keys is None else [int(k) for k in genome_keys]
+        self.compress = compress
+        self.writer = None  # Fil d'écriture en cours
+        self.num_frames = 0
+        self.num_chunks = 0
+
+    def begin(self, sim):
+        """Enregistre l'état initial (image 0) de la simulation."""
+        env, ants = sim.env, sim.ants
+        os.makedirs(self.path, exist_ok=True)
+        self.width, self.height = env.width, env.height
+        self.num_ants = len(ants)
+        self.num_types = env.pheromone_system.num_types
+        self.meta = {
+            'version': FORMAT_VERSION,
+            'width': env.width,
+            'height': env.height,
+            'num_ants': len(ants),
+            'num_types': self.num_types,
+            'evaporation_rate': env.pheromone_system.evaporation_rate,
+            'diffusion_rate': env.pheromone_system.diffusion_rate,
+            'chunk_steps': self.chunk_steps,
+            'colony_pos': list(sim.colony_pos),
+            'colony_radius': sim.colony_radius,
+            'num_food': sim.num_food,
+            'seed': self.seed,
+            'genome_keys': self.genome_keys,
+            'num_frames': 0,
+            'num_chunks': 0,
+            'termination_reason': None,
+        }
+        self.grid = np.array(env.grid, dtype=np.int8)  # Copie de la grille à l'image précédente
+        self.cells = self.cell_keys(ants.pos)
+        self.deposits = []  # Dépôts du pas en cours : (cellules, types, quantités)
+        self.start_chunk(env)
+        self.append(sim, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8))
+
+    def cell_keys(self, pos):
+        cells = np.round(pos).astype(np.int64)
+        return np.clip(cells[:, 1], 0, self.height - 1) * self.width + np.clip(cells[:, 0], 0, self.width - 1)
+
+    def deposit(self, cells, types, amounts):
+        """Dépôts de phéromones d'un pas, appelé par `Simulation.deposit_pheromones`."""
+        x, y = cells[:, 0], cells[:, 1]
+        keep = (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height) & (amounts != 0)
+        self.deposits.append((y[keep] * self.width + x[keep], np.asarray(types)[keep] % self.num_types,
+                              np.asarray(amounts)[keep]))
+
+    def record(self, sim):
+        """Enregistre l'image suivante (état après le pas qui vient d'être simulé)."""
+        # La grille ne change qu'aux cellules quittées ou atteintes par une fourmi
+        cells = self.cell_keys(sim.ants.pos)
+        candidates = np.union1d(self.cells, cells)
+        self.cells = cells
+        ys, xs = np.divmod(candidates, self.width)
+        codes = grid_codes(sim.env.cell_types[ys, xs])
+        changed = codes != self.grid[ys, xs]
+        self.grid[ys[changed], xs[changed]] = codes[changed]
+
+        if self.frame == self.chunk_steps:
+            self.flush()
+            self.start_chunk(sim.env)
+        self.append(sim, candidates[changed], codes[changed])
+
+    def start_chunk(self, env):
+        """Nouveau bloc, qui commence par une image clé."""
+        k, n = self.chunk_steps, self.num_ants
+        self.frame = 0  # Images écrites dans le bloc courant
+        self.first_frame = self.num_frames
+        self.pos = np.zeros((k, n, 2), dtype=np.int16)
+        self.state = np.zeros((k, n), dtype=np.uint8)
+        self.fitness = np.zeros((k, n), dtype=np.float32)
+        self.colony = np.zeros((k, 4), dtype=np.int32)  # Nourriture restante, portée, déposée ; morts
+        self.grid_events = ([], [], [])  # Par image : cellules, codes, nombre d'événements
+        self.deposit_events = ([], [], [], [])  # Par image : cellules, types, quantités, nombre
+
+        pheromones = pheromone_levels(env.pheromone_system).reshape(-1, self.num_types)
+        nonzero = np.flatnonzero(np.any(pheromones != 0, axis=1))
+        self.key_grid = self.grid.copy()
+        self.key_cells = nonzero
+        self.key_values = pheromones[nonzero].astype(np.float32)
+
+    def append(self, sim, grid_cells, grid_codes):
+        ants, i = sim.ants, self.frame
+        self.pos[i] = np.round(ants.pos)
+        self.state[i] = (ants.has_food * HAS_FOOD) | (ants.is_dead * IS_DEAD) | (ants.deposit_pheromone * DEPOSIT)
+        self.fitness[i] = ants.fitness
+        self.colony[i] = (len(sim.env.food_keys), ants.food_carried, ants.food_delivered, ants.num_dead)
+
+        self.grid_events[0].append(grid_cells)
+        self.grid_events[1].append(grid_codes)
+        self.grid_events[2].append(len(grid_cells))
+        for events, parts in zip(self.deposit_events, zip(*self.deposits)):
+            events.append(np.concatenate(parts))
+        self.deposit_events[3].append(sum(len(cells) for cells, _, _ in self.deposits))
+        self.deposits = []
+
+        self.frame += 1
+        self.num_frames += 1
+
+    def flush(self):
+        """Écrit le bloc courant en arrière-plan."""
+        k = self.frame
+        if k == 0:
+            return
+        arrays = {
+            'first_frame': np.int64(self.first_frame),
+            'pos': self.pos[:k],
+            'state': self.state[:k],
+            'fitness': self.fitness[:k],
+            'colony': self.colony[:k],
+            'key_grid': self.key_grid,
+            'key_cells': self.key_cells,
+            'key_values': self.key_values,
+            'grid_offsets': np.concatenate(([0], np.cumsum(self.grid_events[2]))).astype(np.int64),
+            'grid_cells': _concat(self.grid_events[0], np.int64),
+            'grid_codes': _concat(self.grid_events[1], np.int8),
+            'deposit_offsets': np.concatenate(([0], np.cumsum(self.deposit_events[3]))).astype(np.int64),
+            'deposit_cells': _concat(self.deposit_events[0], np.int64),
+            'deposit_types': _concat(self.deposit_events[1], np.uint8),
+            'deposit_amounts': _concat(self.deposit_events[2], np.float32),
+        }
+        filename = chunk_filename(self.path, self.num_chunks)
+        self.num_chunks += 1
+        self.wait()  # Une seule écriture à la fois
+        self.writer = threading.Thread(target=self._write, args=(filename, arrays), daemon=True)
+        self.writer.start()
+        self.frame = 0
+
+    def _write(self, filename, arrays):
+        tmp = f'{filename}.tmp.npz'
+        (np.savez_compressed if self.compress else np.savez)(tmp, **arrays)
+        os.replace(tmp, filename)
+
+    def wait(self):
+        """Attend la fin de l'écriture en cours."""
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def close(self, sim=None):
+        """Écrit le dernier bloc et les métadonnées."""
+        self.flush()
+        self.wait()
+        self.meta['num_frames'] = self.num_frames
+        self.meta['num_chunks'] = self.num_chunks
+        if sim is not None:
+            self.meta['termination_reason'] = sim.termination_reason
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+
+class Frame:
+    """État reconstruit d'une image de l'enregistrement."""
+
+    __slots__ = ('index', 'pos', 'state', 'fitness', 'colony', 'grid', 'pheromones')
+
+    def __init__(self, index, pos, state, fitness, colony, grid, pheromones):
+        self.index = index
+        self.pos = pos  # (N, 2) positions [x, y]
+        self.state = state  # (N,) bits HAS_FOOD / IS_DEAD / DEPOSIT
+        self.fitness = fitness  # (N,) fitness cumulée
+        self.colony = colony  # (nourriture restante, portée, déposée, morts)
+        self.grid = grid  # (H, W) grille principale
+        self.pheromones = pheromones  # (H, W, types)
+
+    @property
+    def has_food(self):
+        return (self.state & HAS_FOOD) != 0
+
+    @property
+    def is_dead(self):
+        return (self.state & IS_DEAD) != 0
+
+
+class TrajectoryPlayer:
+    """
+    Relecture d'un enregistrement : accès à n'importe quelle image, dans
+    n'importe quel ordre ; la lecture séquentielle ne rejoue qu'un pas par image.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Version d'enregistrement non prise en charge : {self.meta['version']}")
+        self.width, self.height = self.meta['width'], self.meta['height']
+        self.num_types = self.meta['num_types']
+        self.evaporation_rate = self.meta['evaporation_rate']
+        self.diffusion_rate = self.meta.get('diffusion_rate', 0.0)
+        self.scratch = None  # Tampon de la diffusion
+        self.chunk_steps = self.meta['chunk_steps']
+        self.chunk = None  # Bloc chargé
+        self.chunk_index = None
+        self.current = None  # Image dont l'état (grid, pheromones) est reconstruit
+        self.grid = None
+        self.pheromones = None
+
+    def __len__(self):
+        return self.meta['num_frames']
+
+    def load_chunk(self, chunk):
+        if chunk != self.chunk_index:
+            with np.load(chunk_filename(self.path, chunk)) as data:
+                self.chunk = {name: data[name] for name in data.files}
+            self.chunk_index = chunk
+            self.current = None
+        return self.chunk
+
+    def reset_to_keyframe(self):
+        data = self.chunk
+        self.grid = data['key_grid'].copy()
+        pheromones = np.zeros((self.height * self.width, self.num_types), dtype=np.float32)
+        pheromones[data['key_cells']] = data['key_values']
+        self.pheromones = pheromones.reshape(self.height, self.width, self.num_types)
+        self.current = 0
+
+    def advance(self, i):
+        """Applique les événements de l'image `i` du bloc (pas i - 1 -> i)."""
+        data = self.chunk
+        start, stop = data['grid_offsets'][i:i + 2]
+        ys, xs = np.divmod(data['grid_cells'][start:stop], self.width)
+        self.grid[ys, xs] = data['grid_codes'][start:stop]
+
+        start, stop = data['deposit_offsets'][i:i + 2]
+        ys, xs = np.divmod(data['deposit_cells'][start:stop], self.width)
+        # Dépôts dans l'ordre des fourmis, puis diffusion et évaporation, comme dans la simulation
+        np.add.at(self.pheromones, (ys, xs, data['deposit_types'][start:stop]),
+                  data['deposit_amounts'][start:stop])
+        if self.diffusion_rate:
+            if self.scratch is None:
+                self.scratch = np.empty_like(self.pheromones)
+            diffuse(self.pheromones, self.scratch, self.diffusion_rate, self.evaporation_rate)
+        else:
+            self.pheromones *= self.evaporation_rate
+        self.current = i
+
+    def seek(self, index):
+        """
+        Reconstruit l'état de l'image `index`.
+
+        Returns:
+            Frame: l'image ; `grid` et `pheromones` sont partagés avec le lecteur
+            (copiez-les pour les conserver).
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Image {index} hors de l'enregistrement (0-{len(self) - 1})")
+        chunk, i = divmod(index, self.chunk_steps)
+        data = self.load_chunk(chunk)
+        if self.current is None or self.current > i:
+            self.reset_to_keyframe()
+        for j in range(self.current + 1, i + 1):
+            self.advance(j)
+        return Frame(index, data['pos'][i], data['state'][i], data['fitness'][i], data['colony'][i],
+                     self.grid, self.pheromones)
+
+    def __getitem__(self, index):
+        return self.seek(index)
+
+    def frames(self, start=0, stop=None, stride=1):
+        """Images [start, stop) de `stride` en `stride`."""
+        for index in range(start, len(self) if stop is None else stop, stride):
+            yield self.seek(index)
+
+    def play(self, speed=1, fps=60, start=0, cell_size=None):
+        """
+        Affiche l'enregistrement dans une fenêtre Pygame.
+
+        Args:
+            speed: Images avancées par image affichée (peut être fractionnaire)
+
+        Touches : Espace (pause), Gauche/Droite (image précédente/suivante),
+        Haut/Bas (vitesse x2 / ÷2), Début (retour au début), Échap ou Q (quitter).
+        """
+        from render import CELL_SIZE, GridRenderer, Window
+
+        cell_size = cell_size or CELL_SIZE
+        window = Window(self.width * cell_size, self.height * cell_size,
+                        caption=f"Relecture {os.path.basename(os.path.normpath(self.path))}", fps=fps)
+        pygame = window.pygame
+        renderer = GridRenderer(cell_size)
+        position, paused, running = float(start), False, True
+        while running:
+            index = min(int(position), len(self) - 1)
+            frame = self.seek(index)
+            dirty = renderer.draw_layers(window.screen, frame.grid, frame.pheromones)
+            pygame.display.set_caption(f"Image {index}/{len(self) - 1}  x{speed:g}"
+                                       + ("  (pause)" if paused else ""))
+            window.present(dirty)
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                        running = False
+                    elif event.key == pygame.K_SPACE:
+                        paused = not paused
+                    elif event.key == pygame.K_RIGHT:
+                        position, paused = min(index + 1, len(self) - 1), True
+                    elif event.key == pygame.K_LEFT:
+                        position, paused = max(index - 1, 0), True
+                    elif event.key == pygame.K_UP:
+                        speed *= 2
+                    elif event.key == pygame.K_DOWN:
+                        speed /= 2
+                    elif event.key == pygame.K_HOME:
+                        position = 0
+            if not paused:
+                position = min(position + speed, len(self) - 1)
+        window.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relecture des épisodes enregistrés")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    play = commands.add_parser('play', help='afficher un enregistrement')
+    play.add_argument('path', help="répertoire de l'enregistrement")
+    play.add_argument('--speed', type=float, default=1, help='images avancées par image affichée')
+    play.add_argument('--fps', type=int, default=60)
+    play.add_argument('--start', type=int, default=0, help='première image')
+
+    info = commands.add_parser('info', help="résumé d'un enregistrement")
+    info.add_argument('path', help="répertoire de l'enregistrement")
+
+    args = parser.parse_args(argv)
+    player = TrajectoryPlayer(args.path)
+    if args.command == 'play':
+        player.play(args.speed, args.fps, args.start)
+    else:
+        last = player.seek(len(player) - 1)
+        food_remaining, food_carried, food_delivered, num_dead = last.colony.tolist()
+        print(json.dumps(player.meta, indent=2))
+        print(f"Dernière image : {food_remaining} nourriture restante, {food_carried} portée, "
+              f"{food_delivered} déposée, {num_dead} fourmi(s) morte(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
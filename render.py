@@ -0,0 +1,246 @@
+import multiprocessing
+import queue
+
+import numpy as np
+
+# pygame n'est importé qu'au premier affichage : importer ce module (ou la
+# simulation) n'initialise pas SDL.
+
+CELL_SIZE = 10  # Taille d'une cellule en pixels
+
+# Couleurs
+COLOR_EMPTY = (14, 255, 145)  # Vert pour les cases vides
+COLOR_WALL = (255, 255, 255)  # Blanc pour les murs
+COLOR_DEATH_ZONE = (255, 0, 0)  # Rouge pour les zones mortelles
+COLOR_FOOD = (0, 0, 255)  # Bleu pour la nourriture
+COLOR_ANT = (0, 0, 0)  # Noir pour les fourmis
+COLOR_PHEROMONE = (128, 0, 128) # Violet pour les phéromones
+
+# Couleur de chaque code de la grille principale (les autres codes sont vides)
+PALETTE = np.tile(np.array(COLOR_EMPTY, dtype=np.uint8), (256, 1))
+PALETTE[1] = COLOR_WALL
+PALETTE[2] = COLOR_FOOD
+PALETTE[3] = COLOR_DEATH_ZONE
+PALETTE[4] = COLOR_ANT
+
+# Composantes (r, g, b) multipliées par l'intensité pour chaque type de phéromones
+PHEROMONE_CHANNELS = np.array([
+    (1, 0, 1),  # violet translucide pour les phéromones de type 0
+    (1, 0, 0),  # rouge translucide pour les phéromones de type 1
+    (0, 1, 1),  # bleu translucide pour les phéromones de type 2
+], dtype=np.uint8)
+
+
+def cell_colors(grid, pheromones):
+    """
+    Couleurs de chaque cellule, indexées [x, y] comme `pygame.surfarray`.
+
+    Returns:
+        tuple: (fond (W, H, 3), bordure (W, H, 3), masque des bordures (W, H)).
+        La bordure reprend le dernier type de phéromones présent dans la
+        cellule, comme la superposition de `pygame.draw.rect(..., width=1)`.
+    """
+    base = PALETTE[np.asarray(grid).T.astype(np.uint8)]
+
+    levels = np.transpose(np.asarray(pheromones), (1, 0, 2))
+    present = levels > 0
+    # Dernier type présent dans chaque cellule
+    num_types = min(levels.shape[2], len(PHEROMONE_CHANNELS))
+    last = num_types - 1 - np.argmax(present[:, :, num_types - 1::-1], axis=2)
+    has_border = np.any(present[:, :, :num_types], axis=2)
+
+    level = np.take_along_axis(levels, last[:, :, None], axis=2)[:, :, 0]
+    alpha = np.minimum(255, np.where(has_border, level * 50, 0)).astype(np.uint8)  # Intensité (0-255)
+    border = PHEROMONE_CHANNELS[last] * alpha[:, :, None]
+    # Une couleur noire (intensité nulle) est remplacée par la couleur vide
+    black = has_border & (alpha == 0)
+    border[black] = COLOR_EMPTY
+    return base, border, has_border
+
+
+class GridRenderer:
+    """
+    Rendu vectorisé de l'environnement : l'image complète est construite en
+    NumPy, agrandie à `cell_size` pixels par cellule, puis copiée en un seul
+    appel via `pygame.surfarray`. Seul le rectangle englobant les cellules
+    modifiées depuis l'image précédente est recopié.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.surface = None
+        self.previous = None  # Couleurs de l'image précédente, par cellule
+
+    def scale(self, base, border, has_border):
+        """Agrandit des couleurs par cellule (W, H, C) en pixels (W * c, H * c, C)."""
+        w, h = has_border.shape
+        c = self.cell_size
+        pixels = np.empty((w, c, h, c) + base.shape[2:], dtype=base.dtype)
+        pixels[...] = base[:, None, :, None]
+        # Contour d'un pixel pour les cellules avec phéromones
+        bx, by = np.nonzero(has_border)
+        color = border[bx, by][:, None]
+        for edge in (0, c - 1):
+            pixels[bx, edge, by] = color
+            pixels[bx, :, by, edge] = color
+        return pixels.reshape((w * c, h * c) + base.shape[2:])
+
+    def frame(self, env):
+        """Image RGB complète (largeur, hauteur, 3) de l'environnement."""
+        return self.scale(*cell_colors(env.grid, env.pheromone_system.pheromones))
+
+    def draw(self, screen, env, full=False):
+        """
+        Dessine l'environnement sur `screen`.
+
+        Returns:
+            list: rectangles modifiés, à passer à `pygame.display.update`.
+        """
+        return self.draw_layers(screen, env.grid, env.pheromone_system.pheromones, full)
+
+    def draw_layers(self, screen, grid, pheromones, full=False):
+        """Comme `draw`, à partir des couches (grille [y, x], phéromones [y, x, types])."""
+        import pygame
+
+        base, border, has_border = cell_colors(grid, pheromones)
+        current = np.concatenate((base, border, has_border[:, :, None].astype(np.uint8)), axis=2)
+        c = self.cell_size
+
+        if self.surface is None or self.surface.get_size() != (current.shape[0] * c, current.shape[1] * c):
+            self.surface = pygame.Surface((current.shape[0] * c, current.shape[1] * c), depth=32)
+            self.previous = None
+
+        if full or self.previous is None:
+            x0, y0, (x1, y1) = 0, 0, current.shape[:2]
+        else:
+            changed = np.any(current != self.previous, axis=2)
+            if not changed.any():
+                return []
+            xs = np.flatnonzero(changed.any(axis=1))
+            ys = np.flatnonzero(changed.any(axis=0))
+            x0, x1, y0, y1 = xs[0], xs[-1] + 1, ys[0], ys[-1] + 1
+        self.previous = current
+
+        # Couleurs converties au format de la surface (un entier par pixel) avant agrandissement
+        region = self.scale(pygame.surfarray.map_array(self.surface, base[x0:x1, y0:y1]),
+                            pygame.surfarray.map_array(self.surface, border[x0:x1, y0:y1]),
+                            has_border[x0:x1, y0:y1])
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        pixels[x0 * c:x1 * c, y0 * c:y1 * c] = region
+        del pixels  # Libère le verrou de la surface
+
+        rect = pygame.Rect(x0 * c, y0 * c, (x1 - x0) * c, (y1 - y0) * c)
+        screen.blit(self.surface, rect, area=rect)
+        return [rect]
+
+
+class Window:
+    """Fenêtre Pygame de la simulation, ouverte à la demande."""
+
+    def __init__(self, width, height, caption="Ant Colony Simulation with NEAT", fps=60):
+        """
+        Args:
+            width, height: Taille de la fenêtre en pixels
+            fps: Nombre maximal d'images par seconde
+        """
+        import pygame
+
+        self.pygame = pygame
+        pygame.init()
+        pygame.display.set_caption(caption)
+        self.screen = pygame.display.set_mode((width, height))
+        self.clock = pygame.time.Clock()
+        self.fps = fps
+
+    def present(self, dirty):
+        """Affiche les rectangles modifiés et limite la cadence."""
+        self.pygame.display.update(dirty)
+        self.clock.tick(self.fps)
+
+    def close(self):
+        self.pygame.quit()
+
+
+def _render_loop(frames, closed, width, height, caption, fps, cell_size, skip):
+    """Processus d'affichage : dessine les images reçues (la plus récente seulement si `skip`)."""
+    window = Window(width * cell_size, height * cell_size, caption, fps)
+    pygame = window.pygame
+    renderer = GridRenderer(cell_size)
+    try:
+        while True:
+            frame = frames.get()
+            # En retard : seule l'image la plus récente est dessinée
+            while skip and frame is not None:
+                try:
+                    frame = frames.get_nowait()
+                except queue.Empty:
+                    break
+            if frame is None:
+                return
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    closed.set()
+                    return
+            window.present(renderer.draw_layers(window.screen, *frame))
+    finally:
+        closed.set()
+        window.close()
+
+
+class AsyncRenderer:
+    """
+    Affichage dans un processus séparé : la simulation envoie des copies de la
+    grille et des phéromones par une file bornée et ne ralentit jamais pour
+    l'affichage. Une image est abandonnée si la file est pleine, et le processus
+    d'affichage ne dessine que la plus récente des images en attente.
+    """
+
+    def __init__(self, width, height, caption="Ant Colony Simulation with NEAT", fps=60,
+                 cell_size=CELL_SIZE, queue_size=2, block=False):
+        """
+        Args:
+            width, height: Taille de la grille en cellules
+            queue_size: Images en attente au plus
+            block: Attendre de la place dans la file plutôt qu'abandonner l'image
+                (relecture : toutes les images sont affichées, au rythme de `fps`)
+        """
+        context = multiprocessing.get_context('spawn')  # Aucun état SDL hérité
+        self.frames = context.Queue(queue_size)
+        self.closed = context.Event()  # Fenêtre fermée par l'utilisateur
+        self.block = block
+        self.sent = 0
+        self.dropped = 0
+        self.process = context.Process(target=_render_loop, daemon=True,
+                                       args=(self.frames, self.closed, width, height, caption, fps, cell_size,
+                                             not block))
+        self.process.start()
+
+    def submit(self, env):
+        """
+        Envoie l'état courant de `env` (grille, phéromones) à l'affichage.
+
+        Returns:
+            bool: False si l'image a été abandonnée.
+        """
+        if self.closed.is_set() or (not self.block and self.frames.full()):
+            self.dropped += 1
+            return False
+        frame = (np.array(env.grid), np.array(env.pheromone_system.pheromones))
+        while True:
+            try:
+                self.frames.put(frame, block=self.block, timeout=0.1 if self.block else None)
+                self.sent += 1
+                return True
+            except queue.Full:
+                if not self.block or self.closed.is_set():
+                    self.dropped += 1
+                    return False
+
+    def close(self):
+        """Affiche les images en attente puis ferme la fenêtre."""
+        if self.process is None:
+            return
+        if not self.closed.is_set():
+            self.frames.put(None)
+        self.process.join()
+        self.process = None
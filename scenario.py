@@ -0,0 +1,228 @@
+"""
+Génération procédurale des mondes (nourriture, murs, zones mortelles) et cache sur disque.
+
+Un scénario est une couche (hauteur, largeur) de bits CELL_* (voir
+`Environment.cell_types`), tirée en quelques opérations vectorisées à
+partir d'une graine. Les scénarios sont enregistrés dans un cache
+(`<répertoire>/<taille>-seed<graine>-<options>.npy`) : reconstruire un monde
+déjà généré ne coûte qu'une lecture, éventuellement projetée en mémoire.
+"""
+import hashlib
+import inspect
+import json
+import os
+import random
+
+import neat
+import numpy as np
+
+from world import CELL_DEATH, CELL_FOOD, CELL_WALL
+
+FORMAT_VERSION = 1
+
+
+class Scenario:
+    """Disposition d'un monde : couche de bits CELL_* indexée [y, x]."""
+
+    def __init__(self, cell_types, seed=None, options=None):
+        self.cell_types = cell_types
+        self.seed = seed
+        self.options = options or {}
+
+    @property
+    def height(self):
+        return self.cell_types.shape[0]
+
+    @property
+    def width(self):
+        return self.cell_types.shape[1]
+
+    @property
+    def walls(self):
+        return (self.cell_types & CELL_WALL) != 0
+
+    @property
+    def death_zones(self):
+        return (self.cell_types & CELL_DEATH) != 0
+
+    @property
+    def food(self):
+        return (self.cell_types & CELL_FOOD) != 0
+
+    @property
+    def num_food(self):
+        return int(np.count_nonzero(self.food))
+
+
+def _segments(anchors, lengths, horizontal, width, height):
+    """Cellules (ys, xs) de segments partant de `anchors` (ys, xs), bornés à la grille."""
+    offsets = np.arange(lengths.max(initial=0))
+    valid = offsets < lengths[:, None]
+    ys = anchors[0][:, None] + np.where(horizontal[:, None], 0, offsets)
+    xs = anchors[1][:, None] + np.where(horizontal[:, None], offsets, 0)
+    valid &= (ys < height) & (xs < width)
+    return ys[valid], xs[valid]
+
+
+def _rectangles(anchors, sizes, width, height):
+    """Cellules (ys, xs) de rectangles de coin `anchors` (ys, xs) et de tailles (h, w)."""
+    dy = np.arange(sizes[:, 0].max(initial=0))
+    dx = np.arange(sizes[:, 1].max(initial=0))
+    ys, xs = np.broadcast_arrays(anchors[0][:, None, None] + dy[None, :, None],
+                                 anchors[1][:, None, None] + dx[None, None, :])
+    valid = (dy[None, :, None] < sizes[:, 0, None, None]) & (dx[None, None, :] < sizes[:, 1, None, None])
+    valid &= (ys < height) & (xs < width)
+    return ys[valid], xs[valid]
+
+
+def _sample(rng, free, count):
+    """Tirage sans remise de `count` cellules parmi le masque `free` (indices à plat)."""
+    cells = np.flatnonzero(free)
+    return rng.choice(cells, size=min(count, len(cells)), replace=False)
+
+
+def generate_scenario(width, height, seed, num_food=12, num_walls=0, wall_length=(3, 10),
+                      num_death_zones=0, death_zone_size=(2, 5), clear_radius=5):
+    """
+    Tire un monde au hasard (graine fixée).
+
+    Les points de départ des murs (segments d'une cellule d'épaisseur), les coins
+    des zones mortelles et la nourriture sont tirés sans remise parmi les cellules
+    libres, en un seul tirage par type. Comme `Environment.generate_food`, la
+    nourriture est regroupée dans une sous-zone de 20 à 50 % du monde ; elle
+    déborde sur le reste du monde si la sous-zone n'a pas assez de cellules libres.
+    La colonie (carré de rayon `clear_radius` au centre) reste toujours libre.
+
+    Args:
+        wall_length, death_zone_size: Bornes (incluses) des longueurs / côtés
+
+    Returns:
+        Scenario
+    """
+    rng = np.random.default_rng(seed)
+    cell_types = np.zeros((height, width), dtype=np.int8)
+
+    blocked = np.zeros((height, width), dtype=bool)  # Cellules déjà prises ou réservées
+    cx, cy = width // 2, height // 2
+    blocked[max(0, cy - clear_radius):cy + clear_radius + 1, max(0, cx - clear_radius):cx + clear_radius + 1] = True
+    colony = blocked.copy()
+
+    if num_walls:
+        anchors = np.divmod(_sample(rng, ~blocked, num_walls), width)
+        lengths = rng.integers(wall_length[0], wall_length[1] + 1, len(anchors[0]))
+        horizontal = rng.random(len(anchors[0])) < 0.5
+        ys, xs = _segments(anchors, lengths, horizontal, width, height)
+        keep = ~colony[ys, xs]
+        cell_types[ys[keep], xs[keep]] |= CELL_WALL
+        blocked[ys, xs] = True
+
+    if num_death_zones:
+        anchors = np.divmod(_sample(rng, ~blocked, num_death_zones), width)
+        sizes = rng.integers(death_zone_size[0], death_zone_size[1] + 1, (len(anchors[0]), 2))
+        ys, xs = _rectangles(anchors, sizes, width, height)
+        keep = ~blocked[ys, xs]  # Les murs restent prioritaires
+        cell_types[ys[keep], xs[keep]] |= CELL_DEATH
+        blocked[ys, xs] = True
+
+    # Sous-zone de la nourriture
+    zone_w = rng.integers(int(width * 0.2), int(width * 0.5) + 1)
+    zone_h = rng.integers(int(height * 0.2), int(height * 0.5) + 1)
+    zone_x = rng.integers(0, width - zone_w + 1)
+    zone_y = rng.integers(0, height - zone_h + 1)
+    in_zone = np.zeros((height, width), dtype=bool)
+    in_zone[zone_y:zone_y + zone_h, zone_x:zone_x + zone_w] = True
+
+    food = _sample(rng, in_zone & ~blocked, num_food)
+    if len(food) < num_food:
+        food = np.concatenate((food, _sample(rng, ~in_zone & ~blocked, num_food - len(food))))
+    if len(food) < num_food:
+        raise ValueError(f"Pas assez de cellules libres pour {num_food} nourritures ({len(food)})")
+    ys, xs = np.divmod(food, width)
+    cell_types[ys, xs] |= CELL_FOOD
+
+    options = dict(num_food=num_food, num_walls=num_walls, wall_length=list(wall_length),
+                   num_death_zones=num_death_zones, death_zone_size=list(death_zone_size),
+                   clear_radius=clear_radius)
+    return Scenario(cell_types, seed, options)
+
+
+class ScenarioCache:
+    """
+    Cache des scénarios générés, sur disque et en mémoire.
+
+    Un scénario est identifié par la taille du monde, la graine et les options
+    de `generate_scenario`. Il est généré au premier accès puis relu depuis
+    `directory` ; avec `mmap=True` la couche est projetée en mémoire en
+    lecture seule (np.load(..., mmap_mode='r')).
+    """
+
+    def __init__(self, directory='scenarios', mmap=False):
+        self.directory = directory
+        self.mmap = mmap
+        self.loaded = {}  # Scénarios déjà lus par ce processus
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, width, height, seed, options):
+        digest = hashlib.sha1(json.dumps([FORMAT_VERSION, options], sort_keys=True).encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f'{width}x{height}-seed{seed}-{digest}.npy')
+
+    def get(self, width, height, seed, **options):
+        """Scénario de graine `seed` (généré et enregistré s'il n'est pas en cache)."""
+        # Options complétées par les valeurs par défaut : même fichier quelle que soit l'écriture
+        arguments = inspect.signature(generate_scenario).bind(width, height, seed, **options)
+        arguments.apply_defaults()
+        options = {name: value for name, value in arguments.arguments.items()
+                   if name not in ('width', 'height', 'seed')}
+        key = (width, height, seed, json.dumps(options, sort_keys=True))
+        scenario = self.loaded.get(key)
+        if scenario is not None:
+            self.hits += 1
+            return scenario
+
+        path = self.path(width, height, seed, options)
+        if os.path.exists(path):
+            self.hits += 1
+            cell_types = np.load(path, mmap_mode='r' if self.mmap else None)
+            scenario = Scenario(cell_types, seed, options)
+        else:
+            self.misses += 1
+            scenario = generate_scenario(width, height, seed, **options)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp.npy'  # Plusieurs processus peuvent générer le même monde
+            np.save(tmp, scenario.cell_types)
+            os.replace(tmp, path)
+        self.loaded[key] = scenario
+        return scenario
+
+
+class Curriculum(neat.reporting.BaseReporter):
+    """
+    Curriculum fixe de mondes : chaque étape donne, à partir d'une génération,
+    les options de `generate_scenario`. Les épisodes tournent sur `num_worlds`
+    mondes par étape (graine de l'épisode modulo `num_worlds`).
+    """
+
+    def __init__(self, stages, num_worlds=16):
+        """
+        Args:
+            stages: Liste de (première génération, options de generate_scenario)
+            num_worlds: Nombre de mondes distincts par étape
+        """
+        self.stages = sorted(stages, key=lambda stage: stage[0])
+        self.num_worlds = num_worlds
+        self.options = self.options_for(0)
+
+    def options_for(self, generation):
+        options = self.stages[0][1]
+        for first_generation, stage_options in self.stages:
+            if generation >= first_generation:
+                options = stage_options
+        return dict(options)
+
+    def world_seed(self, seed=None):
+        """Graine du monde d'un épisode (monde tiré au hasard si `seed` est None)."""
+        return random.randrange(self.num_worlds) if seed is None else seed % self.num_worlds
+
+    def start_generation(self, generation):
+        self.options = self.options_for(generation)
@@ -1,83 +1,366 @@
+import argparse
+import json
+import os
+import sys
+from itertools import count
 import neat.population
 import numpy as np
-import pygame
-from colony import Ant
+from colony import Ant, AntPopulation, NeighbourGrid, as_population
+from network import BatchNetwork, NetworkCache
+from parallel import ParallelEvaluator
+from checkpoint import AsyncCheckpointer, latest_checkpoint, restore_checkpoint
+from distributed import DistributedEvaluator, check_authkey, parse_address, run_worker
+from profiling import NULL_TIMER, PhaseTimer, TimingReporter
+from recorder import TrajectoryPlayer, TrajectoryRecorder
+from scenario import Curriculum, ScenarioCache
+from world import (CELL_ANT, CELL_COLONY, CELL_DEATH, CELL_FOOD, CELL_OCCUPIED, CELL_WALL, LAYOUT_BITS,
+                   diffuse, grid_codes, make_layer)
 import random
 import neat
 import pickle
-from icecream import ic
 
-CELL_SIZE = 10  # Taille d'une cellule en pixels
-
-# Couleurs
-COLOR_EMPTY = (14, 255, 145)  # Vert pour les cases vides
-COLOR_WALL = (255, 255, 255)  # Blanc pour les murs
-COLOR_DEATH_ZONE = (255, 0, 0)  # Rouge pour les zones mortelles
-COLOR_FOOD = (0, 0, 255)  # Bleu pour la nourriture
-COLOR_ANT = (0, 0, 0)  # Noir pour les fourmis 
-COLOR_PHEROMONE = (128, 0, 128) # Violet pour les phéromones
-
-pygame.init()
-pygame.display.set_caption("Ant Colony Simulation with NEAT")
-clock = pygame.time.Clock()
+from render import CELL_SIZE, AsyncRenderer, GridRenderer
 
 # Définisson le système de phéromones :
 class PheromoneSystem:
-    def __init__(self, width, height, num_types=3):
+    def __init__(self, width, height, num_types=3, lazy=False, tile_size=None, storage_dir=None,
+                 diffusion_rate=0.0):
+        """
+        :param lazy: Évaporation paresseuse : chaque cellule garde sa valeur et le pas
+            de sa dernière mise à jour, la décroissance n'est appliquée qu'à la lecture
+            ou à l'écriture de la cellule. Adapté aux grands mondes presque vides.
+        :param tile_size: Stockage en tuiles créées au premier accès (voir `world.TiledArray`).
+        :param storage_dir: Répertoire des tuiles projetées en mémoire (np.memmap).
+        :param diffusion_rate: Part des phéromones d'une cellule diffusée vers chacune de ses
+            voisines, par axe, à chaque évaporation (0 = pas de diffusion ; grille dense uniquement).
+        """
+        if diffusion_rate and (lazy or tile_size is not None):
+            raise ValueError("La diffusion des phéromones demande une grille dense non paresseuse")
+        if not 0 <= diffusion_rate <= 0.5:
+            raise ValueError(f"Taux de diffusion hors de [0, 0.5] : {diffusion_rate}")
         # Dimensions adaptées à NumPy : [row, column, pheromone_types]
         self.width = width
         self.height = height
         self.num_types = num_types
-        self.pheromones = np.zeros((height, width, num_types))  # [y, x, types]
+        self.lazy = lazy
+        self.tile_size = tile_size
+        self.values = make_layer((height, width, num_types), np.float32, tile_size, storage_dir, 'pheromones')  # [y, x, types]
         self.evaporation_rate = 0.95  # 5% d'évaporation par étape
+        self.diffusion_rate = diffusion_rate
+        self.scratch = None  # Tampon de la diffusion, alloué au premier usage
+        self.integral = None  # Table des sommes cumulées, invalidée à chaque modification
+        self.tick = 0  # Nombre d'évaporations appliquées (mode paresseux)
+        self.stamp = (make_layer((height, width), np.int64, tile_size, storage_dir, 'pheromone_stamps')
+                      if lazy else None)  # Pas de dernière mise à jour
+
+    @property
+    def uses_integral(self):
+        """La perception passe par la table des sommes cumulées (grille dense uniquement)."""
+        return not self.lazy and self.tile_size is None
+
+    @property
+    def pheromones(self):
+        """Grille dense [y, x, types] des phéromones (matérialisée en mode paresseux)."""
+        if self.lazy:
+            self.materialize()
+        return self.values
+
+    @pheromones.setter
+    def pheromones(self, value):
+        self.values[...] = value
+        if self.lazy:
+            self.stamp[...] = self.tick
+        self.integral = None
+
+    def decay(self, ys, xs):
+        """Facteur d'évaporation en attente pour les cellules (ys, xs)."""
+        return self.evaporation_rate ** (self.tick - self.stamp[ys, xs])
+
+    def materialize(self):
+        """Applique l'évaporation en attente à toute la grille (rendu, export)."""
+        if not self.lazy:
+            return
+        if self.tile_size is None:
+            self.values *= (self.evaporation_rate ** (self.tick - self.stamp))[:, :, None]
+            self.stamp[...] = self.tick
+            return
+        # Stockage en tuiles : seules les tuiles existantes portent des phéromones
+        for key, tile in self.values.tiles.items():
+            stamp = self.stamp.tile(*key, create=True)
+            tile *= (self.evaporation_rate ** (self.tick - stamp))[:, :, None]
+            stamp[...] = self.tick
 
     def deposit(self, x, y, pheromone_type, amount):
         """Ajoute une quantité de phéromones d'un certain type à une position."""
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.pheromones[y, x, pheromone_type] += amount  # Indices corrigés [y, x]
+            if self.lazy:
+                self.values[y, x] *= self.decay(y, x)
+                self.stamp[y, x] = self.tick
+            self.values[y, x, pheromone_type] += amount  # Indices corrigés [y, x]
+            self.integral = None
+
+    def deposit_many(self, xs, ys, types, amounts, episodes=None):
+        """
+        Dépôts de plusieurs fourmis en une seule addition dispersée (np.add.at),
+        cumulés dans l'ordre comme des appels successifs à `deposit`.
+
+        `episodes` n'est utilisé que par les systèmes batchés (un seul épisode ici).
+        """
+        inside = (0 <= xs) & (xs < self.width) & (0 <= ys) & (ys < self.height)
+        xs, ys = xs[inside], ys[inside]
+        types = np.asarray(types)[inside] % self.num_types
+        amounts = np.asarray(amounts, dtype=self.values.dtype)[inside]
+        if self.lazy:
+            # Évaporation en attente appliquée une fois par cellule touchée
+            cells = np.unique(ys * self.width + xs)
+            cy, cx = np.divmod(cells, self.width)
+            self.values[cy, cx] = self.values[cy, cx] * self.decay(cy, cx)[:, None]
+            self.stamp[cy, cx] = self.tick
+        if self.tile_size is None:
+            np.add.at(self.values, (ys, xs, types), amounts)
+        else:
+            # Stockage en tuiles : une somme par cellule, puis une lecture-écriture
+            keys, inverse = np.unique((ys * self.width + xs) * self.num_types + types, return_inverse=True)
+            sums = np.bincount(inverse, weights=amounts)
+            cells, ts = np.divmod(keys, self.num_types)
+            cy, cx = np.divmod(cells, self.width)
+            self.values[cy, cx, ts] = self.values[cy, cx, ts] + sums
+        self.integral = None
 
     def evaporate(self):
-        """Applique l'évaporation des phéromones sur toute la grille."""
-        self.pheromones *= self.evaporation_rate
+        """Applique l'évaporation (et la diffusion, si activée) des phéromones sur toute la grille."""
+        if self.lazy:
+            self.tick += 1
+        elif self.diffusion_rate:
+            self.diffuse()
+        else:
+            self.values *= self.evaporation_rate
+        self.integral = None
+
+    def diffuse(self):
+        """Diffusion puis évaporation en place (voir `world.diffuse`)."""
+        if self.scratch is None or self.scratch.shape != self.values.shape:
+            self.scratch = np.empty_like(self.values)
+        diffuse(self.values, self.scratch, self.diffusion_rate, self.evaporation_rate)
 
     def get_pheromone_level(self, x, y, pheromone_type):
         """Récupère le niveau de phéromones d'un certain type à une position."""
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.pheromones[y, x, pheromone_type]  # Indices corrigés [y, x]
+            level = self.values[y, x, pheromone_type]  # Indices corrigés [y, x]
+            return level * self.decay(y, x) if self.lazy else level
         return 0
 
+    def build_integral(self):
+        """
+        Construit la table des sommes cumulées (integral image) des phéromones.
+
+        integral[y, x] contient la somme de pheromones[:y, :x], par type.
+        """
+        # Cumuls en float64 : les différences de grandes sommes restent précises
+        integral = np.zeros((self.height + 1, self.width + 1, self.num_types))
+        np.cumsum(self.pheromones, axis=0, dtype=np.float64, out=integral[1:, 1:])
+        np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+        self.integral = integral
+        return integral
+
+    def window_sums(self, xs, ys, radius, episodes=None):
+        """
+        Somme des phéromones par type dans la fenêtre [x - r, x + r] x [y - r, y + r]
+        (bornée à la grille) de chaque position, en temps constant par position.
+
+        `episodes` n'est utilisé que par les environnements batchés (un seul épisode ici).
+
+        Returns:
+            np.ndarray: tableau (N, num_types).
+        """
+        if not self.uses_integral:
+            return self._gather_window_sums(xs, ys, radius)
+        integral = self.integral if self.integral is not None else self.build_integral()
+        x_min = np.clip(xs - radius, 0, self.width)
+        x_max = np.clip(xs + radius + 1, 0, self.width)
+        y_min = np.clip(ys - radius, 0, self.height)
+        y_max = np.clip(ys + radius + 1, 0, self.height)
+        return (integral[y_max, x_max] - integral[y_min, x_max]
+                - integral[y_max, x_min] + integral[y_min, x_min])
+
+
+    def _gather_window_sums(self, xs, ys, radius):
+        """Sommes par fenêtre sans table cumulée : lecture des seules cellules perçues."""
+        offsets = np.arange(-radius, radius + 1)
+        wx = xs[:, None] + offsets
+        wy = ys[:, None] + offsets
+        inside = ((0 <= wy) & (wy < self.height))[:, :, None] & ((0 <= wx) & (wx < self.width))[:, None, :]
+        cy = np.clip(wy, 0, self.height - 1)[:, :, None]
+        cx = np.clip(wx, 0, self.width - 1)[:, None, :]
+        weights = np.where(inside, self.decay(cy, cx) if self.lazy else 1.0, 0.0)
+        return np.einsum('nij,nijt->nt', weights, self.values[cy, cx])
+
+
+def closest_food(x, y, food_keys, width, search_radius, row_min=0, row_max=None, chunk_size=4096):
+    """
+    Vecteur normalisé de chaque cellule (x, y) vers la nourriture visible la plus
+    proche ; [0, 0] si aucune.
+
+    `food_keys` est l'index trié (y * width + x) des cellules de nourriture. Seule
+    la fenêtre de chaque fourmi est parcourue : pour chacune de ses 2r lignes, les
+    clés de [x - r, x + r) sont trouvées par dichotomie. Le coût dépend donc du
+    nombre de nourritures visibles, pas du nombre total. À distance égale, la
+    première cellule dans l'ordre ligne par ligne l'emporte.
+
+    Args:
+        row_min, row_max: Lignes utilisables par chaque requête (scalaires ou
+            tableaux alignés sur x), pour des mondes empilés ligne par ligne
+        chunk_size: Paires (fourmi, ligne) traitées à la fois
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    directions = np.zeros((len(x), 2))
+    if len(food_keys) == 0 or len(x) == 0:
+        return directions
+
+    offsets = np.arange(-search_radius, search_radius)
+    x_lo = np.maximum(x - search_radius, 0)
+    x_hi = np.minimum(x + search_radius, width)
+    row_min = np.broadcast_to(row_min, x.shape)
+    row_max = np.broadcast_to(np.iinfo(np.int64).max if row_max is None else row_max, x.shape)
+
+    step = max(1, chunk_size // len(offsets))
+    for start in range(0, len(x), step):
+        part = slice(start, start + step)
+        rows = y[part, None] + offsets
+        valid = (rows >= row_min[part, None]) & (rows < row_max[part, None]) & (x_lo < x_hi)[part, None]
+        lo = np.searchsorted(food_keys, rows * width + x_lo[part, None])
+        hi = np.searchsorted(food_keys, rows * width + x_hi[part, None])
+        count = np.where(valid, hi - lo, 0)
+        per_query = count.sum(axis=1)
+        if not per_query.any():
+            continue
+
+        # Candidats de chaque fourmi, dans l'ordre des clés (ligne par ligne)
+        count, lo = count.ravel(), lo.ravel()
+        query = np.repeat(np.arange(len(per_query)), per_query)
+        cells = food_keys[np.repeat(lo - (np.cumsum(count) - count), count) + np.arange(count.sum())]
+        fy, fx = np.divmod(cells, width)
+        dx = fx - x[part][query]
+        dy = fy - y[part][query]
+        squared = dx * dx + dy * dy
+
+        # Plus proche de chaque fourmi (tri stable : la première clé en cas d'égalité)
+        order = np.lexsort((squared, query))
+        found = np.flatnonzero(per_query)
+        best = order[(np.cumsum(per_query) - per_query)[found]]
+        vector = np.column_stack((dx[best], dy[best])).astype(float)
+        magnitude = np.sqrt(squared[best])
+        moving = magnitude > 0
+        vector[moving] /= magnitude[moving, None]
+        directions[start + found] = vector
+    return directions
+
+
+def insert_keys(sorted_keys, keys):
+    """Index trié `sorted_keys` complété par `keys` (insertion à leur place, sans re-tri)."""
+    keys = np.unique(keys)
+    position = np.searchsorted(sorted_keys, keys)
+    present = position < len(sorted_keys)
+    present[present] = sorted_keys[position[present]] == keys[present]
+    return np.insert(sorted_keys, position[~present], keys[~present])
+
+
+def delete_keys(sorted_keys, keys):
+    """Index trié `sorted_keys` privé de `keys` (suppression à leur place)."""
+    position = np.searchsorted(sorted_keys, keys)
+    present = position < len(sorted_keys)
+    present[present] = sorted_keys[position[present]] == keys[present]
+    return np.delete(sorted_keys, np.unique(position[present]))
+
+
+# Conditions d'arrêt anticipé d'un épisode (voir `Simulation.check_termination`)
+TERMINATION_CONDITIONS = ('dead', 'food', 'idle')
+
 
 # Définission de l'environnement sous forme de grille numpy
 class Environment:
-    def __init__(self, width, height):
+    def __init__(self, width, height, lazy_pheromones=False, tile_size=None, storage_dir=None,
+                 pheromone_diffusion=0.0):
+        """
+        :param lazy_pheromones: Évaporation paresseuse des phéromones.
+        :param pheromone_diffusion: Taux de diffusion des phéromones (voir `PheromoneSystem`).
+        :param tile_size: Si donné, les couches sont stockées en tuiles créées au premier
+            accès (mondes grands et clairsemés) plutôt qu'en tableaux denses.
+        :param storage_dir: Répertoire des tuiles projetées en mémoire (np.memmap).
+        """
         self.width = width
         self.height = height
         self.grid_size = (width, height)
-        self.grid = np.zeros(self.grid_size, dtype=np.int8)  # Grille principale
-        self.walls = np.zeros(self.grid_size, dtype=np.int8)  # Grille binaire pour les murs
-        self.death_zones = np.zeros(self.grid_size, dtype=np.int8)  # Grille binaire pour zones mortelles
-        self.food = np.zeros(self.grid_size, dtype=np.int8)  # Grille binaire pour nourriture
-        self.pheromones = np.zeros((*self.grid_size, 2), dtype=np.float32)  # Grille 3D pour phéromones (2 types)
-        self.food = np.zeros(self.grid_size, dtype=np.int8)  # Grille binaire pour nourriture
+        self.tile_size = tile_size
+        self.storage_dir = storage_dir
+        # Seule couche de l'état des cellules, indexée [y, x] : bits CELL_* (mur, zone
+        # mortelle, nourriture, fourmi, colonie, réservée). `grid`, `walls`,
+        # `death_zones` et `food` en sont dérivées.
+        self.cell_types = make_layer((height, width), np.int8, tile_size, storage_dir, 'cell_types')
         self.ants = []
-        self.pheromone_system = PheromoneSystem(width, height)
+        self.pheromone_system = PheromoneSystem(width, height, lazy=lazy_pheromones,
+                                                tile_size=tile_size, storage_dir=storage_dir,
+                                                diffusion_rate=pheromone_diffusion)
         self.occupied_positions = set()  # Ensemble pour suivre les positions occupées
+        self.food_keys = np.zeros(0, dtype=np.int64)  # Index trié (y * width + x) des cellules de nourriture
+        self.renderer = None  # GridRenderer créé au premier affichage
+
+    def cell_index(self, ants, idx, xs, ys):
+        """Indices NumPy des cellules (xs, ys) des fourmis `idx` dans les couches de la grille."""
+        return ys, xs
+
+    def cell_keys(self, cells):
+        """Clé entière unique de chaque cellule renvoyée par `cell_index`."""
+        ys, xs = cells
+        return ys * self.width + xs
+
+    # --- Accès à l'état des cellules ---
+    # `cells` : indices de `cell_types` (tableaux renvoyés par `cell_index`, ou tranches [y, x])
+
+    def has_flag(self, cells, flag):
+        """Masque des cellules portant l'un des bits de `flag`."""
+        return (self.cell_types[cells] & flag) != 0
+
+    def set_flag(self, cells, flag):
+        self.cell_types[cells] = self.cell_types[cells] | flag
+
+    def clear_flag(self, cells, flag):
+        self.cell_types[cells] = self.cell_types[cells] & ~flag
+
+    @property
+    def grid(self):
+        """Grille principale (codes 0 vide, 1 mur, 2 nourriture, 3 zone mortelle, 4 fourmi), en lecture seule."""
+        return grid_codes(self.cell_types)
+
+    @property
+    def walls(self):
+        return (np.asarray(self.cell_types) & CELL_WALL) != 0
+
+    @property
+    def death_zones(self):
+        return (np.asarray(self.cell_types) & CELL_DEATH) != 0
+
+    @property
+    def food(self):
+        return (np.asarray(self.cell_types) & CELL_FOOD) != 0
 
     def is_position_available(self, pos, width=1, height=1):
         x, y = pos
         if 0 <= x < self.width and 0 <= y < self.height:
-            return np.all(self.grid[y:y+height, x:x+width] == 0)
+            return np.all(np.asarray(self.cell_types[y:y+height, x:x+width]) == 0)
         return False
 
 
     def mark_position_as_occupied(self, pos = tuple, width=1, height=1):
         x, y = pos
-        self.grid[y:y+height, x:x+width] = 2  # 2 représente la nourriture
+        self.set_flag((slice(y, y + height), slice(x, x + width)), CELL_OCCUPIED)
 
 
     def mark_position_as_occupied_by_empty_space(self, pos = tuple, width=1, height=1):
+        """Marque des cellules de la colonie (vides à l'affichage, mais indisponibles pour la nourriture)."""
         x, y = pos
-        self.grid[y:y+height, x:x+width] = 5  # 5 représente un espace vide
+        self.set_flag((slice(y, y + height), slice(x, x + width)), CELL_COLONY)
 
     def safe_zone(self):
         """Marque une zone sauve pour les fourmis"""
@@ -87,151 +370,236 @@ class Environment:
 
     def add_wall(self, x, y, width, height):
         """Ajoute un mur à la grille."""
-        self.walls[y:y+height, x:x+width] = 1
-        self.grid[y:y+height, x:x+width] = 1  # Met à jour la grille principale
+        self.set_flag((slice(y, y + height), slice(x, x + width)), CELL_WALL)
 
 
     def add_food(self, x, y, width, height):
         """Ajoute de la nourriture à la grille."""
-        self.food[y:y+height, x:x+width] = 1
-        self.grid[y:y+height, x:x+width] = 2  # Met à jour la grille principale
+        cells = (slice(y, y + height), slice(x, x + width))
+        self.set_flag(cells, CELL_FOOD)
+        ys, xs = np.nonzero(self.has_flag(cells, CELL_FOOD))
+        self.food_keys = insert_keys(self.food_keys, (ys + y) * self.width + (xs + x))
 
+    def remove_food(self, xs, ys):
+        """Retire la nourriture des cellules (xs, ys) et met à jour l'index."""
+        self.clear_flag((ys, xs), CELL_FOOD)
+        self.food_keys = delete_keys(self.food_keys, ys * self.width + xs)
 
-    def generate_food(self, quantity):
-        """Créer un rectangle restreint aléatoire dans lequel la nourriture apparaîtra."""
+    def closest_food_direction(self, positions, search_radius, chunk_size=4096, episodes=None):
+        """
+        Direction vers la nourriture la plus proche pour plusieurs positions.
 
-        # Taille de la sous-zone restreinte (20-50% de la taille de l'environnement)
-        restricted_zone_width = random.randint(int(self.width * 0.2), int(self.width * 0.5))
-        restricted_zone_height = random.randint(int(self.height * 0.2), int(self.height * 0.5))
+        Même fenêtre de recherche que `Ant.get_closest_food_direction` : une
+        cellule (fx, fy) est visible si x - r <= fx < x + r et y - r <= fy < y + r.
+        En cas d'égalité, la première cellule dans l'ordre ligne par ligne l'emporte.
 
-        # Position aléatoire de la sous-zone dans l'aire de jeu
-        restricted_zone_x = random.randint(0, self.width - restricted_zone_width)
-        restricted_zone_y = random.randint(0, self.height - restricted_zone_height)
+        Args:
+            positions: Tableau (N, 2) des positions [x, y]
+            search_radius: Rayon de recherche limité
+            episodes: Utilisé par les environnements batchés uniquement
 
-        #restricted_zone_x = 1
-        #restricted_zone_y = 30
+        Returns:
+            np.ndarray: tableau (N, 2) de vecteurs normalisés, [0, 0] sans nourriture visible.
+        """
+        cells = np.trunc(positions).astype(np.int64)
+        return closest_food(cells[:, 0], cells[:, 1], self.food_keys, self.width, search_radius,
+                            0, self.height, chunk_size)
 
-        # Générer la nourriture dans cette sous-zone restreinte
-        for _ in range(quantity):
-            while True:
+
+    def generate_food(self, quantity, rng=random, max_attempts=100):
+        """
+        Créer un rectangle restreint aléatoire dans lequel la nourriture apparaîtra.
+
+        :param rng: Générateur aléatoire (module `random` ou `random.Random` graine fixée).
+        :param max_attempts: Tirages rejetés tolérés par nourriture avant de tirer
+            directement parmi les cellules libres de la zone (zone presque pleine).
+        """
+
+        # Taille de la sous-zone restreinte (20-50% de la taille de l'environnement).
+        # Les tirages se font ligne d'abord (même disposition qu'auparavant dans un monde carré).
+        restricted_zone_height = rng.randint(int(self.height * 0.2), int(self.height * 0.5))
+        restricted_zone_width = rng.randint(int(self.width * 0.2), int(self.width * 0.5))
+
+        # Position aléatoire de la sous-zone dans l'aire de jeu
+        restricted_zone_y = rng.randint(0, self.height - restricted_zone_height)
+        restricted_zone_x = rng.randint(0, self.width - restricted_zone_width)
+
+        # Générer la nourriture dans cette sous-zone restreinte ; l'index est complété en une fois
+        placed = np.zeros(quantity, dtype=np.int64)
+        for i in range(quantity):
+            for _ in range(max_attempts):
                 # Coordonnées aléatoires à l'intérieur de la sous-zone restreinte
-                x = random.randint(restricted_zone_x, restricted_zone_x + restricted_zone_width - 1)
-                y = random.randint(restricted_zone_y, restricted_zone_y + restricted_zone_height - 1)
+                y = rng.randint(restricted_zone_y, restricted_zone_y + restricted_zone_height - 1)
+                x = rng.randint(restricted_zone_x, restricted_zone_x + restricted_zone_width - 1)
 
                 # Vérifier si la position est libre avant de placer la nourriture
-                if self.is_position_available((y, x)):
-                    self.add_food(y, x, 1, 1)
-                    self.mark_position_as_occupied((y, x))
+                if self.is_position_available((x, y)):
                     break
-
-
+            else:
+                # Sous-zone presque pleine : tirage direct parmi les cellules encore libres
+                free = np.argwhere(np.asarray(self.cell_types[restricted_zone_y:restricted_zone_y + restricted_zone_height,
+                                                              restricted_zone_x:restricted_zone_x + restricted_zone_width]) == 0)
+                if len(free) == 0:
+                    raise ValueError("Plus de cellule libre dans la zone de nourriture")
+                y, x = (free[rng.randrange(len(free))] + (restricted_zone_y, restricted_zone_x)).tolist()
+            self.set_flag((y, x), CELL_FOOD)
+            placed[i] = y * self.width + x
+        self.food_keys = insert_keys(self.food_keys, placed)
+
+
+    def load_layout(self, cell_types):
+        """
+        Place murs, zones mortelles et nourriture d'une couche de bits CELL_*
+        (voir `scenario.Scenario`), en une passe.
+        """
+        cell_types = np.asarray(cell_types) & LAYOUT_BITS
+        ys, xs = np.nonzero(cell_types)
+        self.set_flag((ys, xs), cell_types[ys, xs])
+        ys, xs = np.nonzero(cell_types & CELL_FOOD)
+        self.food_keys = insert_keys(self.food_keys, ys * self.width + xs)
 
     def add_death_zone(self, x, y, width, height):
         """Ajoute une zone mortelle à la grille."""
-        self.death_zones[y:y+height, x:x+width] = 1
-        self.grid[y:y+height, x:x+width] = 3  # Met à jour la grille principale
+        self.set_flag((slice(y, y + height), slice(x, x + width)), CELL_DEATH)
 
     def add_ant(self, ant):
         """Ajoute une fourmi à une position spécifique."""
         self.ants.append((ant.pos))  # Ajouter la position de la fourmi
         x, y = int(ant.pos[0]), int(ant.pos[1])
-        self.grid[x, y] = 4  # Marquer la fourmi sur la grille principale
-        pass
+        self.set_flag((y, x), CELL_ANT)  # Marquer la fourmi sur la grille
 
 
-    def check_collisions(self, ant):
+    def check_collisions(self, ants, idx=None):
         """
         Gère les collisions entre les fourmis, les murs, les zones mortelles et la nourriture.
         
         Args:
-            ant: L'objet fourmi dont on vérifie les collisions
+            ants: La population (ou une fourmi isolée) dont on vérifie les collisions
+            idx: Indices des fourmis à traiter (toutes par défaut)
         """
+        ants, idx = as_population(ants, idx)
+
         # Arrondir les coordonnées à l'entier le plus proche
-        x, y = round(ant.pos[0]), round(ant.pos[1])
+        rounded = np.round(ants.pos[idx]).astype(np.int64)
+        x, y = rounded[:, 0], rounded[:, 1]
         
         # Vérification des limites de la grille
-        if 0 <= x < self.width and 0 <= y < self.height:
-            # Vérification des collisions avec les murs
-            if self.walls[y][x] == 1:
-                self.handle_wall_collision(ant)
-                return  # Sortir après une collision avec un mur
-                
-            # Vérification des collisions avec les zones mortelles
-            if self.death_zones[y][x] == 1:
-                self.handle_death_zone_collision(ant)
-                return  # Sortir après une collision mortelle
-                
-            # Vérification des collisions avec la nourriture
-            if self.food[y][x] == 1 and not ant.has_food:
-                ant.has_food = True
-                self.handle_food_collision(ant, (y, x))
-        else:
-            # Gestion des positions hors limites
-            self.handle_wall_collision(ant)
+        inside = (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height)
+
+        # Gestion des positions hors limites
+        self.handle_wall_collision(ants, idx[~inside])
 
-    def handle_wall_collision(self, ant):
+        self.resolve_collisions(ants, idx[inside], x[inside], y[inside])
+
+    def resolve_collisions(self, ants, idx, x, y):
         """
-        Gère la collision entre une fourmi et un mur.
+        Collisions des fourmis `idx` avec le contenu des cellules (x, y), supposées
+        dans la grille : un seul accès à `cell_types`, puis un masque par issue.
         """
-        # Inverser la direction du mouvement
-        #ant.update_vec_director *= -1
+        types = self.cell_types[self.cell_index(ants, idx, x, y)]
+
+        # Vérification des collisions avec les murs (prioritaire)
+        wall = (types & CELL_WALL) != 0
+        self.handle_wall_collision(ants, idx[wall])
+
+        # Vérification des collisions avec les zones mortelles
+        death = ~wall & ((types & CELL_DEATH) != 0)
+        self.handle_death_zone_collision(ants, idx[death])
+
+        # Vérification des collisions avec la nourriture
+        food = ~wall & ~death & ((types & CELL_FOOD) != 0) & ~ants.has_food[idx]
+        idx, x, y = idx[food], x[food], y[food]
 
-        # Ajouter un petit décalage aléatoire pour éviter les blocages
-        #ant.update_vec_director += np.random.uniform(-0.1, 0.1, 2)
-        #ant.update_vec_director /= np.linalg.norm(ant.update_vec_director)
+        # Cellule disputée : la fourmi de plus petit indice ramasse la nourriture
+        order = np.argsort(idx, kind='stable')
+        keys = self.cell_keys(self.cell_index(ants, idx, x, y))
+        _, first = np.unique(keys[order], return_index=True)
+        winners = order[first]
+        self.handle_food_collision(ants, idx[winners], (x[winners], y[winners]))
 
+    def handle_wall_collision(self, ants, idx=None):
+        """
+        Gère la collision entre une fourmi et un mur.
+        """
+        ants, idx = as_population(ants, idx)
         # Reculer légèrement pour éviter le mur
-        ant.pos = np.clip(ant.pos, [0, 0], [self.width - 1, self.height - 1])
+        ants.pos[idx] = np.clip(ants.pos[idx], [0, 0], [self.width - 1, self.height - 1])
 
-    def handle_death_zone_collision(self, ant):
+    def handle_death_zone_collision(self, ants, idx=None):
         """
         Gère la collision entre une fourmi et une zone mortelle.
         """
-        ant.is_dead = True
-        x, y = int(ant.pos[0]), int(ant.pos[1])
-        self.grid[y, x] = 0
+        ants, idx = as_population(ants, idx)
+        ants.set_dead(idx)
+        # Les fourmis mortes ne sont plus affichées
+        cells = np.round(ants.pos[idx]).astype(np.int64)
+        self.clear_flag(self.cell_index(ants, idx, cells[:, 0], cells[:, 1]), CELL_ANT)
 
-    def handle_food_collision(self, ant, food_pos):
+    def handle_food_collision(self, ants, idx, food_pos):
         """
         Gère la collision entre une fourmi et de la nourriture.
+
+        Args:
+            food_pos: Tableaux (x, y) des cellules de nourriture, alignés sur `idx`
         """
-        if ant.has_food == False:
-            ant.has_food = True
-            x, y = food_pos
-            self.food[y, x] = 0
-            self.grid[y, x] = 0  # Retirer la nourriture de la grille
-            ant.pickup_location(x, y)
-        else:
-            pass
+        ants, idx = as_population(ants, idx)
+        x, y = (np.asarray(c, dtype=np.int64).reshape(-1) for c in food_pos)
+        ants.set_has_food(idx)
+        ants.pickup_location[idx] = np.column_stack((x, y))
+        self.remove_food(x, y)
 
-    def move_ant(self, ant, new_x, new_y):
+    def move_ant(self, ants, new_x, new_y, idx=None):
         """
-        Déplace une fourmi à une nouvelle position.
+        Déplace des fourmis vers de nouvelles positions.
         
         Args:
-            ant: L'objet fourmi à déplacer
-            new_x (float): Le déplacement en x à effectuer
-            new_y (float): Le déplacement en y à effectuer
+            ants: La population (ou une fourmi isolée) à déplacer
+            new_x: Le déplacement en x à effectuer, aligné sur `idx`
+            new_y: Le déplacement en y à effectuer, aligné sur `idx`
+            idx: Indices des fourmis à déplacer (toutes par défaut)
         """
-        if ant.is_dead:
-            return
+        ants, idx = as_population(ants, idx)
+        delta = np.column_stack((np.broadcast_to(new_x, idx.shape),
+                                 np.broadcast_to(new_y, idx.shape))).astype(float)
+
+        # Les fourmis mortes ne bougent plus
+        alive = ~ants.is_dead[idx]
+        idx, delta = idx[alive], delta[alive]
             
         # Obtenir et sauvegarder la position actuelle
-        current_x, current_y = round(ant.pos[0]), round(ant.pos[1])
-        ant.old_pos = np.array([current_x, current_y])
+        current = np.round(ants.pos[idx])
+        ants.old_pos[idx] = current
         
         # Calculer la nouvelle position
-        new_pos = ant.pos + np.array([new_x, new_y])
-        rounded_x, rounded_y = round(new_pos[0]), round(new_pos[1])
+        new_pos = ants.pos[idx] + delta
+        rounded = np.round(new_pos).astype(np.int64)
         
         # Vérifier les limites de la grille
-        if 0 <= rounded_x < self.width and 0 <= rounded_y < self.height:
-            # Effacer l'ancienne position dans la grille
-            self.grid[current_y][current_x] = 0
-            # Mettre à jour la position de la fourmi
-            ant.pos = new_pos
-            # Mettre à jour la grille avec la nouvelle position
-            self.grid[rounded_y][rounded_x] = 4  # Utiliser 1 au lieu de 4
+        inside = ((0 <= rounded[:, 0]) & (rounded[:, 0] < self.width)
+                  & (0 <= rounded[:, 1]) & (rounded[:, 1] < self.height))
+        current = current[inside].astype(np.int64)
+        rounded = rounded[inside]
+        idx = idx[inside]
+
+        # Effacer les anciennes positions dans la grille
+        self.clear_flag(self.cell_index(ants, idx, current[:, 0], current[:, 1]), CELL_ANT)
+        # Mettre à jour la position des fourmis
+        ants.pos[idx] = new_pos[inside]
+        # Mettre à jour la grille avec les nouvelles positions
+        self.set_flag(self.cell_index(ants, idx, rounded[:, 0], rounded[:, 1]), CELL_ANT)
+
+    def step_ants(self, ants, new_x, new_y, idx=None):
+        """
+        Déplace les fourmis `idx` puis résout leurs collisions en une passe.
+
+        Équivaut à `move_ant` suivi de `check_collisions` : `move_ant` ne laisse
+        aucune fourmi quitter la grille, les cellules arrondies sont donc
+        directement confrontées à `cell_types`, sans test des limites.
+        """
+        ants, idx = as_population(ants, idx)
+        self.move_ant(ants, new_x, new_y, idx)
+        cells = np.round(ants.pos[idx]).astype(np.int64)
+        self.resolve_collisions(ants, idx, cells[:, 0], cells[:, 1])
 
             
 
@@ -240,78 +608,76 @@ class Environment:
         """Affiche la grille avec des symboles pour chaque entité."""
         
         symbols = {0: '.', 1: '#', 2: 'F', 3: 'D', 4: 'A'}  # Symboles pour vide, mur, nourriture, zone mortelle, fourmi
+        grid = self.grid
         for y in range(self.height):
-            row = ''.join(symbols[self.grid[y, x]] for x in range(self.width))
+            row = ''.join(symbols[grid[y, x]] for x in range(self.width))
             #print(row)
         
-        print(self.grid)
+        print(grid)
 
-    def draw_grid(self, screen):
+    def draw_grid(self, screen, full=False):
         """
         Dessine la grille en fonction de son contenu.
         :param screen: Surface Pygame où dessiner.
-        :param environment: Instance de l'environnement contenant les grilles.
-        """
-        for x in range(self.width):
-            for y in range(self.height):
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-
-
-                # Déterminer la couleur de la cellule
-                if self.grid[y, x] == 1:
-                    color = COLOR_WALL
-                elif self.grid[y, x] == 3:
-                    color = COLOR_DEATH_ZONE
-                elif self.grid[y, x] == 2:
-                    color = COLOR_FOOD
-                elif self.grid[y, x] == 4:
-                    color = COLOR_ANT
-                else:
-                    color = COLOR_EMPTY
-
-                # Dessiner la cellule
-                pygame.draw.rect(screen, color, rect)
-
-                # Dessiner les phéromones en superposition
-                for pheromone_type in range(self.pheromone_system.num_types):
-                    pheromone_level = self.pheromone_system.get_pheromone_level(x, y, pheromone_type)
-                    if pheromone_level > 0:  # Si un niveau de phéromone existe
-                        # Ajuster l'intensité de la couleur en fonction du niveau
-                        alpha = min(255, int(pheromone_level * 50))  # Convertir le niveau en transparence (0-255)
-                        if pheromone_type == 0:
-                            pheromone_color = (alpha, 0, alpha)  # violet translucide pour les phéromones de type 0
-                        if pheromone_type == 1:
-                            pheromone_color = (alpha, 0, 0)      # rouge translucide pour les phéromones de type 1
-                        if pheromone_type == 2:
-                            pheromone_color = (0, alpha, alpha)  # bleu translucide pour les phéromones de type 2
-                        if pheromone_color == (0, 0, 0):
-                            pheromone_color = COLOR_EMPTY
-                        pygame.draw.rect(screen, pheromone_color, rect, width=1)  # Superposition fine
+        :param full: Redessiner toute la grille plutôt que les seules cellules modifiées.
+        :return: Rectangles modifiés, à passer à `pygame.display.update`.
+        """
+        if self.renderer is None:
+            self.renderer = GridRenderer()
+        return self.renderer.draw(screen, self, full)
 
 
 class Simulation:
-    def __init__(self, width = int, height = int, num_ants = int, num_food = int):
-        self.env = Environment(width, height)
+    recorder = None  # TrajectoryRecorder de l'épisode en cours (voir `run`)
+
+    def __init__(self, width = int, height = int, num_ants = int, num_food = int, seed = None,
+                 timer = NULL_TIMER, shared_exploration = False, termination = ('dead',),
+                 max_idle_time = 50, scenario = None, **env_options):
+        """
+        :param seed: Graine de la disposition de la nourriture (None = aléatoire).
+        :param timer: PhaseTimer qui mesure les phases de chaque pas (désactivé par défaut).
+        :param shared_exploration: Récompenser la première visite d'une cellule par la
+            colonie plutôt que par chaque fourmi.
+        :param termination: Conditions d'arrêt anticipé de l'épisode, parmi
+            'dead' (toutes les fourmis mortes), 'food' (toute la nourriture ramassée
+            et déposée) et 'idle' (toute la colonie inactive depuis `max_idle_time`).
+        :param max_idle_time: Pas sans nourriture au-delà desquels une fourmi est inactive
+            (condition 'idle' ; à garder sous le nombre de pas de l'épisode).
+        :param scenario: scenario.Scenario qui remplace la nourriture aléatoire (murs,
+            zones mortelles et nourriture ; `num_food` et `seed` sont alors ignorés).
+        :param env_options: Options de stockage transmises à `Environment`.
+        """
+        self.timer = timer
+        unknown = set(termination) - set(TERMINATION_CONDITIONS)
+        if unknown:
+            raise ValueError(f"Conditions d'arrêt inconnues : {sorted(unknown)}")
+        self.termination = tuple(termination)
+        self.steps_run = 0  # Pas effectivement simulés
+        self.termination_reason = None  # Condition ayant arrêté l'épisode
+        self.env = Environment(width, height, **env_options)
         self.colony_pos = (width // 2, height // 2)
         self.colony_radius = 5 # taille de la colonie
         self.env.mark_position_as_occupied(self.colony_pos)
-        self.ants = [Ant(self.colony_pos[0], self.colony_pos[1], self.env) for _ in range(num_ants)]
-        self.env.generate_food(num_food)
+        self.ants = AntPopulation(num_ants, self.colony_pos[0], self.colony_pos[1], self.env,
+                                  shared_visits=shared_exploration)
+        if scenario is not None:
+            # Monde généré à l'avance (voir scenario.ScenarioCache)
+            self.env.load_layout(scenario.cell_types)
+            num_food = scenario.num_food
+        else:
+            # Disposition de la nourriture : aléatoire, ou reproductible si une graine est donnée
+            self.env.generate_food(num_food, random if seed is None else random.Random(seed))
         self.num_food = num_food
         self.total_food_collected = self.compute_total_food_collected(self.ants)
-        self.max_idle_time = 150 # Exemple de temps max d'inactivité
+        self.max_idle_time = max_idle_time
         self.x_min = max(0, self.colony_pos[0] - self.colony_radius)
         self.x_max = min(self.env.width, self.colony_pos[0] + self.colony_radius + 1)
         self.y_min = max(0, self.colony_pos[1] - self.colony_radius)
         self.y_max = min(self.env.height, self.colony_pos[1] + self.colony_radius + 1)
 
-        for x in range(self.x_min, self.x_max):
-            for y in range(self.y_min, self.y_max):
-                self.env.mark_position_as_occupied_by_empty_space((y, x))
+        self.env.mark_position_as_occupied_by_empty_space((self.x_min, self.y_min), self.x_max - self.x_min,
+                                                          self.y_max - self.y_min)
 
-    def compute_total_food_collected(self, ants): 
-        return sum(ant.has_food for ant in ants) 
-    
     def compute_distance(self, pos1, pos2): 
         return np.linalg.norm(np.array(pos1) - np.array(pos2))
 
@@ -319,63 +685,67 @@ class Simulation:
         """
         Calcule la quantité totale de nourriture rapportée à la colonie.
         
-        :param ants: La liste des fourmis dans la colonie.
+        :param ants: La population de la colonie.
         :return: Le nombre total de nourriture collectée par la colonie.
         """
-        total_food_collected = sum(1 for ant in ants if ant.has_food)
-        return total_food_collected
+        return ants.food_carried  # Compteur tenu à jour à chaque ramassage / dépôt
     
-    def compute_fitness(self, ant):
+    def food_collected(self, idx):
+        """Nourriture collectée par la colonie (un total commun à toutes les fourmis `idx`)."""
+        self.total_food_collected = self.compute_total_food_collected(self.ants)
+        return self.total_food_collected
+
+    def compute_fitness(self, idx):
         """
-        Calcule la fitness d'une fourmi.
+        Calcule la fitness des fourmis d'indices `idx` en une seule passe.
+
+        :param idx: Indices des fourmis à évaluer (ou une fourmi isolée).
+        :return: Tableau des fitness, aligné sur `idx` (un float pour une fourmi isolée).
         """
-        fitness = 0
+        if isinstance(idx, Ant):
+            return float(self.compute_fitness(np.array([idx.index]))[0])
+
+        ants = self.ants
+        idx = np.asarray(idx, dtype=np.intp)
+        fitness = np.zeros(len(idx))
         max_reward = 100.0  # Récompense maximale collective
 
         # Mise à jour collective du total de nourriture
-        self.total_food_collected = sum(1 for ant in self.ants if ant.has_food)
-        progress_ratio = self.total_food_collected / self.num_food
+        collected = self.food_collected(idx)
+        progress_ratio = collected / self.num_food
+
+        has_food = ants.has_food[idx]
 
         # 1. **Récompense pour ramassage de nourriture**
-        if ant.has_food:
-            fitness += 10  # Récompense modérée pour collecte individuelle
+        fitness += np.where(has_food, 10, 0)  # Récompense modérée pour collecte individuelle
 
         # 2. **Récompense pour retour à la colonie**
-        x_min = max(0, self.colony_pos[0] - self.colony_radius)
-        x_max = min(self.env.width, self.colony_pos[0] + self.colony_radius + 1)
-        y_min = max(0, self.colony_pos[1] - self.colony_radius)
-        y_max = min(self.env.height, self.colony_pos[1] + self.colony_radius + 1)
-
-        x, y = int(ant.pos[0]), int(ant.pos[1])
-        if x_min <= x <= x_max and y_min <= y <= y_max and ant.has_food:
-            fitness += 30  # Récompense significative pour retour réussi
-            ant.has_food = False  # Dépose la nourriture
+        cells = ants.pos[idx].astype(np.int64)
+        x, y = cells[:, 0], cells[:, 1]
+        delivered = (has_food & (self.x_min <= x) & (x <= self.x_max)
+                     & (self.y_min <= y) & (y <= self.y_max))
+        fitness += np.where(delivered, 30, 0)  # Récompense significative pour retour réussi
+        ants.deliver(idx[delivered])  # Dépose la nourriture
 
         # 3. **Pénalité pour immobilité**
-        distance_traveled = np.linalg.norm(ant.pos - ant.old_pos)
-        if distance_traveled < 10:  # Seuil minimal de mouvement
-            fitness -= 5.0  # Pénalité plus forte pour éviter la stagnation
+        distance_traveled = np.linalg.norm(ants.pos[idx] - ants.old_pos[idx], axis=1)
+        fitness -= np.where(distance_traveled < 10, 5.0, 0)  # Seuil minimal de mouvement
 
         # 4. **Récompense pour exploration**
-        current_pos = tuple(ant.pos)
-        if current_pos not in ant.visited_positions:
-            ant.visited_positions.add(current_pos)
-            fitness += 1.0  # Récompense pour chaque nouvelle position explorée
+        first_visit = ants.visits.mark(idx, x, y)
+        fitness += np.where(first_visit, 1.0, 0)  # Récompense pour chaque nouvelle position explorée
 
         # 5. **Récompense pour dépôt de phéromones**
-        if ant.deposit_pheromone:
-            fitness += 3  # Récompense légère pour encouragement à la communication
+        fitness += np.where(ants.deposit_pheromone[idx], 3, 0)  # Encouragement à la communication
 
         # 6. **Progression collective**
         fitness += progress_ratio * 50  # Récompense proportionnelle aux progrès collectifs
 
         # 7. **Pénalité pour mort**
-        if ant.is_dead:
-            fitness -= 20  # Pénalité significative pour mort
+        fitness -= np.where(ants.is_dead[idx], 20, 0)  # Pénalité significative pour mort
 
         # 8. **Bonus final pour objectif atteint**
-        if self.total_food_collected == self.num_food:
-            fitness += max_reward  # Bonus pour collecte complète
+        fitness += np.where(collected == self.num_food, max_reward, 0)  # Bonus pour collecte complète
 
         return fitness
 
@@ -383,127 +753,447 @@ class Simulation:
 
 
     def update(self, networks):
-        """Met à jour l'état de la simulation à chaque étape."""
-        for i, ant in enumerate(self.ants):
-            if not ant.is_dead:
-                if i < len(networks):
-                    genome, net = networks[i]
-                    self.update_ant(ant, genome, net)  # Gère le déplacement et les phéromones
+        """
+        Met à jour l'état de la simulation à chaque étape.
 
-        # Appliquer l'évaporation des phéromones
-        self.env.pheromone_system.evaporate()
+        :param networks: BatchNetwork, ou liste de tuples (génome, réseau) alignée sur les fourmis.
+        """
+        timer = self.timer
+        with timer.phase('step'):
+            # Fourmis vivantes associées à un réseau
+            idx = self.ants.alive()
+            idx = idx[idx < len(networks)]
+
+            if len(idx) > 0:
+                with timer.phase('sense'):
+                    # Index spatial des fourmis, construit une fois par pas
+                    neighbours = NeighbourGrid(self.ants.pos)
+                    inputs = self.ants.get_inputs(self.env, idx, neighbours)
+                with timer.phase('activate'):
+                    if isinstance(networks, BatchNetwork):
+                        outputs = networks.activate(inputs, idx)
+                        genomes = networks.genomes
+                    else:
+                        outputs = np.array([networks[i][1].activate(x) for i, x in zip(idx, inputs.tolist())])
+                        genomes = [genome for genome, _ in networks]
+                fitness = self.apply_outputs(idx, outputs)  # Gère le déplacement et les phéromones
+                self.ants.update_idle_time()
+
+                # Affecter le fitness aux génomes
+                self.ants.fitness[idx] += fitness
+                for i, f in zip(idx.tolist(), fitness.tolist()):
+                    genomes[i].fitness += f
+                timer.count('ant_steps', len(idx))
+                timer.count('activations', len(idx))
+
+            with timer.phase('evaporate'):
+                # Appliquer l'évaporation des phéromones
+                self.env.pheromone_system.evaporate()
+                # Préparer la perception du pas suivant (grille dense uniquement)
+                if self.env.pheromone_system.uses_integral:
+                    self.env.pheromone_system.build_integral()
 
     def update_ant(self, ant, genome, net):
         """Met à jour une seule fourmi."""
-        x = ant.get_inputs(self.env, self.ants)
-        output = net.activate(x)
-        # Déplacer la fourmi de manière aléatoire
-        #rx, ry = random.randint(-1, 1), random.randint(-1, 1)
+        timer = self.timer
+        with timer.phase('sense'):
+            x = ant.get_inputs(self.env, self.ants)
+        with timer.phase('activate'):
+            output = net.activate(x)
+        fitness = self.apply_outputs(np.array([ant.index]), np.array([output]))
+        timer.count('ant_steps')
+        timer.count('activations')
+        ant.fitness += fitness[0]
+        genome.fitness += float(fitness[0])
+
+    def apply_outputs(self, idx, outputs):
+        """
+        Applique les sorties des réseaux aux fourmis d'indices `idx`.
+
+        :param outputs: Tableau (len(idx), 4) des sorties des réseaux.
+        :return: Tableau des fitness obtenues à cette étape.
+        """
+        ants = self.ants
+        timer = self.timer
         # Déplacer la fourmi et déposer des phéromones en utilisant les outputs du réseau neuronal
         # outupt size = 4
-        dx = int(output[0]) # mvt en x
-        dy = int(output[1]) # mvt en y
-        z_type = int(output[2]) # type de phéromones
-        z_amount = int(output[3]) * 10 # quantitées de pheromones lachés multiplié par un facteur 10
-        self.env.move_ant(ant, dx, dy)
-
-        if z_amount != 0:
-            ant.deposit_pheromone = True
-            ant.type = z_type
-        else:
-            ant.deposit_pheromone = False
-            ant.type = z_type
-
-        x, y = int(ant.pos[0]), int(ant.pos[1])
-        # Dépôt de phéromones avec une probabilité de 25%
-        #if 0 <= x < self.env.width and 0 <= y < self.env.height and random.random() < 0.25:
-            #self.env.pheromone_system.deposit(x, y, pheromone_type=0, amount=10)
-        self.env.pheromone_system.deposit(x, y, pheromone_type=z_type, amount=z_amount)
-
-        # Gérer les collisions après le déplacement
-        self.env.check_collisions(ant)
-        # Affecter le fitness au génome
-        fitness = self.compute_fitness(ant)
-        genome.fitness += fitness
-
-        # Afficher l'état de la fourmi pour débogage
-        #print(f" Inputs:{ant.state()}")
-        #print()
-        #print(f"Output : {output}")
-        
-    def run(self, steps, display, networks):
-        """Lance la simulation pour un nombre donné de pas."""
+        outputs = np.trunc(outputs).astype(np.int64)
+        dx = outputs[:, 0] # mvt en x
+        dy = outputs[:, 1] # mvt en y
+        z_type = outputs[:, 2] # type de phéromones
+        z_amount = outputs[:, 3] * 10 # quantitées de pheromones lachés multiplié par un facteur 10
+        # Déplacement et collisions en une passe ; les collisions ne modifient pas
+        # les positions dans la grille, les dépôts restent donc aux mêmes cellules
+        with timer.phase('move'):
+            self.env.step_ants(ants, dx, dy, idx)
+
+        ants.deposit_pheromone[idx] = z_amount != 0
+        ants.pheromone_type[idx] = z_type
+
+        with timer.phase('deposit'):
+            self.deposit_pheromones(idx, z_type, z_amount)
+
+        with timer.phase('fitness'):
+            return self.compute_fitness(idx)
         
-        if display == False:
+    def check_termination(self):
+        """
+        Condition d'arrêt atteinte, ou None.
+
+        Les compteurs de la colonie rendent ce test O(1) (sauf 'idle').
+        """
+        ants = self.ants
+        if 'dead' in self.termination and ants.num_dead == len(ants):
+            return 'dead'
+        if ('food' in self.termination and len(self.env.food_keys) == 0
+                and ants.food_carried == 0):
+            return 'food'
+        if 'idle' in self.termination:
+            alive = ~ants.is_dead
+            if alive.any() and np.all(ants.idle_time[alive] > self.max_idle_time):
+                return 'idle'
+        return None
+
+    def step(self, networks):
+        """Un pas de simulation ; renvoie False si l'épisode est terminé."""
+        self.update(networks)
+        self.steps_run += 1
+        self.termination_reason = self.check_termination()
+        if self.recorder is not None:
+            self.recorder.record(self)
+        return self.termination_reason is None
+
+    def deposit_pheromones(self, idx, types, amounts):
+        """Dépose les phéromones des fourmis d'indices `idx`, dans l'ordre des fourmis."""
+        cells = self.ants.pos[idx].astype(np.int64)
+        if self.recorder is not None:
+            self.recorder.deposit(cells, types, amounts)
+        episodes = None if self.ants.episode is None else self.ants.episode[idx]
+        self.env.pheromone_system.deposit_many(cells[:, 0], cells[:, 1], types, amounts, episodes)
+
+    def run(self, steps, display, networks, recorder=None):
+        """
+        Lance la simulation pour au plus `steps` pas.
+
+        L'épisode s'arrête plus tôt si une condition de `termination` est atteinte.
+
+        :param recorder: TrajectoryRecorder qui enregistre chaque pas (optionnel).
+        :return: Le nombre de pas simulés.
+        """
+        if recorder is not None:
+            self.recorder = recorder
+            recorder.begin(self)
+            try:
+                return self.run(steps, display, networks)
+            finally:
+                recorder.close(self)
+                self.recorder = None
+
+        if not display:
             for _ in range(steps):
-                self.update(networks)
+                if not self.step(networks):
+                    break
             #self.env.display_grid()
         else:
-            # Boucle principale
-            screen = pygame.display.set_mode((self.env.width * CELL_SIZE, self.env.height * CELL_SIZE))
-
-            clock = pygame.time.Clock()
-            
-            for _ in range(steps):
+            # Affichage dans un processus séparé : la simulation n'attend pas le rendu.
+            # `display` peut être un AsyncRenderer partagé entre épisodes ; sinon toutes
+            # les images sont affichées (relecture, au rythme de l'affichage).
+            renderer = display if isinstance(display, AsyncRenderer) else \
+                AsyncRenderer(self.env.width, self.env.height, cell_size=CELL_SIZE, block=True)
+            try:
+                for _ in range(steps):
                     # Mettre à jour l'état des fourmis
-                    self.update(networks)
-                    # Effacer l'écran
-                    screen.fill(COLOR_EMPTY)
-
-                    # Dessiner la grille et les fourmis
-                    self.env.draw_grid(screen)
-
-                    # Mettre à jour l'affichage
-                    pygame.display.flip()
-                    clock.tick(60)  # Limiter à 60 FPS
-
-            pygame.quit()
+                    running = self.step(networks)
+
+                    # Envoyer une copie de la grille et des phéromones à l'affichage
+                    renderer.submit(self.env)
+                    if not running:
+                        break
+            finally:
+                if renderer is not display:
+                    renderer.close()
             self.colony_pos
+        return self.steps_run
 
 
 steps = 150
+min_steps = None # Budget de pas de la première génération (None = `steps` dès le départ)
+step_growth = 0 # Pas ajoutés au budget à chaque génération, jusqu'à `steps`
+termination = ('dead',) # Arrêt anticipé : 'dead', 'food' et/ou 'idle' (voir Simulation.check_termination)
+max_idle_time = 50 # Pas sans nourriture avant qu'une fourmi soit inactive (condition 'idle')
 config_path = 'config.txt'
 generations = 50000
 pop_size = 50
-display = False # En 'True' on teste la population. En 'False' on entraine la population
 env_size = 50
+num_workers = 1 # Nombre de processus d'évaluation (1 = évaluation dans le processus principal)
+num_episodes = 1 # Nombre d'épisodes (dispositions de nourriture) par génome et par génération
+episode_seed = None # Graine de base des épisodes (None = dispositions aléatoires)
+batched_episodes = False # Simuler les épisodes d'une génération ensemble (BatchedSimulation)
+checkpoint_interval = 50 # Générations entre deux sauvegardes (None = désactivé)
+checkpoint_seconds = None # Secondes entre deux sauvegardes (None = désactivé)
+checkpoint_prefix = 'checkpoints/neat-checkpoint-' # Préfixe des fichiers de sauvegarde
+keep_checkpoints = 5 # Sauvegardes conservées, les plus anciennes sont supprimées (None = toutes)
+resume = False # Reprendre l'entraînement depuis la dernière sauvegarde
+shared_exploration = False # Récompense d'exploration par colonie (True) ou par fourmi (False)
+profile_phases = False # Mesurer le temps de chaque phase de la simulation (rapport par génération)
+profile_csv = None # Fichier CSV des mesures par génération (optionnel)
+profile_json = None # Fichier JSON des mesures par génération (optionnel)
+record_every = None # Enregistrer un épisode sur N de chaque processus (None = désactivé)
+record_dir = 'recordings' # Répertoire des enregistrements (voir recorder.py)
+curriculum_stages = None # Étapes [(génération de début, options de scenario.generate_scenario)] (None = nourriture seule)
+num_worlds = 16 # Mondes distincts par étape du curriculum
+scenario_dir = 'scenarios' # Cache des mondes générés
+scenario_mmap = False # Projeter en mémoire les mondes lus dans le cache
+pheromone_diffusion = 0.0 # Diffusion des phéromones vers les cellules voisines (0 = désactivée)
+listen_address = None # 'hôte:port' : évaluation par des travailleurs distants (voir distributed.py)
+episodes_per_task = 1 # Graines confiées à la fois à un travailleur distant
+network_cache_size = 1024 # Génomes compilés gardés d'une génération à l'autre (cache LRU par processus)
+display_training = False # Afficher les épisodes de l'entraînement (images abandonnées si l'affichage est en retard)
+cluster_authkey = os.environ.get('ANT_COLONY_AUTHKEY', '').encode() or None # Clé partagée coordinateur / travailleurs (obligatoire hors de localhost)
 # temps < 0.5 seconds pour 1 générations avec une population de 50 fourmis
 
-def eval_genomes(genomes, config):
-    # Création de l'environnement
-    env = Simulation(width=env_size, height=env_size, num_ants=pop_size, num_food=12)
-    # Créer une liste pour stocker les réseaux neuronaux associés aux fourmis
-    networks = []
-    
+class StepBudget(neat.reporting.BaseReporter):
+    """
+    Budget de pas par génération : `initial` pas à la génération 0, puis
+    `growth` pas de plus par génération, sans dépasser `maximum`.
+    """
+
+    def __init__(self, maximum, initial=None, growth=0):
+        self.maximum = maximum
+        self.initial = maximum if initial is None else initial
+        self.growth = growth
+        self.steps = self.initial
+
+    def steps_for(self, generation):
+        return min(self.maximum, self.initial + self.growth * generation)
+
+    def start_generation(self, generation):
+        self.steps = self.steps_for(generation)
+
+
+_episode_counter = count()  # Épisodes simulés par ce processus (échantillonnage des enregistrements)
+_scenario_cache = None  # ScenarioCache de ce processus, créé au premier monde
+
+
+def episode_scenario(curriculum, seed=None):
+    """Monde de l'épisode de graine `seed` selon le curriculum, ou None (nourriture seule)."""
+    global _scenario_cache
+    if curriculum is None:
+        return None
+    if _scenario_cache is None:
+        _scenario_cache = ScenarioCache(scenario_dir, scenario_mmap)
+    return _scenario_cache.get(env_size, env_size, curriculum.world_seed(seed), **curriculum.options)
+
+
+def episode_recorder(genomes, seed=None):
+    """TrajectoryRecorder d'un épisode sur `record_every`, ou None."""
+    episode = next(_episode_counter)
+    if not record_every or episode % record_every != 0:
+        return None
+    path = os.path.join(record_dir, f'episode-{os.getpid()}-{episode:06d}')
+    return TrajectoryRecorder(path, seed=seed, genome_keys=[genome_id for genome_id, _ in genomes])
 
-    # Associer chaque fourmi à un génome et un réseau neuronal
+
+_network_cache = None
+
+
+def network_cache():
+    """Cache des réseaux compilés (et des fitness à graine fixée) de ce processus."""
+    global _network_cache
+    if _network_cache is None or _network_cache.maxsize != network_cache_size:
+        _network_cache = NetworkCache(network_cache_size)
+    return _network_cache
+
+
+def fitness_key(networks, seed, num_steps, curriculum):
+    """Clé d'un épisode déterministe pour le cache des fitness (None si la graine est aléatoire)."""
+    if seed is None:
+        return None
+    options = None if curriculum is None else json.dumps(curriculum.options, sort_keys=True)
+    return networks.colony_key, seed, num_steps, options
+
+
+def run_episode(genomes, config, seed=None, display=False, timer=NULL_TIMER, num_steps=None,
+                curriculum=None):
+    """
+    Simule un épisode pour toute la population.
+
+    Args:
+        timer: PhaseTimer qui accumule les durées des phases de l'épisode
+        num_steps: Nombre maximal de pas (`steps` par défaut)
+        curriculum: scenario.Curriculum qui choisit le monde de l'épisode (optionnel)
+
+    Returns:
+        np.ndarray: fitness de chaque génome, dans l'ordre de `genomes`.
+    """
+    # Associer chaque fourmi à un génome ; les réseaux sont compilés et évalués en lot
     for genome_id, genome in genomes:
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
         genome.fitness = 0
-        networks.append((genome, net))  # Ajouter le réseau neuronal et le génome associés à la fourmi
-
+    cache = network_cache()
+    networks = cache.networks(genomes, config, timer)
+    budget = steps if num_steps is None else num_steps
+    recorder = episode_recorder(genomes, seed)
+
+    # Même colonie, même graine : l'épisode est déterministe, sa fitness est déjà connue
+    key = fitness_key(networks, seed, budget, curriculum) if not display and recorder is None else None
+    fitness = cache.lookup_fitness(key) if key is not None else None
+    if fitness is not None:
+        timer.count('fitness_cache_hits')
+        for (genome_id, genome), f in zip(genomes, fitness):
+            genome.fitness = float(f)
+        return fitness
 
+    # Création de l'environnement
+    env = Simulation(width=env_size, height=env_size, num_ants=pop_size, num_food=12, seed=seed,
+                     timer=timer, shared_exploration=shared_exploration, termination=termination,
+                     max_idle_time=max_idle_time, scenario=episode_scenario(curriculum, seed), pheromone_diffusion=pheromone_diffusion)
     # Lancer la simulation pour toutes les fourmis avec les réseaux neuronaux
-    env.run(steps=steps, display=display, networks=networks)
+    env.run(steps=budget, display=display, networks=networks, recorder=recorder)
+    timer.count('steps_skipped', budget - env.steps_run)
+    fitness = np.array([genome.fitness for genome_id, genome in genomes])
+    if key is not None:
+        cache.store_fitness(key, fitness)
+    return fitness
+
+
+def run_episodes(genomes, config, seeds, timer=NULL_TIMER, num_steps=None, curriculum=None):
+    """
+    Simule plusieurs épisodes ensemble (une graine par épisode) avec BatchedSimulation.
+
+    Returns:
+        np.ndarray: tableau (len(seeds), len(genomes)), identique à un appel de
+        `run_episode` par graine.
+    """
+    from batched import BatchedSimulation  # batched importe ce module
+
+    cache = network_cache()
+    networks = cache.networks(genomes, config, timer)
+    budget = steps if num_steps is None else num_steps
 
+    # Épisodes déjà simulés avec la même colonie et la même graine
+    keys = [fitness_key(networks, seed, budget, curriculum) for seed in seeds]
+    known = [cache.lookup_fitness(key) if key is not None else None for key in keys]
+    if all(fitness is not None for fitness in known):
+        timer.count('fitness_cache_hits', len(seeds))
+        return np.array(known)
 
-def run(config_path):
+    sim = BatchedSimulation(env_size, env_size, pop_size, 12, seeds, timer=timer,
+                            shared_exploration=shared_exploration, termination=termination,
+                            max_idle_time=max_idle_time, scenarios=[episode_scenario(curriculum, seed) for seed in seeds],
+                            pheromone_diffusion=pheromone_diffusion)
+    sim.run(steps=budget, display=False, networks=networks)
+    timer.count('steps_skipped', int(np.sum(budget - sim.steps_run)))
+
+    fitness = np.zeros((len(seeds), len(genomes)))
+    shared = min(pop_size, len(genomes))  # Génomes pilotant une fourmi
+    fitness[:, :shared] = sim.episode_fitness()[:, :shared]
+    for key, episode_fitness in zip(keys, fitness):
+        if key is not None:
+            cache.store_fitness(key, episode_fitness)
+    return fitness
+
+
+def worker_settings():
+    """Réglages du module à reproduire dans les processus de travail (pool ou travailleurs distants)."""
+    names = ('steps', 'env_size', 'pop_size', 'termination', 'max_idle_time', 'shared_exploration',
+             'pheromone_diffusion', 'scenario_dir', 'scenario_mmap', 'record_every', 'record_dir',
+             'network_cache_size')
+    return {name: globals()[name] for name in names}
+
+
+def eval_genomes(genomes, config, timer=NULL_TIMER, num_steps=None, display=False, curriculum=None):
+    run_episode(genomes, config, display=display, timer=timer, num_steps=num_steps, curriculum=curriculum)
+
+
+def display_genomes(genomes, config):
+    """Fonction de fitness qui affiche l'épisode dans une fenêtre."""
+    eval_genomes(genomes, config, display=True)
+
+
+def run(config_path, resume=False):
+    """
+    Entraîne la population NEAT.
+
+    Args:
+        resume: Reprendre depuis la dernière sauvegarde de `checkpoint_prefix` si elle existe
+    """
     config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
                         neat.DefaultSpeciesSet, neat.DefaultStagnation,
                         config_path)
-    
-    p = neat.Population(config)
-    p.add_reporter(neat.StdOutReporter(True))
-    stats = neat.StatisticsReporter()
-    p.add_reporter(stats)
+
+    checkpoint = latest_checkpoint(checkpoint_prefix) if resume else None
+    if checkpoint is not None:
+        print(f"Reprise depuis {checkpoint}")
+        p = restore_checkpoint(checkpoint, config)
+    else:
+        p = neat.Population(config)
     #p.population = population
 
+    # Mesure des phases (sans coût si désactivée)
+    timer = PhaseTimer() if profile_phases else NULL_TIMER
+    # Budget de pas croissant au fil des générations
+    budget = StepBudget(steps, min_steps, step_growth)
+    # Mondes générés (murs, zones mortelles), de plus en plus difficiles
+    curriculum = Curriculum(curriculum_stages, num_worlds) if curriculum_stages else None
+
+    def add_reporters(p):
+        p.add_reporter(neat.StdOutReporter(True))
+        p.add_reporter(neat.StatisticsReporter())
+        p.add_reporter(budget)
+        if curriculum is not None:
+            p.add_reporter(curriculum)
+        if evaluator is not None:
+            p.add_reporter(evaluator)  # Graines des épisodes selon la génération de `p`
+        if timer.enabled:
+            p.add_reporter(TimingReporter(timer, profile_csv, profile_json))
+        checkpointer = AsyncCheckpointer(p, checkpoint_interval, checkpoint_seconds, checkpoint_prefix,
+                                         keep=keep_checkpoints)
+        p.add_reporter(checkpointer)
+        return checkpointer
+
+    # Évaluation sur plusieurs épisodes et/ou plusieurs processus
+    evaluator = None
+    renderer = None
+    fitness_function = lambda genomes, config: eval_genomes(genomes, config, timer, budget.steps,
+                                                            display=renderer or False, curriculum=curriculum)
+    if listen_address is not None:
+        evaluator = DistributedEvaluator(run_episodes if batched_episodes else run_episode, num_episodes,
+                                         episode_seed, parse_address(listen_address), cluster_authkey,
+                                         timer=timer, batch_episodes=batched_episodes,
+                                         episodes_per_task=episodes_per_task, settings=worker_settings())
+        print(f"En attente des travailleurs sur {evaluator.address[0]}:{evaluator.address[1]}")
+    elif num_workers > 1 or num_episodes > 1:
+        if batched_episodes:
+            evaluator = ParallelEvaluator(run_episodes, num_workers, num_episodes, episode_seed, timer=timer,
+                                          batch_episodes=True, settings=worker_settings())
+        else:
+            evaluator = ParallelEvaluator(run_episode, num_workers, num_episodes, episode_seed, timer=timer,
+                                          settings=worker_settings())
+    if evaluator is not None:
+        fitness_function = lambda genomes, config: evaluator.evaluate(genomes, config, num_steps=budget.steps,
+                                                                      curriculum=curriculum)
+        if display_training:
+            print("Affichage de l'entraînement ignoré : épisodes évalués hors du processus principal")
+    elif display_training:
+        # Une seule fenêtre pour tout l'entraînement ; l'évaluation ne l'attend jamais
+        renderer = AsyncRenderer(env_size, env_size, cell_size=CELL_SIZE)
+
+    checkpointer = add_reporters(p)
+
     try:
-        winner = p.run(eval_genomes, generations)
+        winner = p.run(fitness_function, max(generations - p.generation, 0))
     except neat.CompleteExtinctionException:
         print("Extinction complète : réinitialisation de la population.")
+        checkpointer.wait()
         p = neat.Population(config)  # Réinitialiser la population avec la même configuration
-        winner = p.run(eval_genomes, generations)
+        checkpointer = add_reporters(p)
+        winner = p.run(fitness_function, generations)
+    finally:
+        checkpointer.wait()
+        if evaluator is not None:
+            evaluator.close()
+        if renderer is not None:
+            renderer.close()
 
     with open('best_gen.pkl', 'wb') as f:
         pickle.dump(winner, f)
@@ -543,11 +1233,11 @@ def test(genomes, config_path, all):
     population.add_reporter(stats)
 
     try:
-        winner = population.run(eval_genomes, 1)  # Exécuter pour une seule génération
+        winner = population.run(display_genomes, 1)  # Exécuter pour une seule génération
     except neat.CompleteExtinctionException:
         print("Extinction complète : réinitialisation de la population.")
         population = neat.Population(config)  # Réinitialiser la population avec la même configuration
-        winner = population.run(eval_genomes, 1)  # Exécuter pour une seule génération
+        winner = population.run(display_genomes, 1)  # Exécuter pour une seule génération
 
 def replay_genome(all, config_path='config.txt', genome_path="best_gen.pkl"):
     """
@@ -563,14 +1253,131 @@ def replay_genome(all, config_path='config.txt', genome_path="best_gen.pkl"):
 
     # Convertir le génome chargé en une structure de données requise
     genomes = [(pop_size, genome)]
-    ic(genomes)
     # Appeler la fonction de test avec le génome chargé
     test(genomes, config_path, all)
 
 
-if display == False:
-    # Entrainement de la population
-    run(config_path)
-else:
-    # Tester le meilleur genome
-    replay_genome(all = False)
+def main(argv=None):
+    """
+    Point d'entrée en ligne de commande :
+        python simulation.py train [--resume] [--generations N] ...
+        python simulation.py replay [--genome best_gen.pkl] [--all]
+        python simulation.py replay --recording recordings/episode-... [--speed 4]
+        python simulation.py bench [options de bench.py]
+        python simulation.py worker --connect hôte:port
+    """
+    global generations, num_workers, num_episodes, episode_seed, batched_episodes, steps, resume
+    global min_steps, step_growth, termination, max_idle_time, checkpoint_interval, keep_checkpoints
+    global profile_phases, profile_csv, profile_json, record_every, record_dir
+    global curriculum_stages, num_worlds, scenario_dir, scenario_mmap, pheromone_diffusion
+    global listen_address, episodes_per_task, display_training
+
+    parser = argparse.ArgumentParser(description="Ant Colony Simulation with NEAT")
+    parser.add_argument('--config', default=config_path, help='fichier de configuration NEAT')
+    commands = parser.add_subparsers(dest='command')
+
+    train = commands.add_parser('train', help='entraîner la population (par défaut)')
+    train.add_argument('--generations', type=int, default=generations)
+    train.add_argument('--steps', type=int, default=steps, help='pas maximum par épisode')
+    train.add_argument('--min-steps', type=int, default=min_steps,
+                       help='budget de pas de la première génération (défaut : --steps)')
+    train.add_argument('--step-growth', type=int, default=step_growth,
+                       help='pas ajoutés au budget à chaque génération, jusqu\'à --steps')
+    train.add_argument('--termination', nargs='+', choices=TERMINATION_CONDITIONS, default=list(termination),
+                       help="conditions d'arrêt anticipé des épisodes")
+    train.add_argument('--max-idle-time', type=int, default=max_idle_time,
+                       help="pas sans nourriture avant qu'une fourmi soit inactive (condition idle)")
+    train.add_argument('--resume', action='store_true', default=resume,
+                       help='reprendre depuis la dernière sauvegarde')
+    train.add_argument('--checkpoint-interval', type=int, default=checkpoint_interval, metavar='N',
+                       help='générations entre deux sauvegardes (0 = aucune sauvegarde)')
+    train.add_argument('--keep-checkpoints', type=int, default=keep_checkpoints, metavar='N',
+                       help='sauvegardes conservées (0 = toutes)')
+    train.add_argument('--workers', type=int, default=num_workers, help="processus d'évaluation")
+    train.add_argument('--episodes', type=int, default=num_episodes, help='épisodes par génération')
+    train.add_argument('--seed', type=int, default=episode_seed, help='graine de base des épisodes')
+    train.add_argument('--batched', action='store_true', default=batched_episodes,
+                       help='simuler les épisodes d\'une génération ensemble')
+    train.add_argument('--profile', action='store_true', default=profile_phases,
+                       help='mesurer le temps de chaque phase')
+    train.add_argument('--profile-csv', default=profile_csv)
+    train.add_argument('--profile-json', default=profile_json)
+    train.add_argument('--record-every', type=int, default=record_every, metavar='N',
+                       help='enregistrer un épisode sur N')
+    train.add_argument('--record-dir', default=record_dir, help='répertoire des enregistrements')
+    train.add_argument('--curriculum', metavar='JSON',
+                       help='étapes du curriculum : fichier JSON [[génération, {options de generate_scenario}], ...]')
+    train.add_argument('--worlds', type=int, default=num_worlds, help='mondes distincts par étape du curriculum')
+    train.add_argument('--scenario-dir', default=scenario_dir, help='cache des mondes générés')
+    train.add_argument('--scenario-mmap', action='store_true', default=scenario_mmap,
+                       help='projeter les mondes du cache en mémoire')
+    train.add_argument('--diffusion', type=float, default=pheromone_diffusion,
+                       help='taux de diffusion des phéromones (0 à 0.5)')
+    train.add_argument('--listen', metavar='HÔTE:PORT', default=listen_address,
+                       help='évaluer les épisodes avec des travailleurs distants (commande worker)')
+    train.add_argument('--episodes-per-task', type=int, default=episodes_per_task,
+                       help='graines confiées à la fois à un travailleur distant')
+    train.add_argument('--display', action='store_true', default=display_training,
+                       help="afficher les épisodes (sans ralentir l'entraînement)")
+
+    replay = commands.add_parser('replay', help='rejouer un génome sauvegardé avec affichage')
+    replay.add_argument('--genome', default='best_gen.pkl', help='génome sauvegardé')
+    replay.add_argument('--all', action='store_true', help='rejouer toute la population (pop.pkl)')
+    replay.add_argument('--recording', help='relire un épisode enregistré (sans NEAT ni simulation)')
+    replay.add_argument('--speed', type=float, default=1, help="images de l'enregistrement par image affichée")
+
+    commands.add_parser('bench', help='banc d\'essai des chemins critiques (options de bench.py)',
+                        add_help=False)
+
+    worker = commands.add_parser('worker', help="évaluer les épisodes d'un entraînement lancé avec --listen")
+    worker.add_argument('--connect', metavar='HÔTE:PORT', required=True, help='adresse du coordinateur')
+    worker.add_argument('--connect-timeout', type=float, default=60,
+                        help='secondes de tentatives de connexion')
+
+    # Les options inconnues sont transmises à bench.py
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != 'bench':
+        parser.error(f"arguments non reconnus : {' '.join(extra)}")
+    # Sans clé partagée, pas d'échange de pickles hors de localhost
+    address = getattr(args, 'listen', None) or getattr(args, 'connect', None)
+    if address:
+        try:
+            check_authkey(parse_address(address), cluster_authkey)
+        except ValueError as error:
+            parser.error(str(error))
+
+    if args.command == 'replay' and args.recording:
+        TrajectoryPlayer(args.recording).play(args.speed)
+    elif args.command == 'replay':
+        # Tester le meilleur genome
+        replay_genome(args.all, args.config, args.genome)
+    elif args.command == 'bench':
+        import bench as bench_module
+        return bench_module.main(extra)
+    elif args.command == 'worker':
+        run_worker(parse_address(args.connect), cluster_authkey, args.connect_timeout)
+    else:
+        # Entrainement de la population
+        if args.command == 'train':
+            generations, steps, resume = args.generations, args.steps, args.resume
+            min_steps, step_growth = args.min_steps, args.step_growth
+            checkpoint_interval = args.checkpoint_interval or None
+            keep_checkpoints = args.keep_checkpoints or None
+            termination, max_idle_time = tuple(args.termination), args.max_idle_time
+            num_workers, num_episodes, episode_seed = args.workers, args.episodes, args.seed
+            batched_episodes = args.batched
+            profile_phases, profile_csv, profile_json = args.profile, args.profile_csv, args.profile_json
+            record_every, record_dir = args.record_every, args.record_dir
+            if args.curriculum:
+                with open(args.curriculum) as f:
+                    curriculum_stages = json.load(f)
+            num_worlds, scenario_dir, scenario_mmap = args.worlds, args.scenario_dir, args.scenario_mmap
+            pheromone_diffusion = args.diffusion
+            listen_address, episodes_per_task = args.listen, args.episodes_per_task
+            display_training = args.display
+        run(args.config, resume)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
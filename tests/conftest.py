@@ -0,0 +1,5 @@
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Aucun affichage pendant les tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,29 @@
+"""Sauvegardes de l'entraînement : rotation des fichiers et reprise depuis la plus récente."""
+import os
+import random
+
+import neat
+
+from checkpoint import AsyncCheckpointer, latest_checkpoint, list_checkpoints, restore_checkpoint
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.txt')
+
+
+def random_fitness(genomes, config):
+    for _, genome in genomes:
+        genome.fitness = random.random()
+
+
+def test_keep_last_checkpoints(tmp_path):
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, CONFIG_PATH)
+    prefix = str(tmp_path / 'checkpoints' / 'neat-checkpoint-')
+    random.seed(0)
+    population = neat.Population(config)
+    checkpointer = AsyncCheckpointer(population, 1, filename_prefix=prefix, keep=2)
+    population.add_reporter(checkpointer)
+    population.run(random_fitness, 3)
+    checkpointer.wait()
+
+    assert [generation for generation, _ in list_checkpoints(prefix)] == [2, 3]
+    assert restore_checkpoint(latest_checkpoint(prefix)).generation == 3
@@ -0,0 +1,120 @@
+"""
+Recherches vectorisées comparées à une recherche exhaustive fourmi par fourmi,
+et cartes de visites creuses comparées aux cartes en bits.
+"""
+import numpy as np
+import pytest
+
+import colony
+from bench import StubNetwork
+from colony import NeighbourGrid, VisitMap, closest_positions
+from simulation import Environment, Simulation
+
+
+def brute_neighbours(positions, i, k=3):
+    """Positions des k plus proches voisines de la fourmi i (ordre des indices en cas d'égalité)."""
+    others = np.delete(positions, i, axis=0)
+    order = np.argsort(np.linalg.norm(others - positions[i], axis=1), kind='stable')[:k]
+    closest = np.zeros((k, 2))
+    closest[:len(order)] = others[order]
+    return closest
+
+
+def brute_food_direction(env, position, radius):
+    """Direction de la nourriture la plus proche dans la fenêtre [x - r, x + r) x [y - r, y + r)."""
+    x, y = int(position[0]), int(position[1])
+    x0, x1 = max(0, x - radius), min(env.width, x + radius)
+    y0, y1 = max(0, y - radius), min(env.height, y + radius)
+    fys, fxs = np.nonzero(env.food[y0:y1, x0:x1])
+    if len(fxs) == 0:
+        return [0.0, 0.0]
+    distances = np.sqrt((fxs + x0 - x) ** 2.0 + (fys + y0 - y) ** 2.0)
+    best = np.argmin(distances)  # Premier minimum, dans l'ordre des lignes
+    dx, dy = fxs[best] + x0 - x, fys[best] + y0 - y
+    norm = np.sqrt(dx ** 2 + dy ** 2)
+    return [dx / norm, dy / norm] if norm > 0 else [float(dx), float(dy)]
+
+
+@pytest.mark.parametrize('cell_size', [1, 2, 7, None])
+def test_neighbour_grid(cell_size):
+    rng = np.random.default_rng(0)
+    for trial in range(60):
+        n, span = rng.integers(1, 80), rng.integers(1, 60)
+        positions = rng.integers(0, span, (n, 2)).astype(float)
+        if trial % 2:
+            positions += rng.random((n, 2))
+        grid = NeighbourGrid(positions, cell_size=cell_size)
+        expected = np.array([brute_neighbours(positions, i) for i in range(n)])
+        assert np.array_equal(grid.closest_positions(np.arange(n)), expected)
+
+
+def test_neighbour_grid_sparse():
+    # Peu de fourmis sur une grande carte : la recherche s'élargit par anneaux
+    rng = np.random.default_rng(1)
+    positions = rng.random((40, 2)) * 2000
+    grid = NeighbourGrid(positions)
+    expected = np.array([brute_neighbours(positions, i) for i in range(len(positions))])
+    assert np.array_equal(grid.closest_positions(np.arange(len(positions))), expected)
+
+
+def test_closest_food_direction():
+    rng = np.random.default_rng(0)
+    for trial in range(50):
+        env = Environment(40, 30)
+        for _ in range(rng.integers(0, 30)):
+            env.add_food(int(rng.integers(0, 40)), int(rng.integers(0, 30)),
+                         int(rng.integers(1, 3)), int(rng.integers(1, 3)))
+        positions = rng.random((60, 2)) * [39, 29]
+        radius = int(rng.integers(1, 20))
+        got = env.closest_food_direction(positions, radius, chunk_size=int(rng.integers(1, 500)))
+        expected = [brute_food_direction(env, position, radius) for position in positions]
+        assert np.array_equal(got, expected)
+
+        xs, ys = rng.integers(0, 40, 5), rng.integers(0, 30, 5)
+        env.remove_food(xs, ys)
+        assert np.array_equal(env.food_keys, np.flatnonzero(env.food))
+
+
+@pytest.mark.parametrize('num_ants', [None, 7])
+def test_sparse_visits(num_ants):
+    rng = np.random.default_rng(2)
+    dense = VisitMap(37, 23, num_ants)
+    sparse = VisitMap(37, 23, num_ants, sparse=True)
+    assert dense.bits is not None and sparse.bits is None
+    for _ in range(40):
+        idx = rng.integers(0, 7, 12)
+        x, y = rng.integers(0, 37, 12), rng.integers(0, 23, 12)
+        assert np.array_equal(sparse.mark(idx, x, y), dense.mark(idx, x, y))
+    for index in ([None] if num_ants is None else range(num_ants)):
+        assert np.array_equal(sparse.visited(index), dense.visited(index))
+
+
+def test_sparse_visits_by_default(monkeypatch):
+    # Cartes par fourmi trop grandes en bits : index trié, même fitness
+    assert VisitMap(2000, 2000, 1000).sparse
+    assert not VisitMap(2000, 2000).sparse
+    dense = Simulation(50, 50, 50, 12, seed=1)
+    monkeypatch.setattr(colony, 'DENSE_VISITS_LIMIT', 0)
+    sparse = Simulation(50, 50, 50, 12, seed=1)
+    assert sparse.ants.visits.sparse
+    dense.run(150, False, StubNetwork(50))
+    sparse.run(150, False, StubNetwork(50))
+    assert np.array_equal(sparse.ants.fitness, dense.ants.fitness)
+
+
+def test_direct_neighbours():
+    rng = np.random.default_rng(3)
+    for trial in range(60):
+        n = rng.integers(1, 60)
+        positions = rng.integers(0, rng.integers(1, 20), (n, 2)).astype(float)
+        if trial % 2:
+            positions += rng.random((n, 2))
+        idx = rng.integers(0, n, rng.integers(1, 10))
+        expected = np.array([brute_neighbours(positions, i) for i in idx])
+        assert np.array_equal(closest_positions(positions, idx), expected)
+
+    # Entrées d'une fourmi isolée (API par instance) identiques à celles de la population
+    sim = Simulation(50, 50, 50, 12, seed=1)
+    sim.ants.pos[:] = rng.random((50, 2)) * 50
+    per_ant = [ant.get_inputs(sim.env) for ant in sim.ants]
+    assert np.array_equal(per_ant, sim.ants.get_inputs(sim.env))
@@ -0,0 +1,132 @@
+"""
+Évaluation répartie sur localhost : port libre, plusieurs travailleurs en
+sous-processus, un travailleur bloqué (délai dépassé) ou tué en cours de tâche,
+clients connectés qui ne se présentent jamais.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from distributed import HELLO_TIMEOUT, DistributedEvaluator, check_authkey
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY = b'test-key'
+NUM_EPISODES = 6
+
+
+def episode(genomes, config, seed, timer=None):
+    """Épisode factice : fitness = graine. STALL bloque les graines paires, SLEEP ralentit tout."""
+    if os.environ.get('STALL') and seed % 2 == 0:
+        time.sleep(60)
+    time.sleep(float(os.environ.get('SLEEP', 0)))
+    return np.full(len(genomes), float(seed))
+
+
+def spawn_worker(address, **env):
+    code = f'from distributed import run_worker; run_worker({tuple(address)!r}, {AUTHKEY!r}, connect_timeout=20)'
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join((ROOT, os.path.dirname(__file__))), **env)
+    return subprocess.Popen([sys.executable, '-c', code], env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+
+@pytest.fixture
+def genomes():
+    return [(i, SimpleNamespace(fitness=None)) for i in range(5)]
+
+
+@pytest.fixture
+def workers():
+    processes = []
+    yield processes
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def make_evaluator(**options):
+    # Port 0 : port libre choisi par le système
+    return DistributedEvaluator(episode, NUM_EPISODES, seed=0, address=('localhost', 0), authkey=AUTHKEY,
+                                connect_timeout=20, **options)
+
+
+def wait_connected(evaluator, count, timeout=20):
+    """Attend que `count` travailleurs se soient présentés au coordinateur."""
+    deadline = time.monotonic() + timeout
+    while evaluator.joined.qsize() < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def expected(generation):
+    return np.mean(np.arange(NUM_EPISODES) + generation * NUM_EPISODES)
+
+
+def test_dispatch(genomes, workers):
+    evaluator = make_evaluator(episodes_per_task=2)
+    try:
+        workers.extend(spawn_worker(evaluator.address) for _ in range(3))
+        for generation in range(2):
+            fitness = evaluator.evaluate(genomes, None)
+            assert np.all(fitness == expected(generation))
+        assert all(genome.fitness == expected(1) for _, genome in genomes)
+    finally:
+        evaluator.close()
+    for process in workers:
+        assert process.wait(10) == 0  # Message 'stop' reçu
+
+
+def test_timeout_redispatch(genomes, workers):
+    evaluator = make_evaluator(task_timeout=2)
+    try:
+        workers.append(spawn_worker(evaluator.address, STALL='1'))
+        wait_connected(evaluator, 1)  # Le travailleur bloqué reçoit la première tâche
+        workers.extend(spawn_worker(evaluator.address) for _ in range(2))
+        fitness = evaluator.evaluate(genomes, None)
+        assert np.all(fitness == expected(0))
+        assert len(evaluator.workers) == 2
+    finally:
+        evaluator.close()
+
+
+def test_killed_worker(genomes, workers):
+    evaluator = make_evaluator()
+    try:
+        workers.extend(spawn_worker(evaluator.address, SLEEP='1') for _ in range(3))
+        wait_connected(evaluator, 3)
+        threading.Timer(0.5, workers[0].kill).start()  # Tué pendant sa première tâche
+        fitness = evaluator.evaluate(genomes, None)
+        assert np.all(fitness == expected(0))
+        assert len(evaluator.workers) == 2
+    finally:
+        evaluator.close()
+
+
+def test_silent_client(genomes, workers):
+    evaluator = make_evaluator()
+    try:
+        silent = Client(evaluator.address, authkey=AUTHKEY)  # Authentifié, mais sans 'hello'
+        mute = socket.create_connection(evaluator.address)  # Sans réponse au défi d'authentification
+        start = time.monotonic()
+        workers.append(spawn_worker(evaluator.address))
+        wait_connected(evaluator, 1)
+        assert time.monotonic() - start < HELLO_TIMEOUT  # Les clients muets ne bloquent pas l'écoute
+        assert np.all(evaluator.evaluate(genomes, None) == expected(0))
+        silent.close()
+        mute.close()
+    finally:
+        evaluator.close()
+
+
+def test_authkey_required_off_loopback():
+    check_authkey(('localhost', 0), None)
+    check_authkey(('0.0.0.0', 0), AUTHKEY)
+    with pytest.raises(ValueError):
+        check_authkey(('0.0.0.0', 0), None)
@@ -0,0 +1,67 @@
+"""Réseaux en lot : mêmes sorties que `neat.nn.FeedForwardNetwork`, génome par génome."""
+import os
+import random
+
+import neat
+import numpy as np
+import pytest
+
+from network import BatchNetwork, NetworkCache
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.txt')
+
+
+@pytest.fixture(scope='module')
+def evolved():
+    """Population évoluée quelques générations, avec toutes les activations et agrégations."""
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, CONFIG_PATH)
+    genome_config = config.genome_config
+    genome_config.aggregation_options = ['sum', 'product', 'max', 'min', 'mean']
+    genome_config.aggregation_mutate_rate = 0.5
+    genome_config.activation_options = ('sigmoid tanh sin gauss relu softplus identity clamped inv log '
+                                        'exp abs hat square cube').split()
+    genome_config.activation_mutate_rate = 0.5
+
+    random.seed(3)
+    population = neat.Population(config)
+
+    def random_fitness(genomes, config):
+        for _, genome in genomes:
+            genome.fitness = random.random()
+
+    population.run(random_fitness, 4)
+    return list(population.population.items()), config
+
+
+def reference(genomes, config, inputs):
+    return np.array([neat.nn.FeedForwardNetwork.create(genome, config).activate(x.tolist())
+                     for (_, genome), x in zip(genomes, inputs)])
+
+
+def test_matches_feed_forward(evolved):
+    genomes, config = evolved
+    network = BatchNetwork(genomes, config)
+    inputs = np.random.default_rng(0).normal(0, 3, (3, len(genomes), network.num_inputs))
+    outputs = network.activate(inputs)
+    for batch in range(len(inputs)):
+        expected = reference(genomes, config, inputs[batch])
+        assert np.allclose(outputs[batch], expected, rtol=1e-12, atol=1e-12)
+
+
+def test_rows_subset(evolved):
+    genomes, config = evolved
+    network = BatchNetwork(genomes, config)
+    inputs = np.random.default_rng(1).normal(0, 3, (len(genomes), network.num_inputs))
+    rows = np.array([3, 1, 7])
+    assert np.array_equal(network.activate(inputs[rows], rows), network.activate(inputs)[rows])
+
+
+def test_cached_networks(evolved):
+    genomes, config = evolved
+    cache = NetworkCache(maxsize=len(genomes))
+    inputs = np.random.default_rng(2).normal(0, 3, (len(genomes), BatchNetwork(genomes, config).num_inputs))
+    first = cache.networks(genomes, config).activate(inputs)
+    second = cache.networks(genomes, config).activate(inputs)  # Génomes compilés repris du cache
+    assert np.array_equal(first, second)
+    assert np.array_equal(first, BatchNetwork(genomes, config).activate(inputs))
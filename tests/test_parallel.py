@@ -0,0 +1,29 @@
+"""Les processus du pool reçoivent les réglages du processus principal, quel que soit le mode de démarrage."""
+import multiprocessing
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import parallel
+from parallel import ParallelEvaluator
+
+DIFFUSION = 0.0  # Réglage du module, modifié par le processus principal
+
+
+def episode(genomes, config, seed):
+    return np.full(len(genomes), DIFFUSION)
+
+
+@pytest.mark.parametrize('method', ['fork', 'forkserver', 'spawn'])
+def test_pool_settings(method, monkeypatch):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f'{method} indisponible')
+    monkeypatch.setattr(parallel, 'Pool', multiprocessing.get_context(method).Pool)
+    monkeypatch.setitem(globals(), 'DIFFUSION', 0.3)
+    genomes = [(i, SimpleNamespace(fitness=None)) for i in range(3)]
+    evaluator = ParallelEvaluator(episode, 2, 2, seed=0, settings={'DIFFUSION': DIFFUSION})
+    try:
+        assert np.all(evaluator.evaluate(genomes, None) == 0.3)
+    finally:
+        evaluator.close()
@@ -0,0 +1,73 @@
+"""
+Arrêt anticipé des épisodes, réglages reproduits dans les processus de travail
+et épisodes simulés en lot identiques aux épisodes simulés un par un.
+"""
+import os
+import random
+
+import neat
+import numpy as np
+import pytest
+
+import simulation
+from batched import BatchedSimulation
+from bench import StubNetwork
+from simulation import Simulation
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.txt')
+
+
+def test_idle_termination():
+    sim = Simulation(50, 50, 50, 12, seed=1, termination=('idle',), max_idle_time=5)
+    sim.run(simulation.steps, False, StubNetwork(50))
+    assert sim.termination_reason == 'idle'
+    assert sim.steps_run == 6
+
+    batch = BatchedSimulation(50, 50, 50, 12, [1, 2], termination=('idle',), max_idle_time=5)
+    batch.run(simulation.steps, False, StubNetwork(50))
+    assert batch.termination_reason == ['idle', 'idle']
+
+
+def test_idle_reachable_by_default():
+    # La condition 'idle' doit pouvoir se déclencher avant la fin d'un épisode par défaut
+    assert simulation.max_idle_time < simulation.steps
+    assert Simulation(50, 50, 50, 12, seed=1).max_idle_time == simulation.max_idle_time
+    assert simulation.worker_settings()['max_idle_time'] == simulation.max_idle_time
+
+
+@pytest.fixture(scope='module')
+def population():
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, CONFIG_PATH)
+    random.seed(5)
+    return list(neat.Population(config).population.items()), config
+
+
+@pytest.mark.parametrize('termination', [('dead',), ('dead', 'food', 'idle')])
+@pytest.mark.parametrize('shared_exploration', [False, True])
+def test_batched_matches_single(population, monkeypatch, termination, shared_exploration):
+    genomes, config = population
+    monkeypatch.setattr(simulation, 'termination', termination)
+    monkeypatch.setattr(simulation, 'shared_exploration', shared_exploration)
+    seeds = [11, 12, 13]
+    monkeypatch.setattr(simulation, '_network_cache', None)  # Aucune fitness mémorisée par un autre test
+    single = np.array([simulation.run_episode(genomes, config, seed) for seed in seeds])
+    simulation._network_cache = None  # Sans les fitness mémorisées par run_episode
+    batched = simulation.run_episodes(genomes, config, seeds)
+    assert simulation.network_cache().stats()['fitness_hits'] == 0
+    assert np.array_equal(batched, single)
+
+
+def test_batched_death_zones():
+    seeds = [1, 2, 3]
+    sims = [Simulation(30, 30, 20, 20, seed=seed) for seed in seeds]
+    batch = BatchedSimulation(30, 30, 20, 20, seeds)
+    for e, sim in enumerate(sims):
+        sim.env.add_death_zone(0, 13, 30, 1)
+        sim.env.add_death_zone(17, 0, 1, 30)
+        batch.env.cell_types[e] = sim.env.cell_types
+    for _ in range(100):
+        for sim in sims:
+            sim.update(StubNetwork(20, 1))
+        batch.update(StubNetwork(20, 1))
+    assert np.array_equal(batch.episode_fitness(), [sim.ants.fitness for sim in sims])
@@ -0,0 +1,47 @@
+"""
+Mondes non carrés (couche d'état indexée [y, x] de forme (height, width)) et
+stockage des tuiles projetées en mémoire.
+"""
+import numpy as np
+import pytest
+
+from batched import BatchedSimulation
+from bench import StubNetwork
+from simulation import Environment, Simulation
+from world import CELL_FOOD, CELL_WALL
+
+
+@pytest.mark.parametrize('width, height', [(60, 40), (40, 60)])
+@pytest.mark.parametrize('options', [{}, {'tile_size': 16}])
+def test_non_square_world(width, height, options):
+    sim = Simulation(width, height, 50, 12, seed=1, **options)
+    assert sim.env.cell_types.shape == (height, width)
+    assert len(sim.env.food_keys) == 12
+    assert np.array_equal(sim.env.food_keys, np.flatnonzero(sim.env.food))
+
+    sim.run(100, False, StubNetwork(50))
+    assert sim.steps_run == 100
+    assert sim.env.grid.shape == (height, width)
+    assert np.array_equal(sim.env.food_keys, np.flatnonzero(np.asarray(sim.env.cell_types) & CELL_FOOD))
+
+
+@pytest.mark.parametrize('width, height', [(60, 40), (40, 60)])
+def test_non_square_batched(width, height):
+    sim = BatchedSimulation(width, height, 50, 12, [1, 2])
+    assert sim.env.cell_types.shape == (2, height, width)
+    sim.run(100, False, StubNetwork(50))
+    assert list(sim.steps_run) == [100, 100]
+
+
+def test_shared_storage_dir(tmp_path):
+    """Deux mondes projetés dans le même répertoire restent indépendants."""
+    first = Environment(40, 40, tile_size=16, storage_dir=str(tmp_path))
+    first.set_flag((np.arange(10), np.arange(10)), CELL_WALL)
+    first.cell_types.flush()
+
+    second = Environment(40, 40, tile_size=16, storage_dir=str(tmp_path))
+    assert not np.any(second.walls)
+    second.set_flag((np.array([3]), np.array([5])), CELL_FOOD)  # Crée la tuile déjà écrite par `first`
+    assert not np.any(second.walls)
+    assert np.count_nonzero(second.food) == 1
+    assert np.count_nonzero(first.walls) == 10
@@ -0,0 +1,255 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+# État d'une cellule (bits de `Environment.cell_types`), lu en une seule indexation
+# lors des collisions. Un scénario ne contient que les trois premiers.
+CELL_WALL = 1
+CELL_DEATH = 2
+CELL_FOOD = 4
+CELL_ANT = 8  # Au moins une fourmi vivante sur la cellule
+CELL_COLONY = 16  # Cellule de la colonie
+CELL_OCCUPIED = 32  # Cellule réservée (centre de la colonie)
+LAYOUT_BITS = CELL_WALL | CELL_DEATH | CELL_FOOD
+
+# Code de la grille principale (affichage, enregistrements) de chaque combinaison de bits :
+# 0 vide, 1 mur, 2 nourriture, 3 zone mortelle, 4 fourmi (prioritaire dans cet ordre : 4, 1, 2, 3)
+_BITS = np.arange(64)
+GRID_CODES = np.select([(_BITS & CELL_ANT) != 0, (_BITS & CELL_WALL) != 0, (_BITS & CELL_FOOD) != 0,
+                        (_BITS & CELL_DEATH) != 0], [4, 1, 2, 3], 0).astype(np.int8)
+
+
+def grid_codes(cell_types):
+    """Codes de la grille principale d'un tableau de bits CELL_*."""
+    return GRID_CODES[np.asarray(cell_types)]
+
+
+def make_layer(shape, dtype, tile_size=None, directory=None, name='layer'):
+    """Couche du monde : tableau dense, ou TiledArray si `tile_size` est donné."""
+    if tile_size is None:
+        return np.zeros(shape, dtype=dtype)
+    return TiledArray(shape, dtype, tile_size, directory=directory, name=name)
+
+
+def diffuse(values, scratch, rate, evaporation_rate=1.0):
+    """
+    Diffusion séparable (noyau [d, 1 - 2d, d] selon x puis selon y) suivie de
+    l'évaporation, en place, sur une couche [..., y, x, types].
+
+    Les bords réfléchissent : sans évaporation, la quantité totale est conservée.
+    Seul `scratch` (même forme que `values`, réutilisé d'un appel à l'autre) sert
+    de tampon ; l'évaporation est appliquée par la seconde passe.
+    """
+    for axis, factor in ((-2, 1.0), (-3, evaporation_rate)):
+        layer = np.moveaxis(values, axis, 0)
+        neighbours = np.moveaxis(scratch, axis, 0)
+        if layer.shape[0] < 2:
+            layer *= factor
+            continue
+        np.add(layer[:-2], layer[2:], out=neighbours[1:-1])
+        np.add(layer[0], layer[1], out=neighbours[0])  # Bord réfléchi : la cellule remplace sa voisine absente
+        np.add(layer[-2], layer[-1], out=neighbours[-1])
+        neighbours *= rate * factor
+        layer *= (1 - 2 * rate) * factor
+        layer += neighbours
+
+
+class TiledArray:
+    """
+    Tableau 2-D (ou 2-D + dimensions de données) découpé en tuiles carrées.
+
+    Les tuiles sont créées au premier accès en écriture ; une tuile jamais
+    écrite se lit comme la valeur `fill` sans occuper de mémoire. Si
+    `directory` est donné, chaque tuile est un fichier `.npy` ouvert en
+    `np.memmap`, ce qui permet des mondes plus grands que la RAM. Chaque
+    tableau écrit dans son propre sous-répertoire de `directory`, supprimé
+    avec lui : deux mondes (ou deux processus) partageant `directory` ne
+    voient jamais les tuiles l'un de l'autre.
+
+    Indexation supportée (comme NumPy, sur les deux premiers axes) :
+        - rectangles : a[y0:y1, x0:x1], a[y, x], a[y, x, t]
+        - indices avancés : a[ys, xs], a[ys, xs, ts]
+    La lecture renvoie toujours un tableau NumPy dense (une copie).
+    """
+
+    def __init__(self, shape, dtype, tile_size=64, fill=0, directory=None, name='layer'):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.tile_size = tile_size
+        self.fill = fill
+        self.directory = None
+        self.name = name
+        self.tiles = {}  # (ty, tx) -> tableau (tile_size, tile_size, ...)
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.directory = tempfile.mkdtemp(prefix=f'{name}_', dir=directory)
+            weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par les tuiles créées."""
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+    def tile(self, ty, tx, create=False):
+        """Tuile (ty, tx), créée (remplie de `fill`) si besoin et si `create`."""
+        tile = self.tiles.get((ty, tx))
+        if tile is None and create:
+            tile_shape = (self.tile_size, self.tile_size) + self.shape[2:]
+            if self.directory is None:
+                tile = np.full(tile_shape, self.fill, dtype=self.dtype)
+            else:
+                path = os.path.join(self.directory, f'{ty}_{tx}.npy')
+                tile = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype, shape=tile_shape)
+                tile[...] = self.fill
+            self.tiles[(ty, tx)] = tile
+        return tile
+
+    def flush(self):
+        """Écrit sur disque les tuiles projetées en mémoire."""
+        for tile in self.tiles.values():
+            if isinstance(tile, np.memmap):
+                tile.flush()
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self[:, :]
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __imul__(self, factor):
+        # Seules les tuiles existantes sont concernées (fill * factor supposé égal à fill)
+        for tile in self.tiles.values():
+            tile *= factor
+        return self
+
+    # --- Normalisation des clés ---
+
+    def _split(self, key):
+        if key is Ellipsis:
+            key = (slice(None), slice(None))
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if len(key) < 2:
+            key = key + (slice(None),)
+        return key[0], key[1], key[2:]
+
+    def _range(self, index, size):
+        """(début, fin, est_entier) d'un indice entier ou d'une tranche de pas 1."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                raise IndexError("TiledArray ne supporte que des tranches de pas 1")
+            return start, max(start, stop), False
+        index = int(index)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(index)
+        return index, index + 1, True
+
+    @staticmethod
+    def _is_fancy(index):
+        return isinstance(index, (np.ndarray, list))
+
+    def _overlapping(self, y0, y1, x0, x1):
+        """Parcourt les tuiles recouvrant un rectangle : (ty, tx, tranches globales, tranches locales)."""
+        ts = self.tile_size
+        for ty in range(y0 // ts, (y1 - 1) // ts + 1 if y1 > y0 else y0 // ts):
+            for tx in range(x0 // ts, (x1 - 1) // ts + 1 if x1 > x0 else x0 // ts):
+                gy0, gy1 = max(y0, ty * ts), min(y1, (ty + 1) * ts)
+                gx0, gx1 = max(x0, tx * ts), min(x1, (tx + 1) * ts)
+                yield (ty, tx, (slice(gy0 - y0, gy1 - y0), slice(gx0 - x0, gx1 - x0)),
+                       (slice(gy0 - ty * ts, gy1 - ty * ts), slice(gx0 - tx * ts, gx1 - tx * ts)))
+
+    # --- Rectangles ---
+
+    def _read_region(self, y0, y1, x0, x1):
+        region = np.full((y1 - y0, x1 - x0) + self.shape[2:], self.fill, dtype=self.dtype)
+        for ty, tx, dst, src in self._overlapping(y0, y1, x0, x1):
+            tile = self.tile(ty, tx)
+            if tile is not None:
+                region[dst] = tile[src]
+        return region
+
+    def _write_region(self, y0, y1, x0, x1, region):
+        for ty, tx, src, dst in self._overlapping(y0, y1, x0, x1):
+            part = region[src]
+            if (ty, tx) not in self.tiles and np.all(part == self.fill):
+                continue  # Pas de tuile à créer pour des valeurs par défaut
+            self.tile(ty, tx, create=True)[dst] = part
+
+    # --- Indices avancés ---
+
+    def _fancy(self, ys, xs, rest):
+        """Indices plats, forme diffusée, clés de tuiles et groupes d'indices par tuile."""
+        arrays = [np.asarray(ys), np.asarray(xs)] + [np.asarray(r) for r in rest if self._is_fancy(r)]
+        arrays = np.broadcast_arrays(*arrays)
+        shape = arrays[0].shape
+        ys, xs = (a.ravel().astype(np.intp) for a in arrays[:2])
+        ys = np.where(ys < 0, ys + self.shape[0], ys)
+        xs = np.where(xs < 0, xs + self.shape[1], xs)
+        if np.any((ys < 0) | (ys >= self.shape[0]) | (xs < 0) | (xs >= self.shape[1])):
+            raise IndexError("indice hors de la grille")
+        extra = [a.ravel() for a in arrays[2:]]
+
+        ts = self.tile_size
+        tiles_x = -(-self.shape[1] // ts)
+        keys = (ys // ts) * tiles_x + xs // ts
+        order = np.argsort(keys, kind='stable')
+        groups = np.split(order, np.flatnonzero(np.diff(keys[order])) + 1) if len(order) else []
+        tiles = [divmod(int(keys[sel[0]]), tiles_x) for sel in groups]
+        return shape, ys, xs, extra, zip(tiles, groups)
+
+    def _item_shape(self, rest):
+        """Forme des données lues pour une seule cellule avec les indices `rest`."""
+        key = tuple(0 if self._is_fancy(r) else r for r in rest)
+        return np.empty(self.shape[2:], dtype=self.dtype)[key].shape
+
+    def _local_key(self, ys, xs, extra, rest, sel):
+        ts = self.tile_size
+        key = [ys[sel] % ts, xs[sel] % ts]
+        fancy = iter(extra)
+        for r in rest:
+            key.append(next(fancy)[sel] if self._is_fancy(r) else r)
+        return tuple(key)
+
+    def __getitem__(self, key):
+        ys, xs, rest = self._split(key)
+        if self._is_fancy(ys) or self._is_fancy(xs):
+            shape, ys, xs, extra, groups = self._fancy(ys, xs, rest)
+            out = np.full((len(ys),) + self._item_shape(rest), self.fill, dtype=self.dtype)
+            for (ty, tx), sel in groups:
+                tile = self.tile(ty, tx)
+                if tile is not None:
+                    out[sel] = tile[self._local_key(ys, xs, extra, rest, sel)]
+            return out.reshape(shape + out.shape[1:])
+
+        y0, y1, y_int = self._range(ys, self.shape[0])
+        x0, x1, x_int = self._range(xs, self.shape[1])
+        region = self._read_region(y0, y1, x0, x1)
+        return region[(0 if y_int else slice(None), 0 if x_int else slice(None)) + tuple(rest)]
+
+    def __setitem__(self, key, value):
+        ys, xs, rest = self._split(key)
+        if self._is_fancy(ys) or self._is_fancy(xs):
+            shape, ys, xs, extra, groups = self._fancy(ys, xs, rest)
+            item_shape = self._item_shape(rest)
+            value = np.broadcast_to(np.asarray(value, dtype=self.dtype), shape + item_shape)
+            value = value.reshape((len(ys),) + item_shape)
+            for (ty, tx), sel in groups:
+                part = value[sel]
+                if (ty, tx) not in self.tiles and np.all(part == self.fill):
+                    continue  # Pas de tuile à créer pour des valeurs par défaut
+                self.tile(ty, tx, create=True)[self._local_key(ys, xs, extra, rest, sel)] = part
+            return
+
+        y0, y1, y_int = self._range(ys, self.shape[0])
+        x0, x1, x_int = self._range(xs, self.shape[1])
+        region = self._read_region(y0, y1, x0, x1)
+        region[(0 if y_int else slice(None), 0 if x_int else slice(None)) + tuple(rest)] = value
+        self._write_region(y0, y1, x0, x1, region)